@@ -5,9 +5,11 @@
 # I regret in my life
 
 
-from typing import Any, Dict, List, Tuple, Union
+import hashlib
+from typing import Any, Callable, Dict, List, Optional, Tuple, Union
 
 from sqlalchemy.schema import Table
+from sqlalchemy.types import TypeEngine
 from sqlalchemy.dialects.mysql import (
     BIT as mysql_bit,
     DATE as mysql_date,
@@ -24,9 +26,12 @@ from sqlalchemy.dialects.mysql.types import (
     _StringType as mysql_string
 )
 from sqlalchemy.sql.sqltypes import (
+    Boolean as sql_boolean,
     Date as sql_date,
+    DateTime as sql_datetime,
     Float as sql_float,
     Integer as sql_int,
+    Numeric as sql_numeric,
     String as sql_string,
     TIMESTAMP as sql_timestamp
 )
@@ -43,78 +48,135 @@ from datastructures import (
 )
 
 
-def _analyse_mysql_type(type_) -> BaseDataStructure:
-    """推断MySQL字段的类型
-
-    Args:
-        type_: sqlalchemy通过反射获取的字段类型
-
-    Raises:
-        TypeError: 不支持的类型
+# 类型构造函数,参数为sqlalchemy字段类型和数据库类型
+TypeFactory = Callable[[TypeEngine, str], BaseDataStructure]
+
+
+def _unknown_type(type_: TypeEngine, dialect: str) -> BaseDataStructure:
+    structure = BaseDataStructure()
+    structure.raw_type = type_
+    structure.dialect = dialect
+    return structure
+
+
+# 各数据库的类型注册表,每项为(sqlalchemy类型, 构造函数),
+# 按字段类型的类的__mro__依次查找,最先找到的类生效,即更具体的类优先;
+# 同一个类有多项时靠前的项生效,没有匹配的项时使用_unknown_type
+TYPE_REGISTRY = {
+    "mysql": [
+        (mysql_decimal, Decimal),
+        (mysql_float, Float),
+        # TINYINT(1)同样作为整数导出,需要导出为布尔值时可以
+        # register_type("mysql", TINYINT, ..., first=True)
+        (mysql_tinyint, Integer),
+        (mysql_int, Integer),
+        (mysql_string, String),
+        (mysql_date, Date),
+        (mysql_timestamp, DateTime)
+    ],
+    "sqlite": [
+        (sql_float, Float),
+        (sql_int, Integer),
+        (sql_string, String),
+        (sql_date, Date),
+        # SQLite源库的NUMERIC、DATETIME、BOOLEAN字段,未注册时各生成函数
+        # 都会因BaseDataStructure未实现而失败
+        (sql_numeric, Decimal),
+        (sql_datetime, DateTime),
+        (sql_boolean, Boolean)
+    ]
+}  # type: Dict[str, List[Tuple[type, TypeFactory]]]
+
+# (数据库类型, 字段类型的类)对应的构造函数,每个类只在注册表中查找一次
+_resolved_types = {}  # type: Dict[Tuple[str, type], TypeFactory]
+
+# 注册表的版本,由registry_version计算,注册新类型时清空
+_registry_version = None  # type: Optional[str]
+
+
+def _qualified_name(obj: Any) -> str:
+    return f"{obj.__module__}.{getattr(obj, '__qualname__', repr(obj))}"
+
+
+def registry_version() -> str:
+    """类型注册表的版本,由各项的类名和构造函数名计算,注册表变化时版本变化
+
+    保存在table.info中的分析结果和反射快照以此判断是否过期
     """
 
-    if isinstance(type_, mysql_decimal):
-        return Decimal(type_, dialect="mysql")
-
-    elif isinstance(type_, mysql_float):
-        return Float(type_, dialect="mysql")
-
-    elif isinstance(type_, mysql_int):
-        return Integer(type_, dialect="mysql")
-
-    elif isinstance(type_, mysql_tinyint):
-        if type_.display_width == 1:
-            return Boolean(type_, dialect="mysql")
-        else:
-            return Integer(type_, dialect="mysql")
-
-    elif isinstance(type_, mysql_string):
-        return String(type_, dialect="mysql")
+    global _registry_version
+    if _registry_version is None:
+        digest = hashlib.sha256()
+        for dialect in sorted(TYPE_REGISTRY):
+            for type_class, factory in TYPE_REGISTRY[dialect]:
+                digest.update(repr((
+                    dialect,
+                    _qualified_name(type_class),
+                    _qualified_name(factory)
+                )).encode("utf-8"))
+        _registry_version = digest.hexdigest()
+    return _registry_version
+
+
+def register_type(
+    dialect: str,
+    type_class: type,
+    factory: TypeFactory,
+    first: bool = False
+) -> None:
+    """注册字段类型,新的数据库类型也通过注册加入
 
-    elif isinstance(type_, mysql_date):
-        return Date(type_, dialect="mysql")
+    Args:
+        dialect: 数据库类型
+        type_class: sqlalchemy字段类型的类,其子类中没有更具体的注册项时也会匹配
+        factory: 构造函数,参数为字段类型和数据库类型
+        first: 是否放在最前面,同一个类已注册时优先于已注册的项
 
-    elif isinstance(type_, mysql_timestamp):
-        return DateTime(type_, dialect="mysql")
+    注册后已有的分析结果和反射快照因注册表版本变化而失效,使用时重新分析
+    """
 
+    global _registry_version
+    entries = TYPE_REGISTRY.setdefault(dialect, [])
+    if first is True:
+        entries.insert(0, (type_class, factory))
     else:
-        mysql_structure = BaseDataStructure()
-        mysql_structure.raw_type = type_
-        mysql_structure.dialect = "mysql"
-        return mysql_structure
+        entries.append((type_class, factory))
+    _resolved_types.clear()
+    _registry_version = None
 
 
-def _analyse_sqlite_type(type_) -> BaseDataStructure:
-    """推断SQLite字段类型
+def _analyse_type(type_: TypeEngine, dialect: str) -> BaseDataStructure:
+    """推断字段类型
 
     Args:
         type_: sqlalchemy通过反射获取的字段类型
-
-    Raises:
-        TypeError: 不支持的类型
+        dialect: 数据库类型
     """
 
-    if isinstance(type_, sql_float):
-        return Float(type_, dialect="sqlite")
-
-    elif isinstance(type_, sql_int):
-        return Integer(type_, dialect="sqlite")
+    key = (dialect, type_.__class__)
+    factory = _resolved_types.get(key)
+    if factory is None:
+        factories = {}  # type: Dict[type, TypeFactory]
+        for type_class, entry_factory in TYPE_REGISTRY[dialect]:
+            factories.setdefault(type_class, entry_factory)
+        factory = next(
+            (
+                factories[type_class]
+                for type_class in type_.__class__.__mro__
+                if type_class in factories
+            ),
+            _unknown_type
+        )
+        _resolved_types[key] = factory
+    return factory(type_, dialect)
 
-    elif isinstance(type_, sql_string):
-        return String(type_, dialect="sqlite")
 
-    elif isinstance(type_, sql_date):
-        return Date(type_, dialect="sqlite")
-
-    else:
-        sqlite_structure = BaseDataStructure()
-        sqlite_structure.raw_type = type_
-        sqlite_structure.dialect = "sqlite"
-        return sqlite_structure
+ANALYSIS_INFO_KEY = "dam_analysis"
 
 
 def analyse_table(table: Table, dialect: str) -> Dict[str, Any]:
-    """分析表结构
+    """分析表结构,结果保存在table.info中,
+    同一张表再次分析且类型注册表未变化时直接使用该结果
 
     Args:
         table: sqlalchemy通过反射获取的表
@@ -133,11 +195,33 @@ def analyse_table(table: Table, dialect: str) -> Dict[str, Any]:
 
     """
 
-    if dialect == "mysql":
-        _analyse_type = _analyse_mysql_type
-    elif dialect == "sqlite":
-        _analyse_type = _analyse_sqlite_type
-    else:
+    cached = table.info.get(ANALYSIS_INFO_KEY, {}).get(dialect)
+    if (cached is not None) and (cached[0] == registry_version()):
+        return cached[1]
+    return remember_analysis(table, dialect)
+
+
+def remember_analysis(table: Table, dialect: str) -> Dict[str, Any]:
+    """重新分析表结构并将结果保存在table.info中,随反射快照一起持久化
+
+    Args:
+        table: sqlalchemy通过反射获取的表
+        dialect: 数据库类型
+    """
+
+    result = _analyse_table(table, dialect)
+    table.info.setdefault(ANALYSIS_INFO_KEY, {})[dialect] = (
+        registry_version(),
+        result
+    )
+    return result
+
+
+def _analyse_table(table: Table, dialect: str) -> Dict[str, Any]:
+    """分析表结构,各参数及返回值同analyse_table
+    """
+
+    if dialect not in TYPE_REGISTRY:
         raise TypeError(f"no such dialect: {dialect}")
 
     columns = []  # type: List[Dict[str, Union[bool, str, BaseDataStructure]]]
@@ -145,7 +229,7 @@ def analyse_table(table: Table, dialect: str) -> Dict[str, Any]:
     indexes = []  # type: List[Tuple[str, str]]
     for column in table.columns:
         name = column.name
-        type_ = _analyse_type(column.type)
+        type_ = _analyse_type(column.type, dialect)
         nullable = column.nullable
         primary = column.primary_key
         for foreign_key in column.foreign_keys:
@@ -0,0 +1,325 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# @Date    : 2026-10-18 19:12:37
+# @Author  : gwentmaster(1950251906@qq.com)
+# I regret in my life
+
+
+import asyncio
+import os
+import tempfile
+import time
+from concurrent.futures import Executor, ThreadPoolExecutor
+from typing import Callable, List, Optional, Union
+
+from sqlalchemy import create_engine, func, select
+from sqlalchemy.schema import Table
+
+from compression import compress_file, Compression, get_compression
+from data_export import (
+    _apply_action,
+    _engine_url,
+    _execute_sqlite_sqls,
+    _sqlite_ddl,
+    _JsonRowsSink,
+    _merge_json_parts,
+    _sort_by_dependency,
+    BaseSink,
+    gen_sqlite_sql,
+    SqliteSink
+)
+from metrics import ExportMetrics, timer
+from serializer import gen_serializers
+
+
+# 各数据库使用的asyncio驱动
+ASYNC_DRIVERS = {
+    "mysql": "mysql+aiomysql",
+    "sqlite": "sqlite+aiosqlite"
+}
+
+
+def _async_engine(engine, dialect: str, concurrency: int):
+    """根据同步engine的连接字符串创建asyncio engine,传入的已是asyncio engine时直接返回
+
+    需要对应的驱动(aiomysql、aiosqlite),见requirements-async.txt
+
+    Returns:
+        (asyncio engine, 是否为新创建的engine)
+
+    Raises:
+        TypeError: 不支持的数据库类型
+    """
+
+    if hasattr(engine, "sync_engine"):
+        return engine, False
+    if dialect not in ASYNC_DRIVERS:
+        raise TypeError(f"no such dialect: {dialect}")
+
+    from sqlalchemy.ext.asyncio import create_async_engine
+
+    url = _engine_url(engine)
+    url = ASYNC_DRIVERS[dialect] + url[url.index("://"):]
+    if dialect == "sqlite":
+        return create_async_engine(url), True
+    # 每张并发导出的表占用一个连接
+    return create_async_engine(url, pool_size=concurrency), True
+
+
+async def _next_batch(batches) -> Optional[List]:
+    try:
+        return await batches.__anext__()
+    except StopAsyncIteration:
+        return None
+
+
+async def _export_table_async(
+    async_engine,
+    table: Table,
+    sink: BaseSink,
+    batch_size: int,
+    executor: Executor,
+    metrics: Optional[ExportMetrics] = None
+) -> None:
+    """导出单张表,写入当前批次的同时读取下一批
+
+    sink的所有调用都在executor中执行,事件循环只负责读取数据,
+    等待读取的时间计入query阶段
+    """
+
+    loop = asyncio.get_running_loop()
+    await loop.run_in_executor(executor, sink.open)
+    try:
+        await loop.run_in_executor(
+            executor,
+            _apply_action,
+            sink,
+            ("begin", table),
+            None,
+            None,
+            metrics
+        )
+        encoder = None
+        if metrics is not None:
+            # 统计时分开编码和写入,写入的字节数才能计入统计
+            encoder = sink.table_encoder(table)
+        async with async_engine.connect() as connection:
+            result = await connection.stream(table.select())
+            batches = result.partitions(batch_size)
+            fetching = asyncio.ensure_future(_next_batch(batches))
+            try:
+                while True:
+                    start = time.perf_counter()
+                    rows = await fetching
+                    if metrics is not None:
+                        metrics.add_time(
+                            "query",
+                            time.perf_counter() - start,
+                            table.name
+                        )
+                    if rows is None:
+                        break
+                    fetching = asyncio.ensure_future(_next_batch(batches))
+                    if encoder is None:
+                        action = ("rows", table, None, None, rows)
+                    else:
+                        action = ("encode", table, None, None, (encoder, rows))
+                    await loop.run_in_executor(
+                        executor,
+                        _apply_action,
+                        sink,
+                        action,
+                        None,
+                        None,
+                        metrics
+                    )
+            finally:
+                if not fetching.done():
+                    fetching.cancel()
+        await loop.run_in_executor(
+            executor,
+            _apply_action,
+            sink,
+            ("end", table),
+            None,
+            None,
+            metrics
+        )
+    finally:
+        await loop.run_in_executor(executor, sink.close)
+
+
+async def _export_data_async(
+    tables: List[Table],
+    engine,
+    dialect: str,
+    make_sink: Callable[[int, Table], BaseSink],
+    batch_size: int,
+    concurrency: int,
+    metrics: Optional[ExportMetrics] = None
+) -> None:
+    """最多concurrency张表同时导出,共用同一个连接池
+
+    make_sink为每张表创建单独的导出目标,所有写入在同一个线程中依次执行
+    """
+
+    async_engine, created = _async_engine(engine, dialect, concurrency)
+    semaphore = asyncio.Semaphore(concurrency)
+    executor = ThreadPoolExecutor(max_workers=1)
+
+    if (metrics is not None) and (metrics.count_rows is True):
+        async with async_engine.connect() as connection:
+            for table in tables:
+                with metrics.timer("count", table.name):
+                    result = await connection.execute(
+                        select([func.count()]).select_from(table)
+                    )
+                    metrics.set_total_rows(table.name, result.scalar())
+
+    async def export_table(i: int, table: Table) -> None:
+        async with semaphore:
+            await _export_table_async(
+                async_engine,
+                table,
+                make_sink(i, table),
+                batch_size,
+                executor,
+                metrics
+            )
+
+    tasks = [
+        asyncio.ensure_future(export_table(i, table))
+        for i, table in enumerate(tables)
+    ]
+    try:
+        await asyncio.gather(*tasks)
+    except BaseException:
+        # 一张表出错时取消其余的表,等待它们关闭各自的导出目标
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        raise
+    finally:
+        executor.shutdown()
+        if created is True:
+            await async_engine.dispose()
+
+
+async def gen_json_async(
+    tables: List[Table],
+    engine,
+    dialect: str,
+    batch_size: int = 1000,
+    concurrency: int = 4,
+    compression: Union[None, str, Compression] = None,
+    json_backend: str = "json",
+    metrics: Optional[ExportMetrics] = None
+) -> None:
+    """gen_json的asyncio版本,结果与gen_json一致
+
+    各表分别导出为json片段,全部完成后按原顺序合并为data.json
+
+    Args:
+        tables: sqlalchemy通过反射获取的表
+        engine: 数据库连接,同步engine会按连接字符串换用aiomysql或aiosqlite驱动,
+                也可以直接传入asyncio engine
+        dialect: 数据库类型
+        batch_size: 每批读取的行数
+        concurrency: 同时导出的表数
+        compression: 压缩方式,gzip、bz2、lzma或Compression,合并片段时压缩
+        json_backend: json编码后端,默认为标准库,见JSON_BACKENDS
+        metrics: 导出过程的统计
+    """
+
+    if metrics is not None:
+        metrics.begin_exporter("gen_json_async")
+    with timer(metrics, "analyse"):
+        serializers = gen_serializers(tables, dialect, for_json=True)
+    with tempfile.TemporaryDirectory(prefix="dam_", dir=".") as tmp_dir:
+        part_paths = [
+            os.path.join(tmp_dir, f"{i}.json") for i in range(len(tables))
+        ]
+        await _export_data_async(
+            tables,
+            engine,
+            dialect,
+            lambda i, table: _JsonRowsSink(
+                serializers,
+                part_paths[i],
+                json_backend,
+                metrics
+            ),
+            batch_size,
+            concurrency,
+            metrics
+        )
+        _merge_json_parts(
+            (
+                (table.name, [part_path])
+                for table, part_path in zip(tables, part_paths)
+            ),
+            compression=get_compression(compression)
+        )
+    if metrics is not None:
+        metrics.end_exporter("gen_json_async")
+
+
+async def gen_db_async(
+    tables: List[Table],
+    engine,
+    dialect: str,
+    decimal_as_real: bool = False,
+    batch_size: int = 1000,
+    concurrency: int = 4,
+    compression: Union[None, str, Compression] = None,
+    metrics: Optional[ExportMetrics] = None
+) -> None:
+    """gen_db的asyncio版本,生成SQLite建表语句后将数据导入data.db
+
+    SQLite同一时间只能有一个写入者,各表交替写入,每批提交一次
+
+    Args:
+        tables: sqlalchemy通过反射获取的表
+        engine: 数据库连接,同步engine会按连接字符串换用aiomysql或aiosqlite驱动,
+                也可以直接传入asyncio engine
+        dialect: 数据库类型
+        decimal_as_real: 是否将原本为DECIMAL的字段在
+                         db文件中设为REAL,默认为TEXT
+        batch_size: 每批读取、插入并提交的行数
+        concurrency: 同时导出的表数
+        compression: 压缩方式,gzip、bz2、lzma或Compression,
+                     指定时导入完成后将data.db压缩为加上压缩后缀的文件并删除data.db
+        metrics: 导出过程的统计
+    """
+
+    compression = get_compression(compression)
+    if metrics is not None:
+        metrics.begin_exporter("gen_db_async")
+    with timer(metrics, "ddl"):
+        gen_sqlite_sql(tables, dialect, decimal_as_real)
+        table_sqls, _ = _sqlite_ddl(tables, dialect, decimal_as_real)
+
+        sqlite_engine = create_engine("sqlite:///data.db")
+        _execute_sqlite_sqls(
+            sqlite_engine,
+            [sql for sqls in table_sqls for sql in sqls]
+        )
+
+    try:
+        await _export_data_async(
+            _sort_by_dependency(tables),
+            engine,
+            dialect,
+            lambda i, table: SqliteSink(sqlite_engine),
+            batch_size,
+            concurrency,
+            metrics
+        )
+    finally:
+        sqlite_engine.dispose()
+
+    if compression is not None:
+        with timer(metrics, "compress"):
+            compress_file("data.db", compression)
+    if metrics is not None:
+        metrics.end_exporter("gen_db_async")
@@ -0,0 +1,69 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# @Date    : 2026-10-19 00:21:45
+# @Author  : gwentmaster(1950251906@qq.com)
+# I regret in my life
+
+
+from typing import Any, Dict, List
+
+
+# 自适应批次的行数范围
+MIN_BATCH_ROWS = 1
+MAX_BATCH_ROWS = 100000
+# 每批最多抽样计算行宽的行数
+SAMPLE_ROWS = 20
+# NULL值按该字节数计
+NULL_WIDTH = 4
+
+
+def _value_width(value: Any) -> int:
+    if value is None:
+        return NULL_WIDTH
+    if isinstance(value, (str, bytes)):
+        return len(value)
+    return len(str(value))
+
+
+class BatchSizer(object):
+    """根据行宽决定每批读取的行数,使每批数据的文本大小约为batch_bytes
+
+    初始行宽为analyse_table中各字段类型estimate_width的和,
+    每读取一批后抽样计算实际的行宽,之后按已抽样各行的平均行宽决定批次大小
+
+    Args:
+        result: analyse_table的结果
+        batch_bytes: 每批数据的字节数预算
+    """
+
+    def __init__(self, result: Dict[str, Any], batch_bytes: int):
+        self.batch_bytes = batch_bytes
+        # 每个字段另计一个字节的分隔符
+        self.estimated_width = sum(
+            column["type"].estimate_width() + 1
+            for column in result["columns"]
+        )
+        self.sampled_rows = 0
+        self.sampled_bytes = 0
+
+    @property
+    def row_width(self) -> float:
+        if self.sampled_rows == 0:
+            return max(self.estimated_width, 1)
+        return max(self.sampled_bytes / self.sampled_rows, 1)
+
+    def batch_size(self) -> int:
+        """下一批读取的行数
+        """
+
+        size = int(self.batch_bytes // self.row_width)
+        return min(max(size, MIN_BATCH_ROWS), MAX_BATCH_ROWS)
+
+    def observe(self, rows: List) -> None:
+        """抽样计算读取到的一批数据的行宽
+        """
+
+        step = max(len(rows) // SAMPLE_ROWS, 1)
+        for row in rows[::step]:
+            self.sampled_rows += 1
+            self.sampled_bytes += sum(_value_width(value) + 1 for value in row)
@@ -0,0 +1,454 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# @Date    : 2026-10-18 20:41:26
+# @Author  : gwentmaster(1950251906@qq.com)
+# I regret in my life
+
+
+"""导出性能基准
+
+生成合成的SQLite数据库,在独立的进程中依次运行各导出函数,
+以json输出耗时、吞吐量和内存峰值,便于在不同提交之间比较:
+
+    python benchmark.py --tables 4 --rows 20000 --output before.json
+    python benchmark.py --tables 4 --rows 20000 --compare before.json
+"""
+
+
+import argparse
+import datetime
+import decimal
+import json
+import multiprocessing
+import os
+import platform
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+import warnings
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import sqlalchemy
+from sqlalchemy import (
+    Boolean,
+    Column,
+    create_engine,
+    DateTime,
+    ForeignKey,
+    func,
+    Integer,
+    MetaData,
+    Numeric,
+    select,
+    String,
+    Table
+)
+
+from analyser import remember_analysis
+from data_export import gen_db, gen_json, gen_schemas
+
+try:
+    import resource
+except ImportError:  # pragma: no cover
+    resource = None  # type: ignore[assignment]
+
+
+# 默认每张表中各类型字段的个数
+DEFAULT_TYPE_MIX = {
+    "decimal": 2,
+    "datetime": 1,
+    "string": 3,
+    "integer": 2,
+    "boolean": 1
+}
+_EPOCH = datetime.datetime(2000, 1, 1)
+
+
+def _column_type(kind: str, string_width: int):
+    if kind == "decimal":
+        return Numeric(12, 2)
+    if kind == "datetime":
+        return DateTime()
+    if kind == "string":
+        return String(string_width)
+    if kind == "integer":
+        return Integer()
+    if kind == "boolean":
+        return Boolean()
+    raise TypeError(f"no such column type: {kind}")
+
+
+def _value_factory(
+    kind: str,
+    string_width: int,
+    rand: random.Random
+) -> Callable[[], Any]:
+    if kind == "decimal":
+        return lambda: decimal.Decimal(
+            rand.randint(-10 ** 10 + 1, 10 ** 10 - 1)
+        ).scaleb(-2)
+    if kind == "datetime":
+        return lambda: _EPOCH + datetime.timedelta(
+            seconds=rand.randint(0, 30 * 365 * 86400),
+            microseconds=rand.randint(0, 999999)
+        )
+    if kind == "string":
+        return lambda: format(
+            rand.getrandbits(4 * string_width),
+            f"0{string_width}x"
+        )
+    if kind == "integer":
+        return lambda: rand.randint(-2 ** 31, 2 ** 31 - 1)
+    return lambda: rand.getrandbits(1) == 1
+
+
+def gen_synthetic_db(
+    path: str,
+    tables: int = 4,
+    rows: int = 10000,
+    string_width: int = 32,
+    type_mix: Optional[Dict[str, int]] = None,
+    fk_chain: bool = True,
+    null_ratio: float = 0.1,
+    seed: int = 0
+) -> None:
+    """生成合成的SQLite数据库,数据由seed决定,相同参数生成相同的数据
+
+    每张表t<i>有整数主键id及type_mix中指定个数的各类型字段(可为NULL),
+    fk_chain为True时t<i>另有parent_id外键引用t<i-1>.id,形成一条外键链
+
+    Args:
+        path: 数据库文件路径,已存在时覆盖
+        tables: 表数
+        rows: 每张表的行数
+        string_width: 字符串字段的长度
+        type_mix: 各类型字段的个数,键为decimal、datetime、string、integer、boolean
+        fk_chain: 是否生成外键链
+        null_ratio: 普通字段为NULL的比例
+        seed: 随机数种子
+    """
+
+    if os.path.exists(path):
+        os.remove(path)
+    type_mix = DEFAULT_TYPE_MIX if type_mix is None else type_mix
+    rand = random.Random(seed)
+    engine = create_engine(f"sqlite:///{path}")
+    metadata = MetaData()
+
+    for i in range(tables):
+        columns = [Column("id", Integer, primary_key=True)]
+        if fk_chain and (i > 0):
+            columns.append(
+                Column("parent_id", Integer, ForeignKey(f"t{i - 1}.id"))
+            )
+        for kind, count in sorted(type_mix.items()):
+            for j in range(count):
+                columns.append(
+                    Column(f"{kind}_{j}", _column_type(kind, string_width))
+                )
+        Table(f"t{i}", metadata, *columns)
+    metadata.create_all(engine)
+
+    for table in metadata.sorted_tables:
+        factories = []  # type: List[Tuple[str, Callable[[], Any]]]
+        for column in table.columns:
+            if column.name == "id":
+                continue
+            if column.name == "parent_id":
+                factories.append(
+                    (column.name, lambda: rand.randint(1, rows))
+                )
+                continue
+            kind = column.name.rsplit("_", 1)[0]
+            factories.append(
+                (column.name, _value_factory(kind, string_width, rand))
+            )
+
+        with engine.begin() as connection:
+            for start in range(0, rows, 1000):
+                batch = []
+                for row_id in range(start + 1, min(start + 1000, rows) + 1):
+                    row = {"id": row_id}  # type: Dict[str, Any]
+                    for name, factory in factories:
+                        if rand.random() < null_ratio:
+                            row[name] = None
+                        else:
+                            row[name] = factory()
+                    batch.append(row)
+                connection.execute(table.insert(), batch)
+    engine.dispose()
+
+
+def _bench_analyse(tables: List[Table], engine, dialect: str) -> List[str]:
+    for table in tables:
+        remember_analysis(table, dialect)
+    return []
+
+
+def _bench_schemas(tables: List[Table], engine, dialect: str) -> List[str]:
+    gen_schemas(tables, dialect)
+    return ["schemas.py"]
+
+
+def _bench_json(tables: List[Table], engine, dialect: str) -> List[str]:
+    gen_json(tables, engine, dialect)
+    return ["data.json"]
+
+
+def _bench_db(tables: List[Table], engine, dialect: str) -> List[str]:
+    gen_db(tables, engine, dialect)
+    return ["data.db"]
+
+
+# 基准项的运行函数,返回生成的文件
+BenchmarkRunner = Callable[[List[Table], Any, str], List[str]]
+
+# 各基准项,值为(运行函数, 是否读取数据)
+BENCHMARKS = {
+    "analyse_table": (_bench_analyse, False),
+    "gen_schemas": (_bench_schemas, False),
+    "gen_json": (_bench_json, True),
+    "gen_db": (_bench_db, True)
+}  # type: Dict[str, Tuple[BenchmarkRunner, bool]]
+
+
+def _peak_rss_kb() -> Optional[int]:
+    if resource is None:  # pragma: no cover
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # macOS的单位为字节,Linux为KB
+    if sys.platform == "darwin":  # pragma: no cover
+        peak //= 1024
+    return peak
+
+
+def _clean(paths: List[str]) -> None:
+    for path in paths:
+        if os.path.exists(path):
+            os.remove(path)
+
+
+def _run_benchmark(
+    db_path: str,
+    name: str,
+    repeat: int,
+    trace: bool
+) -> Dict[str, Any]:
+    """在子进程中运行单个基准项,反射和计数不计入耗时
+    """
+
+    # SQLite没有原生的DECIMAL,读取时sqlalchemy每个进程都会警告一次
+    warnings.filterwarnings("ignore", message=".*support Decimal objects")
+    work_dir = tempfile.mkdtemp(prefix="dam_bench_")
+    os.chdir(work_dir)
+    engine = create_engine(f"sqlite:///{os.path.abspath(db_path)}")
+    metadata = MetaData(bind=engine)
+    metadata.reflect()
+    tables = list(metadata.sorted_tables)
+    run, reads_data = BENCHMARKS[name]
+
+    rows = None  # type: Optional[int]
+    if reads_data is True:
+        with engine.connect() as connection:
+            rows = sum(
+                connection.execute(
+                    select([func.count()]).select_from(table)
+                ).scalar()
+                for table in tables
+            )
+
+    base_rss_kb = _peak_rss_kb()
+    wall_times = []  # type: List[float]
+    outputs = []  # type: List[str]
+    for _ in range(repeat):
+        _clean(outputs)
+        start = time.perf_counter()
+        outputs = run(tables, engine, "sqlite")
+        wall_times.append(time.perf_counter() - start)
+    output_bytes = sum(os.path.getsize(path) for path in outputs)
+    peak_rss_kb = _peak_rss_kb()
+
+    # tracemalloc会明显拖慢运行,单独运行一次
+    tracemalloc_peak = None  # type: Optional[int]
+    if trace is True:
+        _clean(outputs)
+        tracemalloc.start()
+        try:
+            run(tables, engine, "sqlite")
+            tracemalloc_peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+    _clean(outputs)
+    engine.dispose()
+    os.chdir(os.path.dirname(work_dir))
+    shutil.rmtree(work_dir)
+
+    wall_time = min(wall_times)
+    return {
+        "name": name,
+        "wall_time": wall_time,
+        "wall_times": wall_times,
+        "rows": rows,
+        "rows_per_sec": None if rows is None else rows / wall_time,
+        "bytes": output_bytes,
+        "mb_per_sec": (
+            output_bytes / 1024 / 1024 / wall_time if outputs else None
+        ),
+        "base_rss_kb": base_rss_kb,
+        "peak_rss_kb": peak_rss_kb,
+        "tracemalloc_peak_bytes": tracemalloc_peak
+    }
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"],
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+            check=True
+        ).stdout.decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_benchmarks(
+    db_path: str,
+    names: Optional[List[str]] = None,
+    repeat: int = 3,
+    trace: bool = True
+) -> List[Dict[str, Any]]:
+    """依次运行各基准项,每项使用一个新的进程,内存峰值互不影响
+
+    Args:
+        db_path: 数据库文件路径
+        names: 运行的基准项,默认为BENCHMARKS中的全部
+        repeat: 每项重复运行的次数,耗时取最小值
+        trace: 是否另外运行一次以获取tracemalloc的内存峰值
+
+    Returns:
+        各基准项的结果
+    """
+
+    context = multiprocessing.get_context("spawn")
+    results = []
+    for name in (names or list(BENCHMARKS)):
+        with context.Pool(1) as pool:
+            results.append(pool.apply(
+                _run_benchmark,
+                (os.path.abspath(db_path), name, repeat, trace)
+            ))
+    return results
+
+
+def compare_results(
+    old: Dict[str, Any],
+    new: Dict[str, Any]
+) -> List[Dict[str, Any]]:
+    """比较两次基准的结果,ratio为新耗时与旧耗时之比,小于1表示变快
+    """
+
+    old_results = {result["name"]: result for result in old["results"]}
+    comparison = []
+    for result in new["results"]:
+        previous = old_results.get(result["name"])
+        if previous is None:
+            continue
+        comparison.append({
+            "name": result["name"],
+            "old_wall_time": previous["wall_time"],
+            "new_wall_time": result["wall_time"],
+            "ratio": result["wall_time"] / previous["wall_time"]
+        })
+    return comparison
+
+
+def _parse_type_mix(value: str) -> Dict[str, int]:
+    type_mix = {}
+    for item in value.split(","):
+        kind, count = item.split("=")
+        _column_type(kind, 1)
+        type_mix[kind] = int(count)
+    return type_mix
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="dam export benchmark")
+    parser.add_argument("--tables", type=int, default=4)
+    parser.add_argument("--rows", type=int, default=10000)
+    parser.add_argument("--string-width", type=int, default=32)
+    parser.add_argument(
+        "--type-mix",
+        type=_parse_type_mix,
+        default=DEFAULT_TYPE_MIX,
+        help="e.g. decimal=2,datetime=1,string=3,integer=2,boolean=1"
+    )
+    parser.add_argument("--no-fk-chain", action="store_true")
+    parser.add_argument("--null-ratio", type=float, default=0.1)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument(
+        "--db",
+        help="use (or create) this database instead of a temporary one"
+    )
+    parser.add_argument(
+        "--benchmarks",
+        default=",".join(BENCHMARKS),
+        help="comma separated subset of " + ", ".join(BENCHMARKS)
+    )
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--no-tracemalloc", action="store_true")
+    parser.add_argument("--output", help="write the json report to this file")
+    parser.add_argument("--compare", help="a previous json report")
+    args = parser.parse_args(argv)
+
+    params = {
+        "tables": args.tables,
+        "rows": args.rows,
+        "string_width": args.string_width,
+        "type_mix": args.type_mix,
+        "fk_chain": not args.no_fk_chain,
+        "null_ratio": args.null_ratio,
+        "seed": args.seed
+    }
+    with tempfile.TemporaryDirectory(prefix="dam_bench_") as tmp_dir:
+        db_path = args.db or os.path.join(tmp_dir, "bench.db")
+        if (args.db is None) or (not os.path.exists(db_path)):
+            gen_synthetic_db(db_path, **params)
+        results = run_benchmarks(
+            db_path,
+            args.benchmarks.split(","),
+            args.repeat,
+            not args.no_tracemalloc
+        )
+
+    report = {
+        "meta": {
+            "commit": _git_commit(),
+            "python": platform.python_version(),
+            "sqlalchemy": sqlalchemy.__version__,
+            "platform": platform.platform(),
+            "timestamp": datetime.datetime.now().isoformat(),
+            "params": params,
+            "repeat": args.repeat
+        },
+        "results": results
+    }  # type: Dict[str, Any]
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            report["comparison"] = compare_results(json.load(f), report)
+
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
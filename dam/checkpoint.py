@@ -0,0 +1,102 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# @Date    : 2026-10-18 11:03:26
+# @Author  : gwentmaster(1950251906@qq.com)
+# I regret in my life
+
+
+import os
+import pickle
+from typing import Any, Dict, Optional, Tuple
+
+
+class Checkpoint(object):
+    """导出进度,每批数据提交后保存到文件,重新运行时从上次提交的位置继续
+
+    Args:
+        path: 进度文件路径,文件存在时读取其中的进度
+        exporter: 导出函数名,如gen_json
+        output: 导出结果的绝对路径,gen_jsonl为jsonl文件所在目录
+
+    Attributes:
+        tables: 表名为键,值为如下字典
+            last: 最后一条已提交数据的主键值元组,尚未开始时为None
+            done: 该表是否已导出完毕
+        sink_state: 导出目标在最后一次提交后的状态,用于恢复写入位置
+        resumed: 是否读取到了上次运行留下的进度
+
+    Raises:
+        ValueError: 进度文件由其他导出函数或其他输出路径生成,或导出结果已不存在
+    """
+
+    def __init__(self, path: str, exporter: str, output: str):
+        self.path = path
+        self.exporter = exporter
+        self.output = output
+        self.tables = {}  # type: Dict[str, Dict[str, Any]]
+        self.sink_state = None  # type: Any
+        self.resumed = False
+        if os.path.exists(path):
+            with open(path, "rb") as f:
+                state = pickle.load(f)
+            if (
+                    (state.get("exporter") != exporter)
+                    or (state.get("output") != output)
+            ):
+                raise ValueError(
+                    f"checkpoint {path} belongs to "
+                    + f"{state.get('exporter')} {state.get('output')}, "
+                    + f"not {exporter} {output}"
+                )
+            if not os.path.exists(output):
+                raise ValueError(f"output of checkpoint {path} not found")
+            self.tables = state["tables"]
+            self.sink_state = state["sink"]
+            self.resumed = True
+
+    def is_done(self, table_key: str) -> bool:
+        return self.tables.get(table_key, {}).get("done", False)
+
+    def last_key(self, table_key: str) -> Optional[Tuple]:
+        return self.tables.get(table_key, {}).get("last")
+
+    def update(
+        self,
+        table_key: str,
+        last: Optional[Tuple],
+        sink_state: Any,
+        done: bool = False
+    ) -> None:
+        """记录一批数据已提交并保存到文件
+
+        Args:
+            table_key: 表名
+            last: 该批最后一条数据的主键值元组
+            sink_state: 导出目标当前的状态
+            done: 该表是否已导出完毕
+        """
+
+        self.tables[table_key] = {"last": last, "done": done}
+        self.sink_state = sink_state
+        self.save()
+
+    def save(self) -> None:
+        # 先写临时文件再替换,保证进度文件始终完整
+        with open(self.path + ".tmp", "wb") as f:
+            pickle.dump(
+                {
+                    "exporter": self.exporter,
+                    "output": self.output,
+                    "tables": self.tables,
+                    "sink": self.sink_state
+                },
+                f
+            )
+        os.replace(self.path + ".tmp", self.path)
+
+    def remove(self) -> None:
+        """导出全部完成后删除进度文件
+        """
+
+        if os.path.exists(self.path):
+            os.remove(self.path)
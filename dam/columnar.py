@@ -0,0 +1,281 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# @Date    : 2026-10-18 16:52:08
+# @Author  : gwentmaster(1950251906@qq.com)
+# I regret in my life
+
+
+import datetime
+import decimal
+import json
+import os
+import sys
+from array import array
+from typing import Any, BinaryIO, Callable, Dict, List, Optional, Tuple
+
+from sqlalchemy.schema import Table
+
+from analyser import analyse_table
+from data_export import _export_data, BaseSink
+from datastructures import Decimal
+from metrics import ExportMetrics
+
+
+_EPOCH = datetime.datetime(1970, 1, 1)
+_EPOCH_ORDINAL = _EPOCH.toordinal()
+_MICROSECOND = datetime.timedelta(microseconds=1)
+_BYTE_ORDER = "<" if sys.byteorder == "little" else ">"
+
+
+def _to_timestamp(value: datetime.datetime) -> int:
+    if value.tzinfo is not None:
+        value = value.astimezone(datetime.timezone.utc).replace(tzinfo=None)
+    return (value - _EPOCH) // _MICROSECOND
+
+
+def _fixed_encoding(
+    logical_type: str
+) -> Optional[Tuple[str, str, Callable[[Any], Any]]]:
+    """定长类型的编码方式
+
+    Returns:
+        (array的typecode, numpy的dtype, 转换函数),变长类型返回None
+    """
+
+    if logical_type == "int64":
+        return "q", f"{_BYTE_ORDER}i8", int
+    if logical_type == "uint64":
+        return "Q", f"{_BYTE_ORDER}u8", int
+    if logical_type == "float64":
+        return "d", f"{_BYTE_ORDER}f8", float
+    if logical_type == "bool":
+        return "B", "|u1", lambda value: 1 if value else 0
+    if logical_type == "date32":
+        return (
+            "i",
+            f"{_BYTE_ORDER}i4",
+            lambda value: value.toordinal() - _EPOCH_ORDINAL
+        )
+    if logical_type == "timestamp[us]":
+        return "q", f"{_BYTE_ORDER}i8", _to_timestamp
+    if logical_type.startswith("decimal64("):
+        scale = int(logical_type[:-1].split(",")[1])
+        places = decimal.Decimal((0, (1,), -scale))
+
+        def convert(value):
+            value = decimal.Decimal(str(value)).quantize(places)
+            return int(value.scaleb(scale))
+
+        return "q", f"{_BYTE_ORDER}i8", convert
+    return None
+
+
+class _Bitmap(object):
+    """按位写入的有效位图,第i行对应第i//8个字节的第i%8位(低位在前),1表示非NULL
+    """
+
+    def __init__(self, f: BinaryIO):
+        self.f = f
+        self.current = 0
+        self.count = 0
+
+    def extend(self, flags: List[bool]) -> None:
+        buffer = bytearray()
+        current = self.current
+        count = self.count
+        for flag in flags:
+            if flag:
+                current |= 1 << (count & 7)
+            count += 1
+            if (count & 7) == 0:
+                buffer.append(current)
+                current = 0
+        self.f.write(buffer)
+        self.current = current
+        self.count = count
+
+    def close(self) -> None:
+        if (self.count & 7) != 0:
+            self.f.write(bytes([self.current]))
+        self.f.close()
+
+
+class _ColumnWriter(object):
+    """单个字段的写入器
+
+    定长类型写入连续的data文件;字符串写入offsets文件(int64,共行数+1项)
+    和utf8编码的data文件;可为NULL的字段另有validity位图,NULL处填0或空串
+    """
+
+    def __init__(self, directory: str, index: int, column: Dict[str, Any]):
+        self.name = column["name"]
+        self.nullable = column["nullable"] is not False
+        self.logical_type = column["type"].to_columnar()
+        self.files = {"data": f"{index}.data"}  # type: Dict[str, str]
+        self.data = open(os.path.join(directory, self.files["data"]), "wb")
+
+        encoding = _fixed_encoding(self.logical_type)
+        self.offsets = None  # type: Optional[BinaryIO]
+        if encoding is None:
+            self.typecode = None  # type: Optional[str]
+            self.dtype = "|u1"
+            self.files["offsets"] = f"{index}.offsets"
+            self.offsets = open(
+                os.path.join(directory, self.files["offsets"]),
+                "wb"
+            )
+            self.offset = 0
+            array("q", [0]).tofile(self.offsets)
+            self.to_text = str  # type: Callable[[Any], str]
+            if isinstance(column["type"], Decimal):
+                # 与json导出一致,0写作0.0,防止str得到0E-8
+                self.to_text = column["type"].to_json_converter()
+        else:
+            self.typecode, self.dtype, self.convert = encoding
+
+        self.validity = None  # type: Optional[_Bitmap]
+        if self.nullable is True:
+            self.files["validity"] = f"{index}.validity"
+            self.validity = _Bitmap(
+                open(os.path.join(directory, self.files["validity"]), "wb")
+            )
+
+    def write(self, values: Tuple) -> None:
+        if self.validity is not None:
+            self.validity.extend([value is not None for value in values])
+
+        if self.typecode is not None:
+            convert = self.convert
+            array(self.typecode, [
+                0 if value is None else convert(value) for value in values
+            ]).tofile(self.data)
+            return
+
+        offsets = array("q")
+        chunks = []
+        offset = self.offset
+        for value in values:
+            if value is not None:
+                if isinstance(value, bytes):
+                    chunk = value
+                else:
+                    chunk = self.to_text(value).encode("utf-8")
+                chunks.append(chunk)
+                offset += len(chunk)
+            offsets.append(offset)
+        self.data.write(b"".join(chunks))
+        offsets.tofile(self.offsets)
+        self.offset = offset
+
+    def close(self) -> Dict[str, Any]:
+        self.data.close()
+        if self.offsets is not None:
+            self.offsets.close()
+        if self.validity is not None:
+            self.validity.close()
+        return {
+            "name": self.name,
+            "type": self.logical_type,
+            "nullable": self.nullable,
+            "dtype": self.dtype,
+            "offsets_dtype": (
+                None if self.offsets is None else f"{_BYTE_ORDER}i8"
+            ),
+            "files": self.files
+        }
+
+
+class ColumnarSink(BaseSink):
+    """列式导出,每张表一个目录,每个字段写入连续的二进制文件
+
+    目录中的header.json描述行数、字节序及各字段的类型和文件,
+    各文件可以直接用mmap或numpy.memmap按header中的dtype读取
+    """
+
+    def __init__(self, dialect: str, directory: str = "columnar"):
+        self.dialect = dialect
+        self.directory = directory
+        self.table = None  # type: Optional[Table]
+        self.writers = []  # type: List[_ColumnWriter]
+        self.rows = 0
+
+    def begin_table(self, table: Table) -> None:
+        table_directory = os.path.join(self.directory, table.name)
+        os.makedirs(table_directory, exist_ok=True)
+        result = analyse_table(table, self.dialect)
+        self.table = table
+        self.writers = [
+            _ColumnWriter(table_directory, i, column)
+            for i, column in enumerate(result["columns"])
+        ]
+        self.rows = 0
+
+    def write_rows(self, rows: List) -> None:
+        for writer, values in zip(self.writers, zip(*rows)):
+            writer.write(values)
+        self.rows += len(rows)
+
+    def end_table(self) -> None:
+        header = {
+            "table": self.table.name,
+            "rows": self.rows,
+            "byteorder": sys.byteorder,
+            "columns": [writer.close() for writer in self.writers]
+        }
+        path = os.path.join(self.directory, self.table.name, "header.json")
+        with open(path, "wb") as f:
+            f.write(json.dumps(
+                header,
+                ensure_ascii=False,
+                indent=2
+            ).encode("utf-8"))
+        self.writers = []
+
+    def close(self) -> None:
+        # 导出中断时关闭未完成的表的文件,该表目录中没有header.json
+        for writer in self.writers:
+            writer.close()
+        self.writers = []
+
+
+def gen_columnar(
+    tables: List[Table],
+    engine,
+    dialect: str,
+    batch_size: int = 1000,
+    directory: str = "columnar",
+    metrics: Optional[ExportMetrics] = None,
+    batch_bytes: Optional[int] = None
+) -> None:
+    """生成列式二进制文件,供分析任务按列读取
+
+    定长字段(整数、浮点、布尔、日期、时间、精度不超过18位的DECIMAL,
+    MySQL的UNSIGNED整数为uint64)
+    保存为可直接映射为数组的连续缓冲区,字符串保存为偏移量加数据两个缓冲区,
+    精度超过18位的DECIMAL按json导出的格式保存为字符串,
+    NULL由有效位图表示,各字段的编码由datastructures中的类型决定
+
+    Args:
+        tables: sqlalchemy通过反射获取的表
+        engine: 数据库连接
+        dialect: 数据库类型
+        batch_size: 每批读取的行数
+        directory: 输出目录,每张表一个子目录
+        metrics: 导出过程的统计
+        batch_bytes: 每批数据的字节数预算,指定时按各表的行宽决定每批读取的行数,
+                     batch_size不起作用
+    """
+
+    if metrics is not None:
+        metrics.begin_exporter("gen_columnar")
+    _export_data(
+        tables,
+        engine,
+        dialect,
+        ColumnarSink(dialect, directory=directory),
+        batch_size,
+        metrics=metrics,
+        batch_bytes=batch_bytes
+    )
+    if metrics is not None:
+        metrics.end_exporter("gen_columnar")
@@ -0,0 +1,217 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# @Date    : 2026-10-18 20:03:51
+# @Author  : gwentmaster(1950251906@qq.com)
+# I regret in my life
+
+
+import bz2
+import gzip
+import lzma
+import os
+import queue
+import shutil
+import threading
+from typing import Any, BinaryIO, List, Optional, Union
+
+
+# 各压缩方式对应的文件后缀
+COMPRESSION_SUFFIXES = {
+    "gzip": ".gz",
+    "bz2": ".bz2",
+    "lzma": ".xz"
+}
+# 写入的数据积累到该大小后再交给压缩器
+CHUNK_SIZE = 1024 * 1024
+# 压缩线程队列中最多等待的块数
+QUEUE_CHUNKS = 4
+
+
+class Compression(object):
+    """输出文件的压缩方式
+
+    Args:
+        method: 压缩方式,gzip、bz2或lzma
+        level: 压缩级别,gzip和bz2为1-9,lzma为0-9,为None时使用各自的默认值
+        threaded: 是否在单独的线程中压缩并写入文件,压缩时不阻塞数据的读取和编码
+
+    Raises:
+        TypeError: 不支持的压缩方式
+    """
+
+    def __init__(
+        self,
+        method: str,
+        level: Optional[int] = None,
+        threaded: bool = False
+    ):
+        if method not in COMPRESSION_SUFFIXES:
+            raise TypeError(f"no such compression: {method}")
+        self.method = method
+        self.level = level
+        self.threaded = threaded
+
+    @property
+    def suffix(self) -> str:
+        return COMPRESSION_SUFFIXES[self.method]
+
+    def _open(self, path: str, mode: str) -> BinaryIO:
+        if self.method == "gzip":
+            # mtime固定为0,相同的数据得到相同的文件
+            return gzip.GzipFile(
+                path,
+                mode,
+                compresslevel=9 if self.level is None else self.level,
+                mtime=0
+            )
+        if self.method == "bz2":
+            return bz2.BZ2File(
+                path,
+                mode,
+                compresslevel=9 if self.level is None else self.level
+            )
+        return lzma.LZMAFile(path, mode, preset=self.level)
+
+    def open(self, path: str, mode: str = "wb") -> "CompressedWriter":
+        """打开path加上压缩后缀的文件用于写入,mode为wb或ab
+
+        以ab打开时压缩数据作为新的一段追加在文件末尾,
+        gzip、bz2、lzma解压时都会依次读出各段
+        """
+
+        return CompressedWriter(
+            self._open(path + self.suffix, mode),
+            self.threaded
+        )
+
+
+class CompressedWriter(object):
+    """按块压缩写入的文件对象,支持write、flush、tell和close
+
+    写入的数据积累到CHUNK_SIZE后作为一块交给压缩器,
+    threaded为True时各块经有界队列交给单独的线程压缩并写入文件,
+    zlib、bz2、lzma压缩时会释放GIL,因此可以与读取、编码并行
+    """
+
+    def __init__(self, f: BinaryIO, threaded: bool = False):
+        self.f = f
+        self.buffer = bytearray()
+        self.size = 0
+        self.queue = None  # type: Optional[queue.Queue]
+        self.thread = None  # type: Optional[threading.Thread]
+        self.errors = []  # type: List[BaseException]
+        if threaded is True:
+            self.queue = queue.Queue(QUEUE_CHUNKS)
+            self.thread = threading.Thread(target=self._compress, daemon=True)
+            self.thread.start()
+
+    def __enter__(self) -> "CompressedWriter":
+        return self
+
+    def __exit__(self, *args: Any) -> None:
+        self.close()
+
+    def _compress(self) -> None:
+        while True:
+            chunk = self.queue.get()
+            if chunk is None:
+                return
+            if self.errors:
+                continue
+            try:
+                self.f.write(chunk)
+            except BaseException as e:
+                self.errors.append(e)
+
+    def _flush_chunk(self) -> None:
+        if self.errors:
+            raise self.errors[0]
+        chunk = bytes(self.buffer)
+        self.buffer.clear()
+        if self.queue is None:
+            self.f.write(chunk)
+        else:
+            self.queue.put(chunk)
+
+    def write(self, data: bytes) -> int:
+        self.buffer += data
+        self.size += len(data)
+        if len(self.buffer) >= CHUNK_SIZE:
+            self._flush_chunk()
+        return len(data)
+
+    def flush(self) -> None:
+        """将缓冲的数据交给压缩器,不要求压缩器立即输出,以免降低压缩率
+
+        返回后数据可能仍在压缩器或压缩线程的队列中,不能据此记录进度
+        """
+
+        if self.buffer:
+            self._flush_chunk()
+
+    def tell(self) -> int:
+        """已写入的未压缩数据的字节数
+        """
+
+        return self.size
+
+    def close(self) -> None:
+        if self.f is None:
+            return
+        try:
+            self.flush()
+        finally:
+            if self.thread is not None:
+                self.queue.put(None)
+                self.thread.join()
+                self.thread = None
+            self.f.close()
+            self.f = None
+        if self.errors:
+            raise self.errors[0]
+
+
+def get_compression(
+    compression: Union[None, str, Compression]
+) -> Optional[Compression]:
+    """将生成函数的compression参数统一为Compression,字符串表示使用默认级别的该方式
+    """
+
+    if isinstance(compression, str):
+        return Compression(compression)
+    return compression
+
+
+def open_output(
+    path: str,
+    compression: Optional[Compression] = None,
+    mode: str = "wb"
+) -> Union[BinaryIO, CompressedWriter]:
+    """打开输出文件,指定compression时文件名加上压缩后缀
+    """
+
+    if compression is None:
+        return open(path, mode)
+    return compression.open(path, mode)
+
+
+def output_path(path: str, compression: Optional[Compression] = None) -> str:
+    """open_output实际写入的文件名
+    """
+
+    if compression is None:
+        return path
+    return path + compression.suffix
+
+
+def compress_file(path: str, compression: Compression) -> str:
+    """按块将已生成的文件压缩为path加上压缩后缀的文件,完成后删除原文件
+
+    Returns:
+        压缩后的文件名
+    """
+
+    with open(path, "rb") as src, compression.open(path) as dst:
+        shutil.copyfileobj(src, dst, CHUNK_SIZE)
+    os.remove(path)
+    return output_path(path, compression)
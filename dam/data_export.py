@@ -7,21 +7,53 @@
 
 import decimal
 import json
+import os
+import pickle
+import queue
+import shutil
+import tempfile
+import threading
+import time
 from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
 from operator import itemgetter
-from typing import Dict, List, Set
+from typing import (
+    Any,
+    BinaryIO,
+    Callable,
+    Dict,
+    Iterator,
+    List,
+    Optional,
+    Set,
+    Tuple,
+    Union
+)
 
 from marshmallow import fields, Schema
-from sqlalchemy import create_engine
+from sqlalchemy import and_, create_engine, event, func, or_, select
 from sqlalchemy.dialects.mysql.base import MySQLIdentifierPreparer
 from sqlalchemy.dialects.sqlite.base import SQLiteIdentifierPreparer
-from sqlalchemy.orm import mapper
-from sqlalchemy.orm.session import Session
-from sqlalchemy.schema import MetaData, Table
+from sqlalchemy.schema import Column, Table
 
 
 from analyser import analyse_table
-from datastructures import Decimal
+from batching import BatchSizer
+from checkpoint import Checkpoint
+from compression import (
+    compress_file,
+    Compression,
+    get_compression,
+    open_output,
+    output_path
+)
+from datastructures import Decimal, SQLITE_COPY_DECIMAL, sqlite_copy_decimal
+from incremental import IncrementalOutput, table_fingerprint
+from metrics import ExportMetrics, timer
+from reflection import select_tables
+from serializer import gen_serializers, RowSerializer
+from snapshot import load_metadata
+from watermark import WatermarkStore
 
 # TODO  unique index
 
@@ -42,108 +74,206 @@ class MyJsonEncoder(json.JSONEncoder):
             return json.JSONEncoder.default(self, field)
 
 
-def gen_mysql_sql(tables: List[Table], dialect: str) -> None:
-    """生成MySQL建表语句
+def _orjson_encode() -> Callable[[Any], str]:
+    import orjson
+    return lambda obj: orjson.dumps(obj).decode("utf-8")
+
+
+def _ujson_encode() -> Callable[[Any], str]:
+    import ujson
+    return lambda obj: ujson.dumps(
+        obj,
+        ensure_ascii=False,
+        escape_forward_slashes=False
+    )
+
+
+# json编码后端,值为返回编码函数的函数;json为标准库的C实现,结果与json.dumps一致,
+# orjson和ujson需另外安装,速度更快,但不输出分隔符后的空格,
+# 浮点数的写法也可能不同,超出64位的整数无法编码
+JSON_BACKENDS = {
+    "json": lambda: MyJsonEncoder(ensure_ascii=False).encode,
+    "orjson": _orjson_encode,
+    "ujson": _ujson_encode
+}  # type: Dict[str, Callable[[], Callable[[Any], str]]]
+
+
+def get_json_encoder(backend: str = "json") -> Callable[[Any], str]:
+    """获取json编码函数
 
     Args:
-        tables: sqlalchemy通过反射获取的表
+        backend: 编码后端,见JSON_BACKENDS
+
+    Raises:
+        TypeError: 不支持的编码后端
     """
 
-    f = open("mysql_table.sql", "wb")
-    for table in tables:
-        result = analyse_table(table, dialect)
-        f.write((
-            f"DROP TABLE IF EXISTS {result['table']};\n"
-            + f"CREATE TABLE {result['table']}\n"
-            + "    (\n"
-        ).encode("utf-8"))
+    if backend not in JSON_BACKENDS:
+        raise TypeError(f"no such json backend: {backend}")
+    return JSON_BACKENDS[backend]()
 
-        first_column = True
-        primary_keys = []  # type: List[str]
-        name_length = max([len(c["name"]) for c in result["columns"]])
-        for column in sorted(result["columns"], key=itemgetter("name")):
-            name = column["name"]
-            if name in MYSQL_RESERVED_WORDS:
-                name = f"`{name}`"
-            if column["primary"] is True:
-                primary_keys.append(name)
-            column_string = name.ljust(name_length)
-            column_string += (" " + column["type"].to_mysql())
-            if column["nullable"] is False:
-                column_string += " NOT NULL\n"
-            else:
-                column_string += "\n"
-            if first_column is True:
-                column_string = " "*6 + column_string
-                first_column = False
-            else:
-                column_string = " "*4 + ", " + column_string
-            f.write(column_string.encode("utf-8"))
 
-        # 主键
-        if primary_keys:
-            f.write((
-                " " * 4
-                + ", PRIMARY KEY "
-                + f"({', '.join(primary_keys)})\n"
-            ).encode("utf-8"))
+def _mysql_table_sql(result: Dict[str, Any]) -> str:
+    """根据analyse_table的结果生成一张表的MySQL建表语句
+    """
 
-        # 索引
-        for index_name, col_name in result["indexes"]:
-            f.write((
-                " "*4
-                + ", KEY "
-                + f"{index_name} ({col_name})\n"
-            ).encode("utf-8"))
+    sql = (
+        f"DROP TABLE IF EXISTS {result['table']};\n"
+        + f"CREATE TABLE {result['table']}\n"
+        + "    (\n"
+    )
 
-        # 外键
-        for col_name, reference in result["foreign_keys"]:
-            reference = reference.split(".")
-            f.write((
-                " " * 4
-                + ", FOREIGN KEY "
-                + f"({col_name})"
-                + " REFERENCES "
-                + f"{reference[0]} ({reference[1]})\n"
-            ).encode("utf-8"))
+    first_column = True
+    primary_keys = []  # type: List[str]
+    name_length = max([len(c["name"]) for c in result["columns"]])
+    for column in sorted(result["columns"], key=itemgetter("name")):
+        name = column["name"]
+        if name in MYSQL_RESERVED_WORDS:
+            name = f"`{name}`"
+        if column["primary"] is True:
+            primary_keys.append(name)
+        column_string = name.ljust(name_length)
+        column_string += (" " + column["type"].to_mysql())
+        if column["nullable"] is False:
+            column_string += " NOT NULL\n"
+        else:
+            column_string += "\n"
+        if first_column is True:
+            column_string = " "*6 + column_string
+            first_column = False
+        else:
+            column_string = " "*4 + ", " + column_string
+        sql += column_string
+
+    # 主键
+    if primary_keys:
+        sql += (
+            " " * 4
+            + ", PRIMARY KEY "
+            + f"({', '.join(primary_keys)})\n"
+        )
 
-        f.write((" "*4 + ");" + "\n\n").encode("utf-8"))
+    # 索引
+    for index_name, col_name in result["indexes"]:
+        sql += (
+            " "*4
+            + ", KEY "
+            + f"{index_name} ({col_name})\n"
+        )
 
-    f.close()
+    # 外键
+    for col_name, reference in result["foreign_keys"]:
+        reference = reference.split(".")
+        sql += (
+            " " * 4
+            + ", FOREIGN KEY "
+            + f"({col_name})"
+            + " REFERENCES "
+            + f"{reference[0]} ({reference[1]})\n"
+        )
 
+    return sql + " "*4 + ");" + "\n\n"
 
-def gen_sqlite_sql(
+
+def gen_mysql_sql(
     tables: List[Table],
     dialect: str,
-    decimal_as_real: bool = False
+    compression: Union[None, str, Compression] = None,
+    metrics: Optional[ExportMetrics] = None,
+    incremental: bool = False
 ) -> None:
-    """生成SQLite建表语句
+    """生成MySQL建表语句
 
     Args:
         tables: sqlalchemy通过反射获取的表
-        decimal_as_real: 是否将DICIMAL字段用REAL表示,默认用TEXT表示
+        compression: 压缩方式,gzip、bz2、lzma或Compression,默认不压缩
+        metrics: 导出过程的统计,记录各表analyse阶段的耗时
+        incremental: 是否增量生成,各表前加上记录结构指纹的注释,
+                     只重新生成指纹变化的表,内容不变时不写入文件
+
+    Raises:
+        ValueError: 增量生成时指定了compression
+    """
+
+    if (incremental is True) and (compression is not None):
+        raise ValueError("compression is not supported when incremental")
+
+    if metrics is not None:
+        metrics.begin_exporter("gen_mysql_sql")
+    if incremental is True:
+        output = IncrementalOutput("mysql_table.sql", "--")
+        for table in tables:
+            fingerprint = table_fingerprint(table, "mysql", dialect)
+            body = output.previous_body(table.name, fingerprint)
+            if body is None:
+                with timer(metrics, "analyse", table.name):
+                    result = analyse_table(table, dialect)
+                body = _mysql_table_sql(result)
+            output.add(table.name, fingerprint, body)
+        output.write(separator="\n", terminator="\n")
+    else:
+        f = open_output("mysql_table.sql", get_compression(compression))
+        for table in tables:
+            with timer(metrics, "analyse", table.name):
+                result = analyse_table(table, dialect)
+            f.write(_mysql_table_sql(result).encode("utf-8"))
+        f.close()
+    if metrics is not None:
+        metrics.end_exporter("gen_mysql_sql")
+
+
+def _referenced_columns(tables: List[Table]) -> Dict[str, Set[str]]:
+    """找出被外键绑定的字段,SQLite中需为其添加唯一索引
+
+    只使用反射得到的外键,不需要先分析表结构
+
+    Args:
+        tables: sqlalchemy通过反射获取的表
+    """
+
+    unique_indexs = defaultdict(set)  # type: Dict[str, Set[str]]
+    for table in tables:
+        for column in table.columns:
+            for foreign_key in column.foreign_keys:
+                table_name, col_name = str(foreign_key.column).split(".")
+                unique_indexs[table_name].add(col_name)
+    return unique_indexs
+
+
+def _sqlite_ddl(
+    tables: List[Table],
+    dialect: str,
+    decimal_as_real: bool = False,
+    deferred: bool = False,
+    metrics: Optional[ExportMetrics] = None,
+    unique_indexs: Optional[Dict[str, Set[str]]] = None
+) -> Tuple[List[Tuple[str, str]], List[str]]:
+    """生成SQLite建表语句
+
+    deferred为True时被外键引用的字段不加UNIQUE,改为导入数据后创建唯一索引,
+    同时按table.indexes创建源表的索引,保留唯一性和全部字段
+
+    unique_indexs为_referenced_columns的结果,只生成部分表时需根据全部表计算后传入
+
+    Returns:
+        (各表的(DROP语句, CREATE语句), 导入数据后执行的建索引语句)
     """
 
     results = []
     for table in tables:
-        results.append(analyse_table(table, dialect))
+        with timer(metrics, "analyse", table.name):
+            results.append(analyse_table(table, dialect))
 
-    # 找出被外键绑定的字段,之后为其添加唯一索引
-    unique_indexs = defaultdict(set)  # type: Dict[str, Set[str]]
-    for result in results:
-        for _, foreign_key in result["foreign_keys"]:
-            table_name, col_name = foreign_key.split(".")
-            unique_indexs[table_name].add(col_name)
+    if unique_indexs is None:
+        unique_indexs = _referenced_columns(tables)
 
-    f = open("sqlite_table.sql", "wb")
-    for result in results:
+    table_sqls = []  # type: List[Tuple[str, str]]
+    index_sqls = []  # type: List[str]
+    index_names = set()  # type: Set[str]
+    for table, result in zip(tables, results):
 
         # 表开始
-        f.write((
-            f"DROP TABLE IF EXISTS {result['table']};\n"
-            + f"CREATE TABLE {result['table']}\n"
-            + "    (\n"
-        ).encode("utf-8"))
+        create = f"CREATE TABLE {result['table']}\n" + "    (\n"
 
         first_column = True
         name_length = max([len(c["name"]) for c in result["columns"]])
@@ -173,10 +303,17 @@ def gen_sqlite_sql(
 
             # 是否唯一索引
             if (
-                    (name in unique_indexs[result["table"]])
+                    (name in unique_indexs.get(result["table"], ()))
                     and (column["primary"] is False)
             ):
-                column_string += " UNIQUE"
+                if deferred is True:
+                    index_sqls.append(
+                        f"CREATE UNIQUE INDEX "
+                        + f"[{result['table']}_{column['name']}_unique] "
+                        + f"ON {result['table']} ({name})"
+                    )
+                else:
+                    column_string += " UNIQUE"
 
             # 能否为空
             if column["nullable"] is False:
@@ -191,86 +328,217 @@ def gen_sqlite_sql(
             else:
                 column_string = " "*4 + ", " + column_string
 
-            f.write(column_string.encode("utf-8"))
+            create += column_string
 
         # 主键
-        f.write((
-            " " * 4
-            + f", PRIMARY KEY ({', '.join(primaries)})\n"
-        ).encode("utf-8"))
+        if primaries:
+            create += (
+                " " * 4
+                + f", PRIMARY KEY ({', '.join(primaries)})\n"
+            )
 
         # 外键
         for col_name, reference in result["foreign_keys"]:
             _reference = reference.split(".")
-            f.write((
+            create += (
                 " " * 4
                 + ", FOREIGN KEY "
                 + f"({col_name})"
                 + " REFERENCES "
                 + f"{_reference[0]} ({_reference[1]})\n"
-            ).encode("utf-8"))
+            )
 
         # 表结束
-        f.write((" "*4 + ");" + "\n\n").encode("utf-8"))
+        create += " "*4 + ")"
+        table_sqls.append((f"DROP TABLE IF EXISTS {result['table']}", create))
+
+        # 源表的索引,SQLite中索引名在整个数据库内唯一,重名时加上表名
+        if deferred is True:
+            for index in sorted(table.indexes, key=lambda i: i.name or ""):
+                col_names = [
+                    f"[{column.name}]"
+                    if column.name in SQLITE_RESERVED_WORDS else column.name
+                    for column in index.columns
+                ]
+                index_name = index.name or "_".join(
+                    [result["table"]] + [c.name for c in index.columns]
+                )
+                if index_name in index_names:
+                    index_name = f"{result['table']}_{index_name}"
+                index_names.add(index_name)
+                index_sqls.append(
+                    ("CREATE UNIQUE" if index.unique else "CREATE")
+                    + f" INDEX [{index_name}] "
+                    + f"ON {result['table']} ({', '.join(col_names)})"
+                )
 
-    f.close()
+    return table_sqls, index_sqls
+
+
+def gen_sqlite_sql(
+    tables: List[Table],
+    dialect: str,
+    decimal_as_real: bool = False,
+    compression: Union[None, str, Compression] = None,
+    metrics: Optional[ExportMetrics] = None,
+    incremental: bool = False
+) -> None:
+    """生成SQLite建表语句
+
+    Args:
+        tables: sqlalchemy通过反射获取的表
+        decimal_as_real: 是否将DICIMAL字段用REAL表示,默认用TEXT表示
+        compression: 压缩方式,gzip、bz2、lzma或Compression,默认不压缩
+        metrics: 导出过程的统计,记录各表analyse阶段的耗时
+        incremental: 是否增量生成,各表前加上记录结构指纹的注释,
+                     只重新生成指纹变化的表,内容不变时不写入文件
+
+    Raises:
+        ValueError: 增量生成时指定了compression
+    """
+
+    if (incremental is True) and (compression is not None):
+        raise ValueError("compression is not supported when incremental")
+
+    if metrics is not None:
+        metrics.begin_exporter("gen_sqlite_sql")
+    if incremental is True:
+        # 其他表的外键决定字段是否加UNIQUE,由全部表的外键计算,只分析变化的表
+        unique_indexs = _referenced_columns(tables)
+
+        output = IncrementalOutput("sqlite_table.sql", "--")
+        fingerprints = [
+            table_fingerprint(
+                table,
+                "sqlite",
+                dialect,
+                decimal_as_real,
+                sorted(unique_indexs.get(table.name, ()))
+            )
+            for table in tables
+        ]
+        changed = [
+            table for table, fingerprint in zip(tables, fingerprints)
+            if output.previous_body(table.name, fingerprint) is None
+        ]
+        table_sqls, _ = _sqlite_ddl(
+            changed,
+            dialect,
+            decimal_as_real,
+            metrics=metrics,
+            unique_indexs=unique_indexs
+        )
+        bodies = {
+            table.name: f"{drop};\n{create};\n"
+            for table, (drop, create) in zip(changed, table_sqls)
+        }
+        for table, fingerprint in zip(tables, fingerprints):
+            body = output.previous_body(table.name, fingerprint)
+            if body is None:
+                body = bodies[table.name]
+            output.add(table.name, fingerprint, body)
+        output.write(separator="\n", terminator="\n")
+    else:
+        table_sqls, _ = _sqlite_ddl(
+            tables,
+            dialect,
+            decimal_as_real,
+            metrics=metrics
+        )
+
+        f = open_output("sqlite_table.sql", get_compression(compression))
+        for drop, create in table_sqls:
+            f.write(f"{drop};\n{create};\n\n".encode("utf-8"))
+        f.close()
+    if metrics is not None:
+        metrics.end_exporter("gen_sqlite_sql")
+
+
+def _schema_class(result: Dict[str, Any]) -> str:
+    """根据analyse_table的结果生成一张表的Schema定义
+    """
+
+    schema_name = "".join(
+        [x.capitalize() for x in result["table"].split("_")]
+    )
+    code = f"class {schema_name}Schema(Schema):\n\n"
+    for column in result["columns"]:
+        code += (
+            " " * 4
+            + column["name"]
+            + f" = {column['type'].to_marshmallow_str()}\n"
+        )
+    return code
 
 
 def gen_schemas(
     tables: List[Table],
     dialect: str,
-    to_file: bool = True
+    to_file: bool = True,
+    metrics: Optional[ExportMetrics] = None,
+    incremental: bool = False
 ) -> Dict[str, Schema]:
     """生成各表对应的marshmallow的Schema及定义这些Schema的py文件
 
     Args:
         tables: sqlalchemy通过反射获取的表
         to_file: 是否生成py文件
+        metrics: 导出过程的统计,记录各表analyse阶段的耗时
+        incremental: 是否增量生成py文件,各表前加上记录结构指纹的注释,
+                     只重新生成指纹变化的表,内容不变时不写入文件;
+                     返回的Schema仍需要每张表的分析结果,
+                     分析结果保存在table.info中,使用反射快照时不会重新分析
 
     Returns:
         表名为键,相应Schema为值的字典
     """
 
+    if metrics is not None:
+        metrics.begin_exporter("gen_schemas")
+    header = (
+        "# -*- coding: utf-8 -*-\n\n\n"
+        + "from marshmallow import fields, Schema\n\n\n"
+    )
     if to_file is True:
-        f = open("schemas.py", "wb")
-        f.write((
-            "# -*- coding: utf-8 -*-\n\n\n"
-            + "from marshmallow import fields, Schema\n\n\n"
-        ).encode("utf-8"))
+        if incremental is True:
+            output = IncrementalOutput("schemas.py", "#")
+        else:
+            f = open("schemas.py", "wb")
+            f.write(header.encode("utf-8"))
 
     schemas = {}  # type: Dict[str, Schema]
 
     last_table_num = len(tables) - 1
     for i, table in enumerate(tables):
         schema_dic = {}  # type: Dict[str, fields.Field]
-        result = analyse_table(table, dialect)
+        with timer(metrics, "analyse", table.name):
+            result = analyse_table(table, dialect)
         if to_file is True:
-            schema_name = "".join(
-                [x.capitalize() for x in result["table"].split("_")]
-            )
+            if incremental is True:
+                fingerprint = table_fingerprint(table, "schemas", dialect)
+                code = output.previous_body(table.name, fingerprint)
+                if code is None:
+                    code = _schema_class(result)
+                output.add(table.name, fingerprint, code)
+            else:
+                f.write(_schema_class(result).encode("utf-8"))
+                if i != last_table_num:
+                    f.write("\n\n".encode("utf-8"))
 
-            f.write((
-                f"class {schema_name}Schema(Schema):\n\n"
-            ).encode("utf-8"))
         for column in result["columns"]:
-            if to_file is True:
-                f.write((
-                    " " * 4
-                    + column["name"]
-                    + f" = {column['type'].to_marshmallow_str()}\n"
-                ).encode("utf-8"))
-
             schema_dic[column["name"]] = column["type"].to_marshmallow()
 
-        if (to_file is True) and (i != last_table_num):
-            f.write("\n\n".encode("utf-8"))
-
         schemas[result["table"]] = (
             Schema.from_dict(schema_dic)()  # type: ignore[arg-type]
         )
 
     if to_file is True:
-        f.close()
+        if incremental is True:
+            output.write(header, separator="\n\n")
+        else:
+            f.close()
+    if metrics is not None:
+        metrics.end_exporter("gen_schemas")
     return schemas
 
 
@@ -285,13 +553,87 @@ def _gen_models(metadata) -> None:
     f.close()
 
 
-def gen_models(tables: List[Table]) -> None:
+def _model_imports(table: Table, imports_dic: Dict[str, Set[str]]) -> None:
+    """将一张表的模型需要导入的字段类型加入imports_dic
+    """
+
+    for column in table.columns:
+        if isinstance(column.type, type):
+            type_name = column.type.__name__
+        else:
+            type_name = type(column.type).__name__
+        type_module = column.type.__module__
+        if type_module.startswith('sqlalchemy.dialects.'):
+            type_module = ".".join(type_module.split(".")[:3])
+        imports_dic[type_module].add(type_name)
+        if column.foreign_keys:
+            imports_dic["sqlalchemy"].add("ForeignKey")
+
+
+def _model_class(table: Table) -> str:
+    """生成一张表的sqlalchemy模型
+    """
+
+    table_string = ""
+    class_name = "".join(x.capitalize() for x in table.name.split("_"))
+    table_string += (
+        f"class {class_name}:\n\n"
+        + " "*4 + f"__tablename__ = \"{table.name}\"\n\n"
+    )
+
+    # 解析字段信息
+    column_dics = {}  # type: Dict[str, Dict]
+    for column in table.columns:
+        column_dics[column.name] = {
+            "type": repr(column.type),
+            "primary": column.primary_key,
+            "nullable": column.nullable,
+            "foreign_key": [
+                str(foreign_key.column)
+                for foreign_key in column.foreign_keys
+            ]
+        }
+
+    # 判断字段是否需要添加索引
+    for index in table.indexes:
+        for column in index.columns:
+            column_dics[column.name]["index"] = True
+
+    # 定入字段信息
+    for k, v in column_dics.items():
+        table_string += (
+            " " * 4
+            + f"{k} = Column({v['type']}"
+        )
+        if v["primary"] is True:
+            table_string += ", primary_key=True"
+        for foreign_key in v["foreign_key"]:
+            table_string += f", ForeignKey(\"{foreign_key}\")"
+        if (v["primary"] is not True) and (v.get("index", False) is True):
+            table_string += ", index=True"
+        if v["nullable"] is False:
+            table_string += ", nullable=False"
+        table_string += ")\n"
+
+    return table_string
+
+
+def gen_models(
+    tables: List[Table],
+    metrics: Optional[ExportMetrics] = None,
+    incremental: bool = False
+) -> None:
     """生成sqlalchemy模型文件
 
     Args:
         tables: 通过sqlalchemy反射获取的表
+        metrics: 导出过程的统计,只记录总耗时
+        incremental: 是否增量生成,各表前加上记录结构指纹的注释,
+                     只重新生成指纹变化的表,内容不变时不写入文件
     """
 
+    if metrics is not None:
+        metrics.begin_exporter("gen_models")
     template = (
         "# -*- coding: utf-8 -*-\n\n\n{imports}\n\n\n"
         + "{declarative}\n\n\n{models}"
@@ -299,7 +641,6 @@ def gen_models(tables: List[Table]) -> None:
 
     imports_dic = defaultdict(set)  # 需要导入的模块
     imports_dic["sqlalchemy"].add("Column")
-    import_foreign_key_flag = False
 
     # declarative语句
     imports_dic["sqlalchemy.ext.declarative"].add("declarative_base")
@@ -310,68 +651,22 @@ def gen_models(tables: List[Table]) -> None:
         + "metadata = Base.metadata  # type: MetaData"
     )
 
+    if incremental is True:
+        output = IncrementalOutput("models.py", "#")
     table_strings = []  # type: List[str]
     for table in tables:
-        table_string = ""
-        class_name = "".join(x.capitalize() for x in table.name.split("_"))
-        table_string += (
-            f"class {class_name}:\n\n"
-            + " "*4 + f"__tablename__ = \"{table.name}\"\n\n"
-        )
-
-        # 解析字段信息
-        column_dics = {}  # type: Dict[str, Dict]
-        for column in table.columns:
-
-            if isinstance(column.type, type):
-                type_name = column.type.__name__
-            else:
-                type_name = type(column.type).__name__
-            type_module = column.type.__module__
-            if type_module.startswith('sqlalchemy.dialects.'):
-                type_module = ".".join(type_module.split(".")[:3])
-            imports_dic[type_module].add(type_name)
-
-            column_dics[column.name] = {
-                "type": repr(column.type),
-                "primary": column.primary_key,
-                "nullable": column.nullable,
-                "foreign_key": [
-                    str(foreign_key.column)
-                    for foreign_key in column.foreign_keys
-                ]
-            }
-
-        # 判断字段是否需要添加索引
-        for index in table.indexes:
-            for column in index.columns:
-                column_dics[column.name]["index"] = True
-
-        # 定入字段信息
-        for k, v in column_dics.items():
-            table_string += (
-                " " * 4
-                + f"{k} = Column({v['type']}"
-            )
-            if v["primary"] is True:
-                table_string += ", primary_key=True"
-            for foreign_key in v["foreign_key"]:
-                import_foreign_key_flag = True
-                table_string += f", ForeignKey(\"{foreign_key}\")"
-            if (v["primary"] is not True) and (v.get("index", False) is True):
-                table_string += ", index=True"
-            if v["nullable"] is False:
-                table_string += ", nullable=False"
-            table_string += ")\n"
-
-        table_strings.append(table_string)
-
-    models = "\n\n".join(table_strings)
+        _model_imports(table, imports_dic)
+        if incremental is True:
+            fingerprint = table_fingerprint(table, "models")
+            table_string = output.previous_body(table.name, fingerprint)
+            if table_string is None:
+                table_string = _model_class(table)
+            output.add(table.name, fingerprint, table_string)
+        else:
+            table_strings.append(_model_class(table))
 
     # import语句整理
     imports = ""
-    if import_foreign_key_flag is True:
-        imports_dic["sqlalchemy"].add("ForeignKey")
     for key in sorted(imports_dic.keys()):
         imports += (
             f"from {key} import "
@@ -381,81 +676,1776 @@ def gen_models(tables: List[Table]) -> None:
     imports = imports[:-1]
 
     # 写入py文件
-    with open("models.py", "wb") as f:
-        f.write(template.format(
-            imports=imports,
-            declarative=declarative,
-            models=models
-        ).encode("utf-8"))
+    if incremental is True:
+        output.write(
+            template.format(
+                imports=imports,
+                declarative=declarative,
+                models=""
+            ),
+            separator="\n\n"
+        )
+    else:
+        with open("models.py", "wb") as f:
+            f.write(template.format(
+                imports=imports,
+                declarative=declarative,
+                models="\n\n".join(table_strings)
+            ).encode("utf-8"))
+    if metrics is not None:
+        metrics.end_exporter("gen_models")
 
 
-def gen_db(
+def _primary_columns(table: Table, dialect: str) -> List[Column]:
+    """根据analyse_table的结果获取主键字段,按主键定义的顺序排列
+    """
+
+    names = {
+        column["name"]
+        for column in analyse_table(table, dialect)["columns"]
+        if column["primary"] is True
+    }
+    return [
+        column for column in table.primary_key.columns
+        if column.name in names
+    ]
+
+
+def _after_clause(keys: List[Column], values: Tuple):
+    """生成按主键顺序位于values之后的条件,即(k1, k2, ...) > (v1, v2, ...)
+
+    展开为 k1 > v1 OR (k1 = v1 AND k2 > v2) OR ... 以兼容不支持行值比较的数据库
+    """
+
+    clauses = []
+    for i, key in enumerate(keys):
+        clauses.append(and_(
+            *[keys[j] == values[j] for j in range(i)],
+            key > values[i]
+        ))
+    return or_(*clauses)
+
+
+def _iter_batches(
+    connection,
+    table: Table,
+    batch_size: int,
+    keys: Optional[List[Column]] = None,
+    after: Optional[Tuple] = None,
+    until: Optional[Tuple] = None,
+    sizer: Optional[BatchSizer] = None
+) -> Iterator:
+    """分批读取表中数据,内存占用只与batch_size有关
+
+    未指定keys时使用服务端游标顺序读取;指定keys时按主键分页,
+    每批执行 WHERE pk > :last ORDER BY pk LIMIT n,可以从任意主键位置继续
+
+    Args:
+        connection: 数据库连接
+        table: sqlalchemy通过反射获取的表
+        batch_size: 每批读取的行数
+        keys: 用于分页的主键字段
+        after: 从该主键值之后开始读取
+        until: 读取到该主键值(包含)为止
+        sizer: 指定时每批的行数由sizer决定,batch_size不起作用
+
+    Yields:
+        每批读取到的行组成的列表
+    """
+
+    if not keys:
+        rows = connection.execution_options(stream_results=True).execute(
+            table.select()
+        )
+        try:
+            while True:
+                if sizer is not None:
+                    batch_size = sizer.batch_size()
+                batch = rows.fetchmany(batch_size)
+                if not batch:
+                    break
+                if sizer is not None:
+                    sizer.observe(batch)
+                yield batch
+        finally:
+            rows.close()
+        return
+
+    while True:
+        if sizer is not None:
+            batch_size = sizer.batch_size()
+        query = table.select().order_by(*keys).limit(batch_size)
+        if after is not None:
+            query = query.where(_after_clause(keys, after))
+        if until is not None:
+            query = query.where(~_after_clause(keys, until))
+        batch = connection.execute(query).fetchall()
+        if not batch:
+            break
+        if sizer is not None:
+            sizer.observe(batch)
+        yield batch
+        after = tuple(batch[-1][key] for key in keys)
+
+
+# 主键范围(after, until],None表示不限
+KeyRange = Tuple[Optional[Tuple], Optional[Tuple]]
+
+
+def _split_ranges(
+    connection,
+    table: Table,
+    dialect: str,
+    split_rows: int
+) -> List[Optional[KeyRange]]:
+    """将行数超过split_rows的表按主键拆分为多个范围,每个范围约split_rows行
+
+    单个整数主键按最小值和最大值等分,其余主键(包括复合主键)从上一个分位点起
+    以ORDER BY pk LIMIT 1 OFFSET n在主键索引上跳过约split_rows行取下一个分位点,
+    每次只读取一行,不需要在主进程中读出整张表的主键;
+    没有主键或无需拆分时返回[None],表示整表导出
+    """
+
+    keys = _primary_columns(table, dialect)
+    if not keys:
+        return [None]
+    count = connection.execute(
+        select([func.count()]).select_from(table)
+    ).scalar()
+    pieces = -(-count // split_rows)
+    if pieces <= 1:
+        return [None]
+
+    bounds = []  # type: List[Tuple]
+    low, high = None, None
+    if len(keys) == 1:
+        low, high = connection.execute(
+            select([func.min(keys[0]), func.max(keys[0])])
+        ).first()
+    if isinstance(low, int) and isinstance(high, int):
+        for i in range(1, pieces):
+            bounds.append((low + (high - low) * i // pieces,))
+    else:
+        # 第i个分位点为按主键排序后的第count * i // pieces行
+        position = 0
+        for i in range(1, pieces):
+            query = select(keys)
+            if bounds:
+                query = query.where(_after_clause(keys, bounds[-1]))
+            row = connection.execute(
+                query
+                .order_by(*keys)
+                .limit(1)
+                .offset(count * i // pieces - position - 1)
+            ).first()
+            if row is None:  # 统计行数后表中的数据被删除
+                break
+            bounds.append(tuple(row))
+            position = count * i // pieces
+
+    edges = [None]  # type: List[Optional[Tuple]]
+    for bound in bounds:
+        if bound != edges[-1]:
+            edges.append(bound)
+    edges.append(None)
+    return list(zip(edges[:-1], edges[1:]))
+
+
+class BaseSink(object):
+    """数据导出目标的基类
+
+    调用顺序为 open -> (begin_table -> write_rows* -> end_table)* -> close,
+    从检查点继续时以restore代替open,已导出一部分的表以resume_table代替begin_table,
+    增量导出时已有高水位的表以append_table代替begin_table
+    """
+
+    def open(self) -> None:
+        pass
+
+    def begin_table(self, table: Table) -> None:
+        raise NotImplementedError()
+
+    def write_rows(self, rows: List) -> None:
+        raise NotImplementedError()
+
+    def table_encoder(self, table: Table) -> Callable[[List], Any]:
+        """返回将该表的一批数据编码为write_encoded所需内容的函数
+
+        流水线导出时编码在单独的线程中进行,返回的函数不能依赖或修改sink的状态,
+        默认不编码,由write_rows完成全部工作
+        """
+
+        return lambda rows: rows
+
+    def write_encoded(self, data: Any) -> None:
+        """写入table_encoder返回的函数的编码结果
+        """
+
+        self.write_rows(data)
+
+    def end_table(self) -> None:
+        pass
+
+    def close(self) -> None:
+        pass
+
+    def checkpoint_state(self) -> Any:
+        """返回已写入数据的位置,保存在检查点中
+        """
+
+        return None
+
+    def restore(self, state: Any) -> None:
+        """打开导出目标并回到checkpoint_state返回的位置
+        """
+
+        raise NotImplementedError()
+
+    def resume_table(
+        self,
+        table: Table,
+        keys: List[Column],
+        after: Tuple
+    ) -> None:
+        """继续写入已导出一部分的表,after为已提交的最后一条数据的主键值
+        """
+
+        raise NotImplementedError()
+
+    def append_table(self, table: Table) -> None:
+        """在已有数据之后追加增量数据,增量数据可能是已有数据的新版本
+        """
+
+        raise NotImplementedError()
+
+
+def _json_rows_encoder(
+    serialize: RowSerializer,
+    encode: Callable[[Any], str],
+    separator: str,
+    terminator: str,
+    metrics: Optional[ExportMetrics] = None,
+    table_name: Optional[str] = None
+) -> Callable[[List], bytes]:
+    """返回将一批数据编码为json的函数,各条记录以separator分隔,末尾加上terminator
+
+    指定metrics时分两步进行,分别计入serialize和encode阶段
+    """
+
+    if metrics is None:
+        def encode_rows(rows: List) -> bytes:
+            return (
+                separator.join(map(encode, map(serialize, rows))) + terminator
+            ).encode("utf-8")
+
+        return encode_rows
+
+    def timed_encode_rows(rows: List) -> bytes:
+        start = time.perf_counter()
+        objs = list(map(serialize, rows))
+        serialized = time.perf_counter()
+        data = (separator.join(map(encode, objs)) + terminator).encode("utf-8")
+        metrics.add_time("serialize", serialized - start, table_name)
+        metrics.add_time("encode", time.perf_counter() - serialized, table_name)
+        return data
+
+    return timed_encode_rows
+
+
+class JsonSink(BaseSink):
+    """将所有表写入同一个json文件,结果与json.dumps整个字典一致
+
+    fragment为True时不写最外层的大括号,用于并行导出时生成单表片段,
+    指定compression时写入的文件为path加上压缩后缀,不能从检查点继续,
+    json_backend为JSON_BACKENDS中的编码后端
+    """
+
+    def __init__(
+        self,
+        serializers: Dict[str, RowSerializer],
+        path: str = "data.json",
+        fragment: bool = False,
+        compression: Optional[Compression] = None,
+        metrics: Optional[ExportMetrics] = None,
+        json_backend: str = "json"
+    ):
+        self.serializers = serializers
+        self.path = path
+        self.fragment = fragment
+        self.compression = compression
+        self.metrics = metrics
+        self.encode = get_json_encoder(json_backend)
+        self.f = None  # type: Optional[BinaryIO]
+        self.encode_rows = None  # type: Optional[Callable[[List], bytes]]
+        self.first_table = True
+        self.first_batch = True
+
+    def open(self) -> None:
+        self.f = open_output(self.path, self.compression)
+        if self.fragment is False:
+            self.f.write(b"{")
+        self.first_table = True
+
+    def begin_table(self, table: Table) -> None:
+        if self.first_table is False:
+            self.f.write(b", ")
+        self.f.write(f"{self.encode(table.name)}: [".encode("utf-8"))
+        self.encode_rows = self.table_encoder(table)
+        self.first_table = False
+        self.first_batch = True
+
+    def table_encoder(self, table: Table) -> Callable[[List], bytes]:
+        return _json_rows_encoder(
+            self.serializers[table.name],
+            self.encode,
+            ", ",
+            "",
+            self.metrics,
+            table.name
+        )
+
+    def write_rows(self, rows: List) -> None:
+        self.write_encoded(self.encode_rows(rows))
+
+    def write_encoded(self, data: bytes) -> None:
+        if self.first_batch is False:
+            self.f.write(b", ")
+        self.f.write(data)
+        self.first_batch = False
+
+    def end_table(self) -> None:
+        self.f.write(b"]")
+
+    def close(self) -> None:
+        if self.f is not None:
+            if self.fragment is False:
+                self.f.write(b"}")
+            self.f.close()
+            self.f = None
+
+    def checkpoint_state(self) -> Any:
+        self.f.flush()
+        return (self.f.tell(), self.first_table, self.first_batch)
+
+    def restore(self, state: Any) -> None:
+        offset, self.first_table, self.first_batch = state
+        self.f = open(self.path, "r+b")
+        self.f.truncate(offset)
+        self.f.seek(offset)
+
+    def resume_table(
+        self,
+        table: Table,
+        keys: List[Column],
+        after: Tuple
+    ) -> None:
+        self.encode_rows = self.table_encoder(table)
+
+
+class _JsonRowsSink(JsonSink):
+    """只写入以逗号分隔的各条记录,不写表名和中括号
+
+    用于并行导出时的分段文件,由_merge_json_parts按顺序拼接
+    """
+
+    def __init__(
+        self,
+        serializers: Dict[str, RowSerializer],
+        path: str,
+        json_backend: str = "json",
+        metrics: Optional[ExportMetrics] = None
+    ):
+        super().__init__(
+            serializers,
+            path=path,
+            fragment=True,
+            metrics=metrics,
+            json_backend=json_backend
+        )
+
+    def begin_table(self, table: Table) -> None:
+        self.encode_rows = self.table_encoder(table)
+        self.first_batch = True
+
+    def end_table(self) -> None:
+        pass
+
+
+class JsonLinesSink(BaseSink):
+    """每张表写入一个<表名>.jsonl文件,每行一条记录
+
+    指定compression时文件名加上压缩后缀,不能从检查点继续或增量导出,
+    json_backend为JSON_BACKENDS中的编码后端
+    """
+
+    def __init__(
+        self,
+        serializers: Dict[str, RowSerializer],
+        directory: str = ".",
+        compression: Optional[Compression] = None,
+        metrics: Optional[ExportMetrics] = None,
+        json_backend: str = "json"
+    ):
+        self.serializers = serializers
+        self.directory = directory
+        self.compression = compression
+        self.metrics = metrics
+        self.encode = get_json_encoder(json_backend)
+        self.f = None  # type: Optional[BinaryIO]
+        self.encode_rows = None  # type: Optional[Callable[[List], bytes]]
+        self.offset = 0
+
+    def begin_table(self, table: Table) -> None:
+        self.f = open_output(
+            os.path.join(self.directory, f"{table.name}.jsonl"),
+            self.compression
+        )
+        self.encode_rows = self.table_encoder(table)
+
+    def table_encoder(self, table: Table) -> Callable[[List], bytes]:
+        return _json_rows_encoder(
+            self.serializers[table.name],
+            self.encode,
+            "\n",
+            "\n",
+            self.metrics,
+            table.name
+        )
+
+    def write_rows(self, rows: List) -> None:
+        self.write_encoded(self.encode_rows(rows))
+
+    def write_encoded(self, data: bytes) -> None:
+        self.f.write(data)
+
+    def end_table(self) -> None:
+        self.f.close()
+        self.f = None
+
+    def close(self) -> None:
+        if self.f is not None:
+            self.f.close()
+            self.f = None
+
+    def checkpoint_state(self) -> Any:
+        if self.f is None:
+            return 0
+        self.f.flush()
+        return self.f.tell()
+
+    def restore(self, state: Any) -> None:
+        self.offset = state
+
+    def resume_table(
+        self,
+        table: Table,
+        keys: List[Column],
+        after: Tuple
+    ) -> None:
+        path = os.path.join(self.directory, f"{table.name}.jsonl")
+        if not os.path.exists(path):
+            raise ValueError(f"{path} of checkpoint not found")
+        self.f = open(path, "r+b")
+        self.f.truncate(self.offset)
+        self.f.seek(self.offset)
+        self.encode_rows = self.table_encoder(table)
+
+    def append_table(self, table: Table) -> None:
+        self.f = open_output(
+            os.path.join(self.directory, f"{table.name}.jsonl"),
+            self.compression,
+            "ab"
+        )
+        self.encode_rows = self.table_encoder(table)
+
+
+class SqliteSink(BaseSink):
+    """使用Core层的insert以executemany批量写入SQLite数据库,每批提交一次
+
+    upsert为True时使用INSERT OR REPLACE,主键相同的数据会被新数据覆盖,
+    并且begin_table会先清空表,用于增量导出时的全量重导;
+    bulk为True时每张表在一个事务中写入,不能用于检查点和增量导出,
+    用于关闭回滚日志的连接,中断时不回滚未提交的事务,db文件应由调用方删除
+    """
+
+    def __init__(self, sqlite_engine, upsert: bool = False, bulk: bool = False):
+        self.sqlite_engine = sqlite_engine
+        self.upsert = upsert
+        self.bulk = bulk
+        self.connection = None
+        self.transaction = None
+        self.insert = None
+        self.keys = []  # type: List[str]
+        self.restored = False
+
+    def open(self) -> None:
+        self.connection = self.sqlite_engine.connect()
+
+    def _prepare(self, table: Table) -> None:
+        self.insert = table.insert()
+        if self.upsert is True:
+            self.insert = self.insert.prefix_with("OR REPLACE")
+        self.keys = [column.key for column in table.columns]
+
+    def begin_table(self, table: Table) -> None:
+        self._prepare(table)
+
+        # 清除上次中断前已提交但未记入检查点的数据,或增量导出前的旧数据
+        if (self.restored is True) or (self.upsert is True):
+            with self.connection.begin():
+                self.connection.execute(table.delete())
+        if self.bulk is True:
+            self.transaction = self.connection.begin()
+
+    def write_rows(self, rows: List) -> None:
+        values = [dict(zip(self.keys, row)) for row in rows]
+        if self.transaction is not None:
+            self.connection.execute(self.insert, values)
+            return
+        with self.connection.begin():
+            self.connection.execute(self.insert, values)
+
+    def end_table(self) -> None:
+        if self.transaction is not None:
+            self.transaction.commit()
+            self.transaction = None
+
+    def close(self) -> None:
+        if self.transaction is not None:
+            if self.bulk is True:
+                # 没有回滚日志时ROLLBACK的结果未定义,直接丢弃连接
+                self.connection.invalidate()
+            else:
+                self.transaction.rollback()
+            self.transaction = None
+        if self.connection is not None:
+            self.connection.close()
+            self.connection = None
+
+    def restore(self, state: Any) -> None:
+        self.open()
+        self.restored = True
+
+    def resume_table(
+        self,
+        table: Table,
+        keys: List[Column],
+        after: Tuple
+    ) -> None:
+        self._prepare(table)
+        with self.connection.begin():
+            self.connection.execute(
+                table.delete().where(_after_clause(keys, after))
+            )
+
+    def append_table(self, table: Table) -> None:
+        self._prepare(table)
+
+
+class MultiSink(BaseSink):
+    """将每批数据同时交给多个导出目标,源数据只读取一次
+
+    流水线导出时各目标的编码在同一个编码线程中依次进行,不能从检查点继续或增量导出
+    """
+
+    def __init__(self, sinks: List[BaseSink]):
+        self.sinks = sinks
+
+    def open(self) -> None:
+        for sink in self.sinks:
+            sink.open()
+
+    def begin_table(self, table: Table) -> None:
+        for sink in self.sinks:
+            sink.begin_table(table)
+
+    def write_rows(self, rows: List) -> None:
+        for sink in self.sinks:
+            sink.write_rows(rows)
+
+    def table_encoder(self, table: Table) -> Callable[[List], Any]:
+        encoders = [sink.table_encoder(table) for sink in self.sinks]
+        return lambda rows: tuple(encoder(rows) for encoder in encoders)
+
+    def write_encoded(self, data: Any) -> None:
+        for sink, sink_data in zip(self.sinks, data):
+            sink.write_encoded(sink_data)
+
+    def end_table(self) -> None:
+        for sink in self.sinks:
+            sink.end_table()
+
+    def close(self) -> None:
+        """关闭所有目标,出错时仍关闭其余目标,之后抛出第一个错误
+        """
+
+        errors = []  # type: List[BaseException]
+        for sink in self.sinks:
+            try:
+                sink.close()
+            except BaseException as e:
+                errors.append(e)
+        if errors:
+            raise errors[0]
+
+
+def _timed_batches(
+    batches: Iterator[List],
+    metrics: Optional[ExportMetrics],
+    table_name: str
+) -> Iterator[List]:
+    """将读取每批数据的耗时计入query阶段
+    """
+
+    if metrics is None:
+        yield from batches
+        return
+    while True:
+        start = time.perf_counter()
+        rows = next(batches, None)
+        if rows is None:
+            return
+        metrics.add_time("query", time.perf_counter() - start, table_name)
+        yield rows
+
+
+def _export_actions(
+    connection,
+    tables: List[Table],
+    dialect: str,
+    sink: BaseSink,
+    batch_size: int,
+    checkpoint: Optional[Checkpoint] = None,
+    watermarks: Optional[WatermarkStore] = None,
+    encode: bool = False,
+    metrics: Optional[ExportMetrics] = None,
+    key_range: Optional[KeyRange] = None,
+    batch_bytes: Optional[int] = None
+) -> Iterator[Tuple]:
+    """逐表分批读取数据,生成需要对sink执行的操作
+
+    操作为以下元组之一,由_apply_action执行:
+        ("begin", table)、("resume", table, keys, after)、("append", table)、
+        ("rows", table, keys, after, rows)、("end", table)
+    encode为True时批次数据为table_encoder的函数与原始数据组成的元组,
+    操作名为"encode",编码后改为("encoded", table, keys, after, 编码结果, 行数)
+    """
+
+    for table in tables:
+        keys = None  # type: Optional[List[Column]]
+        after = None  # type: Optional[Tuple]
+        until = None  # type: Optional[Tuple]
+        if key_range is not None:
+            keys = _primary_columns(table, dialect)
+            after, until = key_range
+        elif checkpoint is not None:
+            if checkpoint.is_done(table.key):
+                continue
+            keys = _primary_columns(table, dialect)
+            after = checkpoint.last_key(table.key)
+        elif watermarks is not None:
+            keys = watermarks.keys(table, _primary_columns(table, dialect))
+            if keys:
+                after = watermarks.get(table.name, keys)
+
+        if (after is None) or (key_range is not None):
+            yield ("begin", table)
+        elif checkpoint is not None:
+            yield ("resume", table, keys, after)
+        else:
+            yield ("append", table)
+
+        sizer = None  # type: Optional[BatchSizer]
+        if batch_bytes is not None:
+            sizer = BatchSizer(analyse_table(table, dialect), batch_bytes)
+        encoder = sink.table_encoder(table) if encode is True else None
+        for rows in _timed_batches(
+                _iter_batches(
+                    connection,
+                    table,
+                    batch_size,
+                    keys,
+                    after,
+                    until,
+                    sizer
+                ),
+                metrics,
+                table.name
+        ):
+            if keys:
+                after = tuple(rows[-1][key] for key in keys)
+            if encoder is None:
+                yield ("rows", table, keys, after, rows)
+            else:
+                yield ("encode", table, keys, after, (encoder, rows))
+        yield ("end", table)
+
+
+def _encode_action(action: Tuple) -> Tuple:
+    """编码"encode"操作中的数据,其余操作原样返回
+    """
+
+    if action[0] != "encode":
+        return action
+    encoder, rows = action[4]
+    return ("encoded",) + action[1:4] + (encoder(rows), len(rows))
+
+
+def _apply_action(
+    sink: BaseSink,
+    action: Tuple,
+    checkpoint: Optional[Checkpoint] = None,
+    watermarks: Optional[WatermarkStore] = None,
+    metrics: Optional[ExportMetrics] = None
+) -> None:
+    """执行_export_actions生成的操作,写入数据后记录进度或高水位
+    """
+
+    kind, table = action[:2]
+    if kind in ("begin", "resume", "append") and (metrics is not None):
+        metrics.begin_table(table.name)
+    if kind == "begin":
+        sink.begin_table(table)
+    elif kind == "resume":
+        sink.resume_table(table, action[2], action[3])
+    elif kind == "append":
+        sink.append_table(table)
+    elif kind == "end":
+        sink.end_table()
+        if metrics is not None:
+            metrics.end_table(table.name)
+        if checkpoint is not None:
+            checkpoint.update(
+                table.key,
+                None,
+                sink.checkpoint_state(),
+                done=True
+            )
+    else:
+        action = _encode_action(action)
+        kind, _, keys, after, data = action[:5]
+        start = time.perf_counter()
+        if kind == "encoded":
+            sink.write_encoded(data)
+        else:
+            sink.write_rows(data)
+        if metrics is not None:
+            metrics.add_time("write", time.perf_counter() - start, table.name)
+            metrics.add_batch(
+                table.name,
+                action[5] if kind == "encoded" else len(data),
+                len(data) if isinstance(data, bytes) else None
+            )
+        if keys and (checkpoint is not None):
+            checkpoint.update(table.key, after, sink.checkpoint_state())
+        elif keys and (watermarks is not None):
+            sink.checkpoint_state()
+            watermarks.set(table.name, keys, after)
+
+
+# 流水线导出时各阶段之间队列的长度,队列满时上游阻塞
+PIPELINE_QUEUE_SIZE = 4
+
+
+class _PipelineStopped(Exception):
+    pass
+
+
+class _Pipeline(object):
+    """读取、编码、写入三个阶段的线程流水线
+
+    读取线程按顺序为每个操作编号,编码线程可以有多个,写入在调用run的线程中
+    按编号顺序执行,使sink的连接和文件始终在创建它们的线程中使用;
+    阶段之间为有界队列,另以信号量限制已读取但尚未写入的操作数,
+    某个编码线程卡住时其余线程编码完成的操作最多积压这么多;
+    任一线程出错时其余线程停止,错误在调用线程中抛出
+    """
+
+    def __init__(self, serialize_threads: int):
+        self.serialize_threads = serialize_threads
+        self.fetched = queue.Queue(PIPELINE_QUEUE_SIZE)  # type: queue.Queue
+        self.encoded = queue.Queue(PIPELINE_QUEUE_SIZE)  # type: queue.Queue
+        self.in_flight = threading.Semaphore(
+            serialize_threads + PIPELINE_QUEUE_SIZE
+        )
+        self.stopped = threading.Event()
+        self.errors = []  # type: List[BaseException]
+        self.threads = []  # type: List[threading.Thread]
+
+    def _put(self, q: queue.Queue, item: Any) -> None:
+        while True:
+            if self.stopped.is_set():
+                raise _PipelineStopped()
+            try:
+                q.put(item, timeout=0.1)
+                return
+            except queue.Full:
+                pass
+
+    def _get(self, q: queue.Queue) -> Any:
+        while True:
+            if self.stopped.is_set():
+                raise _PipelineStopped()
+            try:
+                return q.get(timeout=0.1)
+            except queue.Empty:
+                pass
+
+    def _acquire(self) -> None:
+        while not self.in_flight.acquire(timeout=0.1):
+            if self.stopped.is_set():
+                raise _PipelineStopped()
+
+    def _start(self, target: Callable, *args) -> None:
+        def run():
+            try:
+                target(*args)
+            except _PipelineStopped:
+                pass
+            except BaseException as e:
+                self.errors.append(e)
+                self.stopped.set()
+
+        thread = threading.Thread(target=run, daemon=True)
+        thread.start()
+        self.threads.append(thread)
+
+    def _fetch(self, engine, make_actions: Callable[[Any], Iterator]) -> None:
+        with engine.connect() as connection:
+            for i, action in enumerate(make_actions(connection)):
+                self._acquire()
+                self._put(self.fetched, (i, action))
+        for _ in range(self.serialize_threads):
+            self._put(self.fetched, None)
+
+    def _serialize(self) -> None:
+        while True:
+            item = self._get(self.fetched)
+            if item is None:
+                self._put(self.encoded, None)
+                return
+            i, action = item
+            self._put(self.encoded, (i, _encode_action(action)))
+
+    def run(
+        self,
+        engine,
+        make_actions: Callable[[Any], Iterator],
+        apply: Callable[[Tuple], None]
+    ) -> None:
+        """启动读取和编码线程,在当前线程中按顺序执行apply,每执行一个释放一个信号量
+        """
+
+        self._start(self._fetch, engine, make_actions)
+        for _ in range(self.serialize_threads):
+            self._start(self._serialize)
+
+        try:
+            pending = {}  # type: Dict[int, Tuple]
+            next_index = 0
+            finished = 0
+            while finished < self.serialize_threads:
+                item = self._get(self.encoded)
+                if item is None:
+                    finished += 1
+                    continue
+                pending[item[0]] = item[1]
+                # 多个编码线程完成的顺序不确定,按编号顺序写入
+                while next_index in pending:
+                    apply(pending.pop(next_index))
+                    self.in_flight.release()
+                    next_index += 1
+        except _PipelineStopped:
+            pass
+        finally:
+            self.stopped.set()
+            for thread in self.threads:
+                thread.join()
+        if self.errors:
+            raise self.errors[0]
+
+
+def _count_rows(
+    engine,
+    tables: List[Table],
+    metrics: Optional[ExportMetrics]
+) -> None:
+    """metrics.count_rows为True时统计各表的总行数
+    """
+
+    if (metrics is None) or (metrics.count_rows is False):
+        return
+    with engine.connect() as connection:
+        for table in tables:
+            with metrics.timer("count", table.name):
+                metrics.set_total_rows(table.name, connection.execute(
+                    select([func.count()]).select_from(table)
+                ).scalar())
+
+
+def _export_data(
     tables: List[Table],
     engine,
     dialect: str,
-    decimal_as_real: bool = False
-):
-    """生成db文件并将数据导入,会先生成SQLite建表语句
+    sink: BaseSink,
+    batch_size: int,
+    checkpoint: Optional[Checkpoint] = None,
+    watermarks: Optional[WatermarkStore] = None,
+    serialize_threads: int = 0,
+    metrics: Optional[ExportMetrics] = None,
+    key_range: Optional[KeyRange] = None,
+    batch_bytes: Optional[int] = None
+) -> None:
+    """逐表分批读取数据并交给sink写出
+
+    指定checkpoint时有主键的表按主键分页读取,每批写入后记录进度,
+    再次运行时跳过已完成的表并从最后提交的主键之后继续;
+    没有主键的表只在整表完成后记录进度,中断后整表重新导出
+
+    指定watermarks时为增量导出,有主键的表按排序字段分页读取,
+    只读取高水位之后的数据并追加写入,每批写入后更新高水位;
+    没有主键的表每次全量导出
+
+    serialize_threads大于0时读取、编码、写入在不同线程中流水线进行,
+    读取线程使用单独的连接,当前线程即写入线程,按顺序执行写入和进度记录
+
+    指定metrics时记录各批读取、编码、写入的耗时以及写入的行数和字节数,
+    不使用流水线时编码也与写入分开进行
+
+    指定key_range时只按主键顺序导出该范围内的数据,
+    用于将大表拆分后由多个进程分别导出
+
+    指定batch_bytes时每张表按字段类型估计行宽,据此决定每批读取的行数,
+    读取过程中再按实际数据的行宽调整,使每批数据的文本大小约为batch_bytes
 
     Args:
         tables: sqlalchemy通过反射获取的表
         engine: 数据库连接
-        decimal_as_real: 是否将原本为DECIMAL的字段在
-                         db文件中设为REAL,默认为TEXT
+        dialect: 数据库类型
+        sink: 数据导出目标
+        batch_size: 每批读取的行数
+        checkpoint: 导出进度
+        watermarks: 增量导出的高水位记录
+        serialize_threads: 流水线导出时的编码线程数,为0时不使用流水线
+        metrics: 导出过程的统计
+        key_range: 导出的主键范围
+        batch_bytes: 每批数据的字节数预算,指定时batch_size不起作用
     """
 
-    gen_sqlite_sql(tables, dialect, decimal_as_real)
+    _count_rows(engine, tables, metrics)
+
+    if (checkpoint is not None) and (checkpoint.resumed is True):
+        sink.restore(checkpoint.sink_state)
+    else:
+        sink.open()
+
+    def apply(action: Tuple) -> None:
+        _apply_action(sink, action, checkpoint, watermarks, metrics)
+
+    try:
+        if serialize_threads > 0:
+            _Pipeline(serialize_threads).run(
+                engine,
+                lambda connection: _export_actions(
+                    connection,
+                    tables,
+                    dialect,
+                    sink,
+                    batch_size,
+                    checkpoint,
+                    watermarks,
+                    encode=True,
+                    metrics=metrics,
+                    key_range=key_range,
+                    batch_bytes=batch_bytes
+                ),
+                apply
+            )
+        else:
+            with engine.connect() as connection:
+                for action in _export_actions(
+                        connection,
+                        tables,
+                        dialect,
+                        sink,
+                        batch_size,
+                        checkpoint,
+                        watermarks,
+                        encode=metrics is not None,
+                        metrics=metrics,
+                        key_range=key_range,
+                        batch_bytes=batch_bytes
+                ):
+                    apply(action)
+    finally:
+        sink.close()
+
+    if checkpoint is not None:
+        checkpoint.remove()
+
+
+def _sort_by_dependency(tables: List[Table]) -> List[Table]:
+    """按metadata.sorted_tables的顺序排列,保证被外键引用的表先导入
+    """
 
-    with open("sqlite_table.sql", encoding="utf-8") as f:
-        sqls = f.read()
+    if not tables:
+        return tables
+    order = {
+        table.key: i
+        for i, table in enumerate(tables[0].metadata.sorted_tables)
+    }
+    return sorted(tables, key=lambda table: order.get(table.key, len(order)))
 
-    sqlite_engine = create_engine("sqlite:///data.db")
-    sqlite_session = Session(bind=sqlite_engine)
-    for sql in sqls.split(";"):
-        sqlite_session.execute(sql + ";")
 
-    session = Session(bind=engine)
-    for i, table in enumerate(tables):
-        objs = session.query(table).all()
-        class_ = type(f"table_{i}", (), {})
-        mapper(class_, table)
-        objs = session.query(class_).all()
-        for obj in objs:
-            new_obj = class_()
-            for k, v in obj.__dict__.items():
-                if k == "_sa_instance_state":
-                    continue
-                setattr(new_obj, k, v)
-            sqlite_session.add(new_obj)
+def _engine_url(engine) -> str:
+    """获取包含密码的连接字符串,供工作进程重新建立连接
+    """
+
+    url = engine.url
+    if hasattr(url, "render_as_string"):
+        return url.render_as_string(hide_password=False)
+    return str(url)
+
+
+_worker_state = {}  # type: Dict[str, Any]
+
+
+def _init_worker(url: str, tables_state: bytes) -> None:
+    """工作进程初始化,每个进程使用自己的engine和连接
+    """
+
+    _worker_state["engine"] = create_engine(url)
+    _worker_state["tables"] = {
+        table.key: table for table in pickle.loads(tables_state)
+    }
+
+
+def _worker_pool(engine, tables: List[Table], workers: int):
+    """创建导出用的进程池
+    """
+
+    return ProcessPoolExecutor(
+        max_workers=workers,
+        initializer=_init_worker,
+        initargs=(_engine_url(engine), pickle.dumps(tables))
+    )
+
+
+def _export_table_json(
+    table_key: str,
+    dialect: str,
+    part_path: str,
+    batch_size: int,
+    serialize_threads: int = 0,
+    key_range: Optional[KeyRange] = None,
+    batch_bytes: Optional[int] = None,
+    json_backend: str = "json",
+    with_metrics: bool = False
+) -> Tuple[str, Optional[Dict[str, Any]]]:
+    """在工作进程中将单张表或其中一个主键范围的数据导出为json分段文件
+
+    Returns:
+        (分段文件路径, with_metrics为True时为该进程中ExportMetrics的report)
+    """
+
+    table = _worker_state["tables"][table_key]
+    metrics = ExportMetrics() if with_metrics is True else None
+    with timer(metrics, "analyse", table.name):
+        serializers = gen_serializers([table], dialect, for_json=True)
+    _export_data(
+        [table],
+        _worker_state["engine"],
+        dialect,
+        _JsonRowsSink(serializers, part_path, json_backend, metrics),
+        batch_size,
+        serialize_threads=serialize_threads,
+        metrics=metrics,
+        key_range=key_range,
+        batch_bytes=batch_bytes
+    )
+    return part_path, None if metrics is None else metrics.report()
+
+
+def _export_table_db(
+    table_key: str,
+    dialect: str,
+    part_path: str,
+    batch_size: int,
+    key_range: Optional[KeyRange] = None,
+    fast_load: bool = False,
+    batch_bytes: Optional[int] = None,
+    with_metrics: bool = False
+) -> Tuple[str, Optional[Dict[str, Any]]]:
+    """在工作进程中将单张表或其中一个主键范围的数据导入临时的db文件
+
+    临时表的字段不声明类型,数据合并进data.db时再按目标字段的类型亲和性转换,
+    结果与直接写入data.db一致
+
+    Returns:
+        (临时db文件路径, with_metrics为True时为该进程中ExportMetrics的report)
+    """
+
+    table = _worker_state["tables"][table_key]
+    metrics = ExportMetrics() if with_metrics is True else None
+    part_engine = _sqlite_engine(part_path, fast_load)
+    quote = part_engine.dialect.identifier_preparer.quote
+    with part_engine.begin() as connection:
+        connection.execute(
+            f"CREATE TABLE {quote(table.name)} ("
+            + ", ".join(quote(column.name) for column in table.columns)
+            + ")"
+        )
+    _export_data(
+        [table],
+        _worker_state["engine"],
+        dialect,
+        SqliteSink(part_engine, bulk=fast_load),
+        batch_size,
+        metrics=metrics,
+        key_range=key_range,
+        batch_bytes=batch_bytes
+    )
+    part_engine.dispose()
+    return part_path, None if metrics is None else metrics.report()
+
+
+def _merge_part_db(connection, table: Table, part_path: str) -> None:
+    """将工作进程生成的临时db文件中的数据合并进data.db
+    """
+
+    quote = connection.dialect.identifier_preparer.quote
+    name = quote(table.name)
+    columns = ", ".join(quote(column.name) for column in table.columns)
+    connection.execute("ATTACH DATABASE ? AS part", (part_path,))
+    try:
+        with connection.begin():
+            connection.execute(
+                f"INSERT INTO main.{name} ({columns}) "
+                + f"SELECT {columns} FROM part.{name}"
+            )
+    finally:
+        connection.execute("DETACH DATABASE part")
+    os.remove(part_path)
+
+
+def _sqlite_source_path(engine, dialect: str) -> Optional[str]:
+    """源数据库为SQLite文件时返回文件的绝对路径,否则返回None
+    """
+
+    if dialect != "sqlite":
+        return None
+    database = engine.url.database
+    if (not database) or (database == ":memory:"):
+        return None
+    if not os.path.isfile(database):
+        return None
+    return os.path.abspath(database)
+
+
+def _copy_sqlite_tables(
+    sqlite_engine,
+    source_path: str,
+    tables: List[Table],
+    dialect: str,
+    metrics: Optional[ExportMetrics] = None
+) -> None:
+    """ATTACH源SQLite文件后逐表执行INSERT INTO ... SELECT,数据不经过sqlalchemy
+
+    各字段按to_sqlite_copy转换,结果与逐行读出再写入一致,每张表一个事务;
+    DECIMAL字段由注册在连接上的sqlite_copy_decimal转换
+    """
+
+    with sqlite_engine.connect() as connection:
+        quote = connection.dialect.identifier_preparer.quote
+        connection.connection.create_function(
+            SQLITE_COPY_DECIMAL,
+            2,
+            sqlite_copy_decimal
+        )
+        connection.execute("ATTACH DATABASE ? AS source", (source_path,))
+        try:
+            for table in tables:
+                columns = analyse_table(table, dialect)["columns"]
+                names = ", ".join(quote(column["name"]) for column in columns)
+                values = ", ".join(
+                    column["type"].to_sqlite_copy(quote(column["name"]))
+                    for column in columns
+                )
+                if metrics is not None:
+                    metrics.begin_table(table.name)
+                with timer(metrics, "copy", table.name), connection.begin():
+                    rows = connection.execute(
+                        f"INSERT INTO main.{quote(table.name)} ({names}) "
+                        + f"SELECT {values} FROM source.{quote(table.name)}"
+                    ).rowcount
+                if metrics is not None:
+                    metrics.add_batch(table.name, rows)
+                    metrics.end_table(table.name)
+        finally:
+            connection.execute("DETACH DATABASE source")
+
+
+def _split_tables(
+    engine,
+    tables: List[Table],
+    dialect: str,
+    split_rows: Optional[int]
+) -> List[List[Optional[KeyRange]]]:
+    """获取各表拆分后的主键范围,split_rows为None时不拆分
+    """
+
+    if split_rows is None:
+        return [[None] for _ in tables]
+    with engine.connect() as connection:
+        return [
+            _split_ranges(connection, table, dialect, split_rows)
+            for table in tables
+        ]
+
+
+def _part_path(future, metrics: Optional[ExportMetrics]) -> str:
+    """等待工作进程完成,将其统计累加到metrics中,返回生成的分段文件路径
+    """
+
+    part_path, report = future.result()
+    if metrics is not None:
+        metrics.merge(report)
+    return part_path
+
+
+def _merge_json_parts(
+    parts: Iterator[Tuple[str, List[str]]],
+    path: str = "data.json",
+    compression: Optional[Compression] = None
+) -> None:
+    """按顺序将_JsonRowsSink生成的分段文件合并为完整的json文件,合并后删除分段
+
+    Args:
+        parts: 每项为表名以及该表按主键范围顺序排列的分段文件
+        path: 合并后的文件路径
+        compression: 合并时的压缩方式
+    """
+
+    encoder = MyJsonEncoder(ensure_ascii=False)
+    with open_output(path, compression) as f:
+        f.write(b"{")
+        for i, (table_name, part_paths) in enumerate(parts):
+            if i != 0:
+                f.write(b", ")
+            f.write(f"{encoder.encode(table_name)}: [".encode("utf-8"))
+            empty = True
+            for part_path in part_paths:
+                if os.path.getsize(part_path) > 0:
+                    if empty is False:
+                        f.write(b", ")
+                    with open(part_path, "rb") as part:
+                        shutil.copyfileobj(part, f)
+                    empty = False
+                os.remove(part_path)
+            f.write(b"]")
+        f.write(b"}")
+
+
+def _sqlite_engine(path: str, fast_load: bool = False):
+    """创建SQLite文件的engine
+
+    fast_load为True时每个连接关闭回滚日志并且不等待写入磁盘,
+    导入速度更快,但中断后db文件可能损坏,需要重新导出
+    """
+
+    sqlite_engine = create_engine(f"sqlite:///{path}")
+    if fast_load is True:
+        @event.listens_for(sqlite_engine, "connect")
+        def set_pragmas(dbapi_connection, connection_record):
+            cursor = dbapi_connection.cursor()
+            cursor.execute("PRAGMA journal_mode = OFF")
+            cursor.execute("PRAGMA synchronous = OFF")
+            cursor.close()
+
+    return sqlite_engine
+
+
+def _execute_sqlite_sqls(sqlite_engine, sqls: List[str]) -> None:
+    """在一个事务中依次执行SQLite语句
+    """
+
+    with sqlite_engine.begin() as connection:
+        for sql in sqls:
+            connection.execute(sql)
+
+
+def _load_checkpoint(
+    path: Optional[str],
+    exporter: str,
+    output: str,
+    workers: int,
+    compression: Optional[Compression] = None
+) -> Optional[Checkpoint]:
+    """读取导出进度,未指定路径时返回None
+
+    Args:
+        path: 进度文件路径
+        exporter: 导出函数名
+        output: 导出结果的路径,进度文件中记录其绝对路径
+        workers: 并行导出的进程数
+        compression: 压缩方式
+
+    Raises:
+        ValueError: 并行导出或压缩输出时不支持记录进度,
+                    或进度文件与本次导出的函数、输出路径不符
+    """
+
+    if path is None:
+        return None
+    if workers > 1:
+        raise ValueError("checkpoint is not supported when workers > 1")
+    if compression is not None:
+        raise ValueError("checkpoint is not supported when compressed")
+    return Checkpoint(path, exporter, os.path.abspath(output))
+
 
-    session.close()
-    sqlite_session.commit()
-    sqlite_session.close()
+def _load_watermarks(
+    tables: List[Table],
+    target: str,
+    path: str,
+    incremental: bool,
+    watermark_columns: Optional[Dict[str, str]],
+    checkpoint: Optional[str],
+    workers: int
+) -> Optional[WatermarkStore]:
+    """读取增量导出的高水位记录,非增量导出时返回None
+
+    Args:
+        tables: 导出的表
+        target: 导出目标的标识
+        path: 保存高水位的db文件路径
+        incremental: 是否增量导出
+        watermark_columns: 表名为键,更新时间字段名为值的字典
+        checkpoint: 进度文件路径
+        workers: 并行导出的进程数
+
+    Raises:
+        ValueError: 增量导出不支持同时记录进度或并行导出,
+                    或更新时间字段不存在、允许为空
+    """
 
+    if incremental is False:
+        return None
+    if checkpoint is not None:
+        raise ValueError("checkpoint is not supported when incremental")
+    if workers > 1:
+        raise ValueError("incremental is not supported when workers > 1")
+    watermarks = WatermarkStore(target, watermark_columns, path)
+    watermarks.check(tables)
+    return watermarks
 
-def gen_json(tables: List[Table], engine, dialect: str) -> None:
-    """生成json文件
+
+def gen_json(
+    tables: List[Table],
+    engine,
+    dialect: str,
+    batch_size: int = 1000,
+    workers: int = 1,
+    checkpoint: Optional[str] = None,
+    serialize_threads: int = 0,
+    compression: Union[None, str, Compression] = None,
+    metrics: Optional[ExportMetrics] = None,
+    split_rows: Optional[int] = None,
+    batch_bytes: Optional[int] = None,
+    json_backend: str = "json"
+) -> None:
+    """生成json文件,数据分批读取并直接写入文件,不会将整张表读入内存
 
     Args:
         tables: sqlalchemy通过反射获取的表
         engine: 数据库连接
+        batch_size: 每批读取的行数
+        workers: 并行导出的进程数,大于1时各表在进程池中分别导出后按原顺序合并
+        checkpoint: 进度文件路径,指定时每批写入后记录进度,
+                    中断后再次运行从上次的位置继续,
+                    进度文件属于其他导出或导出结果已被删除时抛出ValueError
+        serialize_threads: 编码线程数,大于0时读取、编码、写入分别在不同线程中
+                           流水线进行,各阶段之间为有界队列,结果不变
+        compression: 压缩方式,gzip、bz2、lzma或Compression,
+                     指定时边导出边压缩,生成data.json加压缩后缀的文件,
+                     不能与checkpoint同时使用
+        metrics: 导出过程的统计,并行导出时各工作进程的统计在其完成后累加
+        split_rows: 并行导出时将行数超过该值的表按主键拆分为每段约split_rows行,
+                    各段由不同进程导出后按顺序拼接,拆分的表按主键顺序输出
+        batch_bytes: 每批数据的字节数预算,指定时按各表的行宽决定每批读取的行数,
+                     batch_size不起作用
+        json_backend: json编码后端,默认为标准库,见JSON_BACKENDS
+
+    Raises:
+        ValueError: 未并行导出时指定了split_rows
     """
 
-    result = {}
-    schemas = gen_schemas(tables, to_file=False, dialect=dialect)
-    session = Session(bind=engine)
-    for table in tables:
-        name = table.name
-        objs = session.query(table).all()
-        result[name] = schemas[name].dump(objs, many=True)
-    session.close()
+    compression = get_compression(compression)
+    if (split_rows is not None) and (workers <= 1):
+        raise ValueError("split_rows is only supported when workers > 1")
+    if metrics is not None:
+        metrics.begin_exporter("gen_json")
+    if workers <= 1:
+        with timer(metrics, "analyse"):
+            serializers = gen_serializers(tables, dialect, for_json=True)
+        _export_data(
+            tables,
+            engine,
+            dialect,
+            JsonSink(
+                serializers,
+                compression=compression,
+                metrics=metrics,
+                json_backend=json_backend
+            ),
+            batch_size,
+            _load_checkpoint(
+                checkpoint,
+                "gen_json",
+                "data.json",
+                workers,
+                compression
+            ),
+            serialize_threads=serialize_threads,
+            metrics=metrics,
+            batch_bytes=batch_bytes
+        )
+        if metrics is not None:
+            metrics.end_exporter("gen_json")
+        return
+
+    _count_rows(engine, tables, metrics)
+    with tempfile.TemporaryDirectory(prefix="dam_", dir=".") as tmp_dir, \
+            _worker_pool(engine, tables, workers) as pool:
+        futures = [
+            [
+                pool.submit(
+                    _export_table_json,
+                    table.key,
+                    dialect,
+                    os.path.join(tmp_dir, f"{i}_{j}.json"),
+                    batch_size,
+                    serialize_threads,
+                    key_range,
+                    batch_bytes,
+                    json_backend,
+                    metrics is not None
+                )
+                for j, key_range in enumerate(ranges)
+            ]
+            for i, (table, ranges) in enumerate(zip(
+                tables,
+                _split_tables(engine, tables, dialect, split_rows)
+            ))
+        ]
+        _merge_json_parts(
+            (
+                (
+                    table.name,
+                    [_part_path(future, metrics) for future in table_futures]
+                )
+                for table, table_futures in zip(tables, futures)
+            ),
+            compression=compression
+        )
+    if metrics is not None:
+        metrics.end_exporter("gen_json")
+
+
+def gen_jsonl(
+    tables: List[Table],
+    engine,
+    dialect: str,
+    batch_size: int = 1000,
+    directory: str = ".",
+    checkpoint: Optional[str] = None,
+    incremental: bool = False,
+    watermark_columns: Optional[Dict[str, str]] = None,
+    serialize_threads: int = 0,
+    compression: Union[None, str, Compression] = None,
+    metrics: Optional[ExportMetrics] = None,
+    batch_bytes: Optional[int] = None,
+    json_backend: str = "json"
+) -> None:
+    """为每张表生成<表名>.jsonl文件,每行一条记录,便于下游按表并行处理
+
+    Args:
+        tables: sqlalchemy通过反射获取的表
+        engine: 数据库连接
+        batch_size: 每批读取的行数
+        directory: jsonl文件所在目录
+        checkpoint: 进度文件路径,指定时每批写入后记录进度,
+                    中断后再次运行从上次的位置继续,
+                    进度文件属于其他导出或导出结果已被删除时抛出ValueError
+        incremental: 是否增量导出,为True时只将上次导出之后新增的数据追加到
+                     jsonl文件末尾,被更新的数据会以新的一行追加,
+                     下游按主键取最后一行即可,高水位保存在当前目录的dam_state.db中
+        watermark_columns: 增量导出时使用的更新时间字段,表名为键,字段名为值,
+                           未配置的表以主键作为高水位,只能发现新增的数据,
+                           更新时间字段不能允许为空
+        serialize_threads: 编码线程数,大于0时读取、编码、写入分别在不同线程中
+                           流水线进行,各阶段之间为有界队列,结果不变
+        compression: 压缩方式,gzip、bz2、lzma或Compression,
+                     指定时jsonl文件名加上压缩后缀,
+                     不能与checkpoint和incremental同时使用
+        metrics: 导出过程的统计
+        batch_bytes: 每批数据的字节数预算,指定时按各表的行宽决定每批读取的行数,
+                     batch_size不起作用
+        json_backend: json编码后端,默认为标准库,见JSON_BACKENDS
+
+    Raises:
+        ValueError: 增量导出或记录进度时指定了压缩
+    """
+
+    compression = get_compression(compression)
+    # 压缩器中缓冲的数据在中断时会丢失,而高水位已经更新
+    if (compression is not None) and (incremental is True):
+        raise ValueError("incremental is not supported when compressed")
+    if metrics is not None:
+        metrics.begin_exporter("gen_jsonl")
+    with timer(metrics, "analyse"):
+        serializers = gen_serializers(tables, dialect, for_json=True)
+    watermarks = _load_watermarks(
+        tables,
+        f"jsonl:{os.path.abspath(directory)}",
+        "dam_state.db",
+        incremental,
+        watermark_columns,
+        checkpoint,
+        1
+    )
+    if watermarks is not None:
+        for table in tables:
+            path = os.path.join(directory, f"{table.name}.jsonl")
+            if not os.path.exists(output_path(path, compression)):
+                watermarks.delete(table.name)
+
+    _export_data(
+        tables,
+        engine,
+        dialect,
+        JsonLinesSink(
+            serializers,
+            directory=directory,
+            compression=compression,
+            metrics=metrics,
+            json_backend=json_backend
+        ),
+        batch_size,
+        _load_checkpoint(
+            checkpoint,
+            "gen_jsonl",
+            directory,
+            1,
+            compression
+        ),
+        watermarks,
+        serialize_threads,
+        metrics,
+        batch_bytes=batch_bytes
+    )
+    if metrics is not None:
+        metrics.end_exporter("gen_jsonl")
 
-    with open("data.json", "wb") as f:
-        f.write(json.dumps(
-            result,
-            ensure_ascii=False,
-            cls=MyJsonEncoder
-        ).encode("utf-8"))
+
+def gen_db(
+    tables: List[Table],
+    engine,
+    dialect: str,
+    decimal_as_real: bool = False,
+    batch_size: int = 1000,
+    workers: int = 1,
+    checkpoint: Optional[str] = None,
+    incremental: bool = False,
+    watermark_columns: Optional[Dict[str, str]] = None,
+    compression: Union[None, str, Compression] = None,
+    metrics: Optional[ExportMetrics] = None,
+    split_rows: Optional[int] = None,
+    fast_load: bool = False,
+    batch_bytes: Optional[int] = None
+):
+    """生成db文件并将数据导入,会先生成SQLite建表语句
+
+    Args:
+        tables: sqlalchemy通过反射获取的表
+        engine: 数据库连接
+        decimal_as_real: 是否将原本为DECIMAL的字段在
+                         db文件中设为REAL,默认为TEXT
+        batch_size: 每批读取、插入并提交的行数
+        workers: 并行导出的进程数,大于1时各表在进程池中分别导出到临时db文件,
+                 再按metadata.sorted_tables的顺序合并
+        checkpoint: 进度文件路径,指定时每批提交后记录进度,
+                    中断后再次运行从上次的位置继续,
+                    进度文件属于其他导出或data.db已被删除时抛出ValueError
+        incremental: 是否增量导出,为True且data.db已存在时只读取上次导出之后
+                     变化的数据,按主键写入(INSERT OR REPLACE)已有的data.db,
+                     高水位保存在data.db的dam_watermark表中,
+                     源库中新增的表在data.db中创建后全量导出
+        watermark_columns: 增量导出时使用的更新时间字段,表名为键,字段名为值,
+                           未配置的表以主键作为高水位,只能发现新增的数据,
+                           更新时间字段不能允许为空
+        compression: 压缩方式,gzip、bz2、lzma或Compression,
+                     指定时导入完成后将data.db压缩为加上压缩后缀的文件并删除data.db,
+                     不能与incremental同时使用
+        metrics: 导出过程的统计,并行导出时各工作进程的统计在其完成后累加,
+                 合并临时db文件的耗时计入copy阶段
+        split_rows: 并行导出时将行数超过该值的表按主键拆分为每段约split_rows行,
+                    各段由不同进程导入临时db文件后按顺序合并
+        fast_load: 快速导入,不生成sqlite_table.sql,先建立不含唯一约束的表,
+                   关闭回滚日志和同步写入后每张表在一个事务中导入,
+                   导入后再创建唯一索引和源表的索引并执行ANALYZE;
+                   中断时删除未完成的data.db,不能与checkpoint和incremental同时使用
+        batch_bytes: 每批数据的字节数预算,指定时按各表的行宽决定每批读取的行数,
+                     batch_size不起作用
+
+    Raises:
+        ValueError: 增量导出时指定了压缩,未并行导出时指定了split_rows,
+                    或快速导入时指定了checkpoint或incremental
+
+    源数据库为SQLite文件且不记录进度、不增量导出时,通过ATTACH DATABASE
+    在SQLite中直接复制各表,只有DECIMAL字段的值经python函数转换,
+    此时workers和split_rows不起作用
+    """
+
+    compression = get_compression(compression)
+    if (compression is not None) and (incremental is True):
+        raise ValueError("incremental is not supported when compressed")
+    if (split_rows is not None) and (workers <= 1):
+        raise ValueError("split_rows is only supported when workers > 1")
+    if (fast_load is True) and (checkpoint is not None):
+        raise ValueError("checkpoint is not supported when fast_load")
+    if (fast_load is True) and (incremental is True):
+        raise ValueError("incremental is not supported when fast_load")
+    if metrics is not None:
+        metrics.begin_exporter("gen_db")
+    progress = _load_checkpoint(checkpoint, "gen_db", "data.db", workers)
+    # 高水位保存在data.db中,需在创建WatermarkStore之前判断
+    exists = os.path.exists("data.db")
+    watermarks = _load_watermarks(
+        tables,
+        "db",
+        "data.db",
+        incremental,
+        watermark_columns,
+        checkpoint,
+        workers
+    )
+
+    with timer(metrics, "ddl"):
+        if fast_load is False:
+            gen_sqlite_sql(tables, dialect, decimal_as_real)
+        table_sqls, index_sqls = _sqlite_ddl(
+            tables,
+            dialect,
+            decimal_as_real,
+            deferred=fast_load
+        )
+
+    sqlite_engine = _sqlite_engine("data.db", fast_load)
+    if (
+            ((progress is None) or (progress.resumed is False))
+            and ((watermarks is None) or (exists is False))
+    ):
+        with timer(metrics, "ddl"):
+            _execute_sqlite_sqls(
+                sqlite_engine,
+                [sql for sqls in table_sqls for sql in sqls]
+            )
+        if watermarks is not None:
+            watermarks.delete()
+    elif watermarks is not None:
+        # 增量导出到已有的data.db时,只创建上次导出之后源库中新增的表
+        with sqlite_engine.connect() as connection:
+            existing = {
+                row[0] for row in connection.execute(
+                    "SELECT name FROM sqlite_master WHERE type = 'table'"
+                )
+            }
+        with timer(metrics, "ddl"):
+            _execute_sqlite_sqls(sqlite_engine, [
+                create
+                for table, (_, create) in zip(tables, table_sqls)
+                if table.name not in existing
+            ])
+
+    try:
+        tables = _sort_by_dependency(tables)
+        source_path = None  # type: Optional[str]
+        if (progress is None) and (watermarks is None):
+            source_path = _sqlite_source_path(engine, dialect)
+        if source_path is not None:
+            _copy_sqlite_tables(
+                sqlite_engine,
+                source_path,
+                tables,
+                dialect,
+                metrics
+            )
+        elif workers <= 1:
+            _export_data(
+                tables,
+                engine,
+                dialect,
+                SqliteSink(
+                    sqlite_engine,
+                    upsert=watermarks is not None,
+                    bulk=fast_load
+                ),
+                batch_size,
+                progress,
+                watermarks,
+                metrics=metrics,
+                batch_bytes=batch_bytes
+            )
+        else:
+            _count_rows(engine, tables, metrics)
+            with tempfile.TemporaryDirectory(
+                    prefix="dam_",
+                    dir="."
+            ) as tmp_dir, _worker_pool(engine, tables, workers) as pool:
+                futures = [
+                    (
+                        table,
+                        pool.submit(
+                            _export_table_db,
+                            table.key,
+                            dialect,
+                            os.path.join(tmp_dir, f"{i}_{j}.db"),
+                            batch_size,
+                            key_range,
+                            fast_load,
+                            batch_bytes,
+                            metrics is not None
+                        )
+                    )
+                    for i, (table, ranges) in enumerate(zip(
+                        tables,
+                        _split_tables(engine, tables, dialect, split_rows)
+                    ))
+                    for j, key_range in enumerate(ranges)
+                ]
+                with sqlite_engine.connect() as connection:
+                    for table, future in futures:
+                        part_path = _part_path(future, metrics)
+                        with timer(metrics, "copy", table.name):
+                            _merge_part_db(connection, table, part_path)
+
+        if fast_load is True:
+            with timer(metrics, "index"):
+                _execute_sqlite_sqls(sqlite_engine, index_sqls + ["ANALYZE"])
+    except BaseException:
+        sqlite_engine.dispose()
+        if fast_load is True:
+            # 关闭回滚日志时中断的导入无法回滚,data.db的内容不可用
+            os.remove("data.db")
+        raise
+    sqlite_engine.dispose()
+
+    if compression is not None:
+        with timer(metrics, "compress"):
+            compress_file("data.db", compression)
+    if metrics is not None:
+        metrics.end_exporter("gen_db")
 
 
 if __name__ == "__main__":
@@ -465,12 +2455,10 @@ if __name__ == "__main__":
         "sqlite:///"
     )
     dialect = "sqlite"
-    metadata = MetaData(bind=engine)
-    metadata.reflect()
-    tables = [
-        table for table in metadata.sorted_tables
-        if table.name not in ('alembic_version', 'migrate_version', "apscheduler_job")
-    ]
+    exclude = ["alembic_version", "migrate_version", "apscheduler_job"]
+    # 结构未变化时使用反射快照,反射前按表名过滤
+    metadata = load_metadata(engine, dialect, exclude=exclude)
+    tables = select_tables(metadata, exclude=exclude)
 
     """=================================schema=============================="""
     # gen_schemas(tables, dialect=dialect)
@@ -481,6 +2469,9 @@ if __name__ == "__main__":
     """=============================json数据=================================="""
     gen_json(tables, engine, dialect=dialect)
 
+    """============================jsonl数据=================================="""
+    # gen_jsonl(tables, engine, dialect=dialect)
+
     """==============================mysql建表语句============================="""
     gen_mysql_sql(tables, dialect=dialect)
 
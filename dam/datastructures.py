@@ -5,12 +5,80 @@
 # I regret in my life
 
 
-from typing import Optional
+import datetime
+import decimal
+import math
+from typing import Any, Callable, Optional
 
 from marshmallow import fields
 from sqlalchemy.sql.type_api import TypeEngine
 
 
+# MySQL字符串字面量需要转义的字符,与mysql_real_escape_string一致
+_MYSQL_STRING_ESCAPES = str.maketrans({
+    "\\": "\\\\",
+    "'": "\\'",
+    "\"": "\\\"",
+    "\0": "\\0",
+    "\n": "\\n",
+    "\r": "\\r",
+    "\x1a": "\\Z"
+})
+
+
+def quote_string(value: str, dialect: str) -> str:
+    """生成dialect数据库的字符串字面量
+
+    Raises:
+        TypeError: 不支持的数据库类型
+    """
+
+    if dialect == "mysql":
+        return "'" + value.translate(_MYSQL_STRING_ESCAPES) + "'"
+    elif dialect == "sqlite":
+        return "'" + value.replace("'", "''") + "'"
+    raise TypeError(f"no such dialect: {dialect}")
+
+
+def _non_finite_literal(value: Any, dialect: str) -> str:
+    """无穷大和NaN的SQL字面量,NaN写作NULL,SQLite中无穷大写作溢出的9e999
+
+    Args:
+        value: 非有限的float或Decimal
+
+    Raises:
+        ValueError: MySQL无法保存无穷大
+    """
+
+    if isinstance(value, decimal.Decimal):
+        if value.is_nan():
+            return "NULL"
+    elif math.isnan(value):
+        return "NULL"
+    if dialect == "sqlite":
+        return "9e999" if value > 0 else "-9e999"
+    raise ValueError(f"{value} is not supported by {dialect}")
+
+
+# SQLite之间直接复制时转换DECIMAL字段的函数名,由_copy_sqlite_tables注册
+SQLITE_COPY_DECIMAL = "dam_copy_decimal"
+# 10的该次方以内都能精确表示为浮点数
+MAX_EXACT_SCALE = 15
+
+
+def sqlite_copy_decimal(value: Any, scale: int) -> Any:
+    """与sqlalchemy读出Decimal时的"%.Nf"格式化一致,再转为写入时的浮点数
+
+    SQLite的ROUND和printf在各平台上的舍入方式不同,因此注册为python函数;
+    每次调用都要从SQLite回到python解释器,比SQL表达式慢得多,
+    因此Decimal.to_sqlite_copy只对小数位多于scale的浮点数调用
+    """
+
+    if not isinstance(value, (int, float)):
+        return value
+    return float("%.*f" % (scale, value))
+
+
 class BaseDataStructure(object):
 
     dialect = None  # type: Optional[str]
@@ -38,6 +106,36 @@ class BaseDataStructure(object):
     def to_marshmallow_str(self) -> str:
         raise NotImplementedError()
 
+    # 与to_marshmallow得到的字段序列化结果一致的转换函数,不处理None
+    def to_converter(self) -> Callable[[Any], Any]:
+        raise NotImplementedError()
+
+    # 导出json前的转换函数,结果只含json原生类型,编码时不会再调用default,不处理None
+    def to_json_converter(self) -> Callable[[Any], Any]:
+        return self.to_converter()
+
+    # 估计的单个值的文本字节数,用于按内存预算决定每批读取的行数
+    def estimate_width(self) -> int:
+        return 16
+
+    # 列式导出时的逻辑类型,决定该列的二进制编码
+    def to_columnar(self) -> str:
+        raise NotImplementedError()
+
+    # 导入dialect数据库时使用的文本形式,不处理None
+    def to_text_converter(self, dialect: str) -> Callable[[Any], str]:
+        raise NotImplementedError()
+
+    # dialect数据库的SQL字面量,默认为字符串,数值类型不加引号,不处理None
+    def to_literal_converter(self, dialect: str) -> Callable[[Any], str]:
+        convert = self.to_text_converter(dialect)
+        return lambda value: quote_string(convert(value), dialect)
+
+    # 在SQLite之间直接复制时读取源字段column的SQL表达式,
+    # 结果与经sqlalchemy读出再写入一致,默认原样复制
+    def to_sqlite_copy(self, column: str) -> str:
+        return column
+
 
 class Boolean(BaseDataStructure):
 
@@ -57,6 +155,38 @@ class Boolean(BaseDataStructure):
     def to_marshmallow_str(self) -> str:
         return "fields.Boolean()"
 
+    def to_converter(self) -> Callable[[Any], Any]:
+        truthy = fields.Boolean.truthy
+        falsy = fields.Boolean.falsy
+
+        def convert(value):
+            try:
+                if value in truthy:
+                    return True
+                if value in falsy:
+                    return False
+            except TypeError:
+                pass
+            return bool(value)
+
+        return convert
+
+    def estimate_width(self) -> int:
+        return 1
+
+    def to_columnar(self) -> str:
+        return "bool"
+
+    def to_text_converter(self, dialect: str) -> Callable[[Any], str]:
+        return lambda value: "1" if value else "0"
+
+    def to_literal_converter(self, dialect: str) -> Callable[[Any], str]:
+        return self.to_text_converter(dialect)
+
+    def to_sqlite_copy(self, column: str) -> str:
+        # sqlalchemy读出为bool后写入0或1
+        return f"({column} != 0)"
+
 
 class Date(BaseDataStructure):
 
@@ -76,6 +206,18 @@ class Date(BaseDataStructure):
     def to_marshmallow_str(self) -> str:
         return "fields.Date()"
 
+    def to_converter(self) -> Callable[[Any], Any]:
+        return datetime.date.isoformat
+
+    def estimate_width(self) -> int:
+        return 10
+
+    def to_columnar(self) -> str:
+        return "date32"
+
+    def to_text_converter(self, dialect: str) -> Callable[[Any], str]:
+        return datetime.date.isoformat
+
 
 class DateTime(BaseDataStructure):
 
@@ -95,6 +237,34 @@ class DateTime(BaseDataStructure):
     def to_marshmallow_str(self) -> str:
         return "fields.DateTime()"
 
+    def to_converter(self) -> Callable[[Any], Any]:
+        return lambda value: value.isoformat()
+
+    def estimate_width(self) -> int:
+        return 26
+
+    def to_columnar(self) -> str:
+        return "timestamp[us]"
+
+    def to_text_converter(self, dialect: str) -> Callable[[Any], str]:
+        if dialect == "sqlite":
+            # 与sqlalchemy在SQLite中保存DATETIME的格式一致
+            return lambda value: value.strftime("%Y-%m-%d %H:%M:%S.%f")
+        return lambda value: value.isoformat(" ")
+
+    def to_sqlite_copy(self, column: str) -> str:
+        # 统一为sqlalchemy保存DATETIME的格式,
+        # 小数部分与sqlalchemy的解析一致,取前6位并在左侧补0
+        fraction = (
+            f"CASE WHEN instr({column}, '.') > 0 "
+            + f"THEN substr({column}, instr({column}, '.') + 1, 6) "
+            + "ELSE '' END"
+        )
+        return (
+            f"strftime('%Y-%m-%d %H:%M:%S', {column}) "
+            + f"|| '.' || substr('000000' || {fraction}, -6)"
+        )
+
 
 class Decimal(BaseDataStructure):
 
@@ -118,6 +288,80 @@ class Decimal(BaseDataStructure):
     def to_marshmallow_str(self) -> str:
         return f"fields.Decimal(places={self.scale})"
 
+    def to_converter(self) -> Callable[[Any], Any]:
+        places = None  # type: Optional[decimal.Decimal]
+        if self.scale is not None:
+            places = decimal.Decimal((0, (1,), -self.scale))
+
+        def convert(value):
+            if value.__class__ is not decimal.Decimal:
+                value = decimal.Decimal(str(value))
+            if (places is not None) and value.is_finite():
+                value = value.quantize(places)
+            return value
+
+        return convert
+
+    def to_json_converter(self) -> Callable[[Any], Any]:
+        convert = self.to_converter()
+
+        def convert_json(value):
+            value = convert(value)
+            # 与MyJsonEncoder一致,0写作0.0,防止出现0E-8
+            return str(value) if value else "0.0"
+
+        return convert_json
+
+    def estimate_width(self) -> int:
+        # 符号和小数点各占一位
+        return (self.precision or 18) + 2
+
+    def to_columnar(self) -> str:
+        # 精度不超过18位时可以用64位整数保存放大10^scale倍后的值
+        if (
+                (self.precision is not None)
+                and (self.scale is not None)
+                and (self.precision <= 18)
+        ):
+            return f"decimal64({self.precision},{self.scale})"
+        return "utf8"
+
+    def to_text_converter(self, dialect: str) -> Callable[[Any], str]:
+        # 使用定点格式,避免出现0E-8这样的科学计数法
+        return lambda value: format(decimal.Decimal(str(value)), "f")
+
+    def to_literal_converter(self, dialect: str) -> Callable[[Any], str]:
+        convert = self.to_text_converter(dialect)
+
+        def convert_literal(value):
+            value = decimal.Decimal(str(value))
+            if not value.is_finite():
+                return _non_finite_literal(value, dialect)
+            return convert(value)
+
+        return convert_literal
+
+    def to_sqlite_copy(self, column: str) -> str:
+        # sqlalchemy按scale(未指定时为10位)读出Decimal,再以浮点数写入;
+        # 整数直接转为浮点数,不是数字的值原样写入。浮点数乘以10^scale后
+        # 为小于2^52的整数n时,格式化的结果就是n / 10^scale,
+        # 两者都能精确表示为浮点数,除法的结果与python解析该文本一致,
+        # 只有其余的浮点数需要调用sqlite_copy_decimal
+        scale = 10 if self.scale is None else self.scale
+        copy = (
+            f"CASE WHEN typeof({column}) = 'integer' "
+            + f"THEN CAST({column} AS REAL) "
+            + f"WHEN typeof({column}) <> 'real' THEN {column} "
+        )
+        if scale <= MAX_EXACT_SCALE:
+            scaled = f"{column} * {10 ** scale}"
+            copy += (
+                f"WHEN abs({scaled}) < {2 ** 52} "
+                + f"AND {scaled} = CAST({scaled} AS INTEGER) "
+                + f"THEN {scaled} / {10 ** scale} "
+            )
+        return copy + f"ELSE {SQLITE_COPY_DECIMAL}({column}, {scale}) END"
+
 
 class Float(BaseDataStructure):
 
@@ -137,6 +381,28 @@ class Float(BaseDataStructure):
     def to_marshmallow_str(self) -> str:
         return "fields.Float()"
 
+    def to_converter(self) -> Callable[[Any], Any]:
+        return float
+
+    def estimate_width(self) -> int:
+        return 16
+
+    def to_columnar(self) -> str:
+        return "float64"
+
+    def to_text_converter(self, dialect: str) -> Callable[[Any], str]:
+        return lambda value: repr(float(value))
+
+    def to_literal_converter(self, dialect: str) -> Callable[[Any], str]:
+
+        def convert_literal(value):
+            value = float(value)
+            if not math.isfinite(value):
+                return _non_finite_literal(value, dialect)
+            return repr(value)
+
+        return convert_literal
+
 
 class Integer(BaseDataStructure):
 
@@ -159,6 +425,24 @@ class Integer(BaseDataStructure):
     def to_marshmallow_str(self) -> str:
         return "fields.Integer()"
 
+    def to_converter(self) -> Callable[[Any], Any]:
+        return int
+
+    def estimate_width(self) -> int:
+        return self.length or 11
+
+    def to_columnar(self) -> str:
+        # MySQL的UNSIGNED BIGINT可能超出int64的范围
+        if getattr(self.raw_type, "unsigned", False) is True:
+            return "uint64"
+        return "int64"
+
+    def to_text_converter(self, dialect: str) -> Callable[[Any], str]:
+        return lambda value: str(int(value))
+
+    def to_literal_converter(self, dialect: str) -> Callable[[Any], str]:
+        return self.to_text_converter(dialect)
+
 
 class String(BaseDataStructure):
 
@@ -181,3 +465,23 @@ class String(BaseDataStructure):
 
     def to_marshmallow_str(self) -> str:
         return "fields.String()"
+
+    def to_converter(self) -> Callable[[Any], Any]:
+
+        def convert(value):
+            if value.__class__ is str:
+                return value
+            if isinstance(value, bytes):
+                return value.decode("utf-8")
+            return str(value)
+
+        return convert
+
+    def estimate_width(self) -> int:
+        return self.length or 255
+
+    def to_columnar(self) -> str:
+        return "utf8"
+
+    def to_text_converter(self, dialect: str) -> Callable[[Any], str]:
+        return self.to_converter()
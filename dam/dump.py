@@ -0,0 +1,410 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# @Date    : 2026-10-18 18:05:44
+# @Author  : gwentmaster(1950251906@qq.com)
+# I regret in my life
+
+
+import csv
+import os
+from operator import itemgetter
+from typing import (
+    Any,
+    BinaryIO,
+    Callable,
+    List,
+    Optional,
+    TextIO,
+    Tuple,
+    Union
+)
+
+from sqlalchemy.schema import Table
+
+from analyser import analyse_table
+from compression import Compression, get_compression, open_output
+from data_export import (
+    _export_data,
+    BaseSink,
+    MYSQL_RESERVED_WORDS,
+    SQLITE_RESERVED_WORDS
+)
+from metrics import ExportMetrics
+
+
+# LOAD DATA默认的转义规则,FIELDS ESCAPED BY '\\'
+_MYSQL_ESCAPES = str.maketrans({
+    "\\": "\\\\",
+    "\t": "\\t",
+    "\n": "\\n",
+    "\r": "\\r",
+    "\0": "\\0",
+    "\x1a": "\\Z"
+})
+NULL_MARKER = "\\N"
+# 导入SQLite时的临时表及其中记录各可为空字段是否为NULL的字段
+SQLITE_STAGE_TABLE = "_dam_stage"
+SQLITE_NULLS_COLUMN = "_dam_nulls"
+
+
+def _quote_name(name: str, target: str) -> str:
+    """保留字按gen_mysql_sql/gen_sqlite_sql的方式加引号
+    """
+
+    if (target == "mysql") and (name in MYSQL_RESERVED_WORDS):
+        return f"`{name}`"
+    if (target == "sqlite") and (name in SQLITE_RESERVED_WORDS):
+        return f"[{name}]"
+    return name
+
+
+def _sorted_columns(
+    table: Table,
+    dialect: str
+) -> List[Tuple[int, Any]]:
+    """按字段名排序的(字段在行中的位置, 字段信息)列表,与建表语句中的字段顺序一致
+    """
+
+    result = analyse_table(table, dialect)
+    return sorted(
+        enumerate(result["columns"]),
+        key=lambda item: item[1]["name"]
+    )
+
+
+class DelimitedSink(BaseSink):
+    """将每张表写入分隔符文本文件,并生成批量导入脚本
+
+    target为mysql时生成<表名>.tsv,使用LOAD DATA的默认规则:
+    字段以制表符分隔,反斜杠转义,NULL写作\\N;
+    target为sqlite时生成<表名>.csv(RFC 4180),供sqlite3的.import --csv导入,
+    CSV无法区分NULL和字符串,有可为空字段的表在最后加一列,
+    按顺序记录各可为空字段是否为NULL(1为NULL),NULL处写空串,
+    导入脚本先导入临时表,再据此转换为NULL插入目标表
+
+    两种文件的字段都按字段名排序,与mysql_table.sql、sqlite_table.sql的字段顺序一致
+    """
+
+    def __init__(
+        self,
+        dialect: str,
+        target: str = "mysql",
+        directory: str = "."
+    ):
+        if target not in ("mysql", "sqlite"):
+            raise TypeError(f"no such target: {target}")
+        self.dialect = dialect
+        self.target = target
+        self.directory = directory
+        self.f = None  # type: Optional[TextIO]
+        self.writer = None
+        self.getter = None  # type: Optional[Callable]
+        self.converters = []  # type: List[Callable[[Any], str]]
+        self.null_positions = []  # type: List[int]
+        self.scripts = []  # type: List[str]
+
+    def begin_table(self, table: Table) -> None:
+        columns = _sorted_columns(table, self.dialect)
+        self.getter = itemgetter(*[i for i, _ in columns])
+        self.converters = [
+            column["type"].to_text_converter(self.target)
+            for _, column in columns
+        ]
+        names = [
+            _quote_name(column["name"], self.target) for _, column in columns
+        ]
+        self.null_positions = [
+            i for i, (_, column) in enumerate(columns)
+            if column["nullable"] is not False
+        ]
+
+        suffix = "tsv" if self.target == "mysql" else "csv"
+        path = os.path.join(self.directory, f"{table.name}.{suffix}")
+        self.f = open(path, "w", encoding="utf-8", newline="")
+        table_name = _quote_name(table.name, self.target)
+
+        if self.target == "mysql":
+            self.writer = None
+            escaped_path = path.replace("\\", "\\\\").replace("'", "\\'")
+            self.scripts.append(
+                f"LOAD DATA LOCAL INFILE '{escaped_path}'\n"
+                + f"    INTO TABLE {table_name}\n"
+                + "    CHARACTER SET utf8mb4\n"
+                + "    FIELDS TERMINATED BY '\\t' ESCAPED BY '\\\\'\n"
+                + "    LINES TERMINATED BY '\\n'\n"
+                + f"    ({', '.join(names)});\n"
+            )
+        else:
+            self.writer = csv.writer(self.f, lineterminator="\n")
+            if not self.null_positions:
+                self.scripts.append(f".import --csv \"{path}\" {table.name}\n")
+                return
+            # 临时表的字段不声明类型,插入目标表时再按类型亲和性转换
+            values = list(names)
+            for flag, i in enumerate(self.null_positions, 1):
+                values[i] = (
+                    f"CASE WHEN substr({SQLITE_NULLS_COLUMN}, {flag}, 1) "
+                    + f"= '1' THEN NULL ELSE {names[i]} END"
+                )
+            self.scripts.append(
+                f"DROP TABLE IF EXISTS {SQLITE_STAGE_TABLE};\n"
+                + f"CREATE TABLE {SQLITE_STAGE_TABLE} "
+                + f"({', '.join(names + [SQLITE_NULLS_COLUMN])});\n"
+                + f".import --csv \"{path}\" {SQLITE_STAGE_TABLE}\n"
+                + f"INSERT INTO {table_name} ({', '.join(names)})\n"
+                + f"    SELECT {', '.join(values)}\n"
+                + f"    FROM {SQLITE_STAGE_TABLE};\n"
+                + f"DROP TABLE {SQLITE_STAGE_TABLE};\n"
+            )
+
+    def _values(self, row) -> Tuple:
+        values = self.getter(row)
+        if len(self.converters) == 1:
+            return (values,)
+        return values
+
+    def write_rows(self, rows: List) -> None:
+        converters = self.converters
+        if self.writer is not None:
+            null_positions = self.null_positions
+            records = []
+            for row in rows:
+                values = self._values(row)
+                record = [
+                    "" if value is None else convert(value)
+                    for convert, value in zip(converters, values)
+                ]
+                if null_positions:
+                    record.append("".join(
+                        "1" if values[i] is None else "0"
+                        for i in null_positions
+                    ))
+                records.append(record)
+            self.writer.writerows(records)
+            return
+
+        lines = []
+        for row in rows:
+            lines.append("\t".join(
+                NULL_MARKER if value is None
+                else convert(value).translate(_MYSQL_ESCAPES)
+                for convert, value in zip(converters, self._values(row))
+            ))
+        lines.append("")
+        self.f.write("\n".join(lines))
+
+    def end_table(self) -> None:
+        self.f.close()
+        self.f = None
+
+    def close(self) -> None:
+        if self.f is not None:
+            self.f.close()
+            self.f = None
+
+        script_path = f"{self.target}_load.sql"
+        with open(script_path, "wb") as f:
+            if self.target == "sqlite":
+                f.write(".bail on\n".encode("utf-8"))
+            f.write("\n".join(self.scripts).encode("utf-8"))
+
+
+def gen_load_files(
+    tables: List[Table],
+    engine,
+    dialect: str,
+    target: str = "mysql",
+    batch_size: int = 1000,
+    directory: str = ".",
+    metrics: Optional[ExportMetrics] = None,
+    batch_bytes: Optional[int] = None
+) -> None:
+    """生成批量导入用的数据文件及导入脚本
+
+    target为mysql时生成<表名>.tsv及mysql_load.sql(LOAD DATA LOCAL INFILE),
+    在执行mysql_table.sql后执行即可;
+    target为sqlite时生成<表名>.csv及sqlite_load.sql(.import --csv),
+    在sqlite3中执行sqlite_table.sql后.read sqlite_load.sql即可
+
+    Args:
+        tables: sqlalchemy通过反射获取的表
+        engine: 数据库连接
+        dialect: 数据库类型
+        target: 导入的目标数据库类型,mysql或sqlite
+        batch_size: 每批读取的行数
+        directory: 数据文件所在目录
+        metrics: 导出过程的统计
+        batch_bytes: 每批数据的字节数预算,指定时按各表的行宽决定每批读取的行数,
+                     batch_size不起作用
+    """
+
+    if metrics is not None:
+        metrics.begin_exporter("gen_load_files")
+    _export_data(
+        tables,
+        engine,
+        dialect,
+        DelimitedSink(dialect, target=target, directory=directory),
+        batch_size,
+        metrics=metrics,
+        batch_bytes=batch_bytes
+    )
+    if metrics is not None:
+        metrics.end_exporter("gen_load_files")
+
+
+# 数据文件的开头和结尾,关闭逐条提交和约束检查以加快回放
+_INSERT_HEADERS = {
+    "mysql": (
+        "SET NAMES utf8mb4;\n"
+        + "SET FOREIGN_KEY_CHECKS = 0;\n"
+        + "SET UNIQUE_CHECKS = 0;\n"
+        + "SET autocommit = 0;\n\n"
+    ),
+    "sqlite": "PRAGMA foreign_keys = OFF;\nBEGIN TRANSACTION;\n\n"
+}
+_INSERT_FOOTERS = {
+    "mysql": (
+        "COMMIT;\n"
+        + "SET UNIQUE_CHECKS = 1;\n"
+        + "SET FOREIGN_KEY_CHECKS = 1;\n"
+    ),
+    "sqlite": "COMMIT;\n"
+}
+
+
+class InsertSink(BaseSink):
+    """将数据写成mysqldump风格的多行INSERT语句
+
+    每条语句形如 INSERT INTO t (a, b) VALUES (...),(...); ,
+    单条语句的字节数不超过max_statement_bytes(单行数据本身超过时除外),
+    各值按datastructures中的类型生成对应数据库的字面量,
+    指定compression时写入的文件为path加上压缩后缀
+    """
+
+    def __init__(
+        self,
+        dialect: str,
+        target: str = "mysql",
+        max_statement_bytes: int = 1024 * 1024,
+        path: Optional[str] = None,
+        compression: Optional[Compression] = None
+    ):
+        if target not in ("mysql", "sqlite"):
+            raise TypeError(f"no such target: {target}")
+        self.dialect = dialect
+        self.target = target
+        self.max_statement_bytes = max_statement_bytes
+        self.path = path or f"{target}_data.sql"
+        self.compression = compression
+        self.f = None  # type: Optional[BinaryIO]
+        self.converters = []  # type: List[Callable[[Any], str]]
+        self.prefix = b""
+        self.values = []  # type: List[bytes]
+        self.size = 0
+
+    def open(self) -> None:
+        self.f = open_output(self.path, self.compression)
+        self.f.write(_INSERT_HEADERS[self.target].encode("utf-8"))
+
+    def begin_table(self, table: Table) -> None:
+        result = analyse_table(table, self.dialect)
+        self.converters = [
+            column["type"].to_literal_converter(self.target)
+            for column in result["columns"]
+        ]
+        names = [
+            _quote_name(column["name"], self.target)
+            for column in result["columns"]
+        ]
+        self.prefix = (
+            f"INSERT INTO {_quote_name(table.name, self.target)} "
+            + f"({', '.join(names)}) VALUES "
+        ).encode("utf-8")
+        self.values = []
+        self.size = len(self.prefix)
+
+    def _flush(self) -> None:
+        if self.values:
+            self.f.write(self.prefix + b",".join(self.values) + b";\n")
+        self.values = []
+        self.size = len(self.prefix)
+
+    def write_rows(self, rows: List) -> None:
+        converters = self.converters
+        for row in rows:
+            value = ("(" + ",".join(
+                "NULL" if item is None else convert(item)
+                for convert, item in zip(converters, row)
+            ) + ")").encode("utf-8")
+
+            # 加上分隔的逗号和结尾的分号换行
+            if self.values and (
+                    self.size + len(value) + 3 > self.max_statement_bytes
+            ):
+                self._flush()
+            self.values.append(value)
+            self.size += len(value) + 1
+
+    def end_table(self) -> None:
+        self._flush()
+        self.f.write(b"\n")
+
+    def close(self) -> None:
+        if self.f is not None:
+            self.f.write(_INSERT_FOOTERS[self.target].encode("utf-8"))
+            self.f.close()
+            self.f = None
+
+
+def gen_data_sql(
+    tables: List[Table],
+    engine,
+    dialect: str,
+    target: str = "mysql",
+    batch_size: int = 1000,
+    max_statement_bytes: int = 1024 * 1024,
+    compression: Union[None, str, Compression] = None,
+    metrics: Optional[ExportMetrics] = None,
+    batch_bytes: Optional[int] = None
+) -> None:
+    """生成mysqldump风格的数据文件<target>_data.sql,与建表语句配合回放
+
+    数据分批读取后写成多行INSERT语句,单条语句的大小受max_statement_bytes限制,
+    MySQL下应不超过服务端的max_allowed_packet
+
+    浮点数和DECIMAL中的NaN写作NULL,无穷大在SQLite中写作9e999,
+    MySQL无法保存无穷大,遇到时抛出ValueError
+
+    Args:
+        tables: sqlalchemy通过反射获取的表
+        engine: 数据库连接
+        dialect: 数据库类型
+        target: 回放的目标数据库类型,mysql或sqlite
+        batch_size: 每批读取的行数
+        max_statement_bytes: 单条INSERT语句的最大字节数
+        compression: 压缩方式,gzip、bz2、lzma或Compression,默认不压缩,
+                     压缩后的文件可以解压后直接通过管道回放
+        metrics: 导出过程的统计
+        batch_bytes: 每批数据的字节数预算,指定时按各表的行宽决定每批读取的行数,
+                     batch_size不起作用
+    """
+
+    if metrics is not None:
+        metrics.begin_exporter("gen_data_sql")
+    _export_data(
+        tables,
+        engine,
+        dialect,
+        InsertSink(
+            dialect,
+            target=target,
+            max_statement_bytes=max_statement_bytes,
+            compression=get_compression(compression)
+        ),
+        batch_size,
+        metrics=metrics,
+        batch_bytes=batch_bytes
+    )
+    if metrics is not None:
+        metrics.end_exporter("gen_data_sql")
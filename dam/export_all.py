@@ -0,0 +1,195 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# @Date    : 2026-10-18 23:58:02
+# @Author  : gwentmaster(1950251906@qq.com)
+# I regret in my life
+
+
+from typing import List, Optional, Union
+
+from sqlalchemy.schema import Table
+
+from analyser import analyse_table
+from columnar import ColumnarSink
+from compression import compress_file, Compression, get_compression
+from data_export import (
+    _copy_sqlite_tables,
+    _execute_sqlite_sqls,
+    _export_data,
+    _sort_by_dependency,
+    _sqlite_ddl,
+    _sqlite_engine,
+    _sqlite_source_path,
+    BaseSink,
+    gen_models,
+    gen_mysql_sql,
+    gen_schemas,
+    gen_sqlite_sql,
+    JsonLinesSink,
+    JsonSink,
+    MultiSink,
+    SqliteSink
+)
+from dump import DelimitedSink, InsertSink
+from metrics import ExportMetrics, timer
+from serializer import gen_serializers
+
+
+# 只依赖表结构的产物,与对应生成函数的输出相同
+CODE_ARTIFACTS = ("mysql_sql", "sqlite_sql", "schemas", "models")
+# 需要读取数据的产物,共用一次数据读取
+DATA_ARTIFACTS = ("json", "jsonl", "db", "load_files", "data_sql", "columnar")
+
+
+def gen_all(
+    tables: List[Table],
+    engine,
+    dialect: str,
+    artifacts: List[str],
+    decimal_as_real: bool = False,
+    batch_size: int = 1000,
+    target: str = "mysql",
+    serialize_threads: int = 0,
+    compression: Union[None, str, Compression] = None,
+    metrics: Optional[ExportMetrics] = None,
+    batch_bytes: Optional[int] = None,
+    json_backend: str = "json"
+) -> None:
+    """一次生成多个产物,各表只分析一次,数据只读取一次并同时写入各导出目标
+
+    产物及对应的生成函数:
+        mysql_sql: gen_mysql_sql
+        sqlite_sql: gen_sqlite_sql
+        schemas: gen_schemas
+        models: gen_models
+        json: gen_json
+        jsonl: gen_jsonl
+        db: gen_db,不生成sqlite_table.sql,需要时同时指定sqlite_sql
+        load_files: dump.gen_load_files
+        data_sql: dump.gen_data_sql
+        columnar: columnar.gen_columnar
+
+    包含db时各表按metadata.sorted_tables的顺序导出,data.json中各表的顺序随之改变;
+    源数据库为SQLite文件且db是唯一需要读取数据的产物时通过ATTACH DATABASE直接复制,
+    还有其他需要读取数据的产物时db与它们共用同一次读取,源数据只读取一次
+
+    Args:
+        tables: sqlalchemy通过反射获取的表
+        engine: 数据库连接
+        dialect: 数据库类型
+        artifacts: 需要生成的产物
+        decimal_as_real: 是否将DECIMAL字段在SQLite中设为REAL,默认为TEXT
+        batch_size: 每批读取的行数
+        target: load_files和data_sql的目标数据库类型,mysql或sqlite
+        serialize_threads: 编码线程数,大于0时读取、编码、写入分别在不同线程中
+                           流水线进行
+        compression: 压缩方式,gzip、bz2、lzma或Compression,
+                     用于建表语句、json、jsonl、data_sql及data.db
+        metrics: 导出过程的统计
+        batch_bytes: 每批数据的字节数预算,指定时按各表的行宽决定每批读取的行数,
+                     batch_size不起作用
+        json_backend: json和jsonl的编码后端,默认为标准库,见JSON_BACKENDS
+
+    Raises:
+        TypeError: 不支持的产物
+    """
+
+    for artifact in artifacts:
+        if artifact not in CODE_ARTIFACTS + DATA_ARTIFACTS:
+            raise TypeError(f"no such artifact: {artifact}")
+
+    if metrics is not None:
+        metrics.begin_exporter("gen_all")
+    compression = get_compression(compression)
+
+    # 分析结果保存在table.info中,之后各生成函数直接使用
+    for table in tables:
+        with timer(metrics, "analyse", table.name):
+            analyse_table(table, dialect)
+
+    with timer(metrics, "ddl"):
+        if "mysql_sql" in artifacts:
+            gen_mysql_sql(tables, dialect, compression)
+        if "sqlite_sql" in artifacts:
+            gen_sqlite_sql(tables, dialect, decimal_as_real, compression)
+        if "schemas" in artifacts:
+            gen_schemas(tables, dialect)
+        if "models" in artifacts:
+            gen_models(tables)
+
+    sinks = []  # type: List[BaseSink]
+    if ("json" in artifacts) or ("jsonl" in artifacts):
+        serializers = gen_serializers(tables, dialect, for_json=True)
+    if "json" in artifacts:
+        sinks.append(JsonSink(
+            serializers,
+            compression=compression,
+            metrics=metrics,
+            json_backend=json_backend
+        ))
+    if "jsonl" in artifacts:
+        sinks.append(JsonLinesSink(
+            serializers,
+            compression=compression,
+            metrics=metrics,
+            json_backend=json_backend
+        ))
+    if "load_files" in artifacts:
+        sinks.append(DelimitedSink(dialect, target=target))
+    if "data_sql" in artifacts:
+        sinks.append(InsertSink(
+            dialect,
+            target=target,
+            compression=compression
+        ))
+    if "columnar" in artifacts:
+        sinks.append(ColumnarSink(dialect))
+
+    sqlite_engine = None
+    source_path = None  # type: Optional[str]
+    if "db" in artifacts:
+        tables = _sort_by_dependency(tables)
+        with timer(metrics, "ddl"):
+            table_sqls, _ = _sqlite_ddl(tables, dialect, decimal_as_real)
+            sqlite_engine = _sqlite_engine("data.db")
+    try:
+        if sqlite_engine is not None:
+            with timer(metrics, "ddl"):
+                _execute_sqlite_sqls(
+                    sqlite_engine,
+                    [sql for sqls in table_sqls for sql in sqls]
+                )
+            # 其他产物已需读取数据时db共用该次读取,不再另外复制
+            if not sinks:
+                source_path = _sqlite_source_path(engine, dialect)
+            if source_path is None:
+                sinks.append(SqliteSink(sqlite_engine))
+
+        if sinks:
+            _export_data(
+                tables,
+                engine,
+                dialect,
+                sinks[0] if len(sinks) == 1 else MultiSink(sinks),
+                batch_size,
+                serialize_threads=serialize_threads,
+                metrics=metrics,
+                batch_bytes=batch_bytes
+            )
+        if source_path is not None:
+            _copy_sqlite_tables(
+                sqlite_engine,
+                source_path,
+                tables,
+                dialect,
+                metrics
+            )
+    finally:
+        if sqlite_engine is not None:
+            sqlite_engine.dispose()
+
+    if (sqlite_engine is not None) and (compression is not None):
+        with timer(metrics, "compress"):
+            compress_file("data.db", compression)
+    if metrics is not None:
+        metrics.end_exporter("gen_all")
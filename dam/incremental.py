@@ -0,0 +1,143 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# @Date    : 2026-10-18 23:41:27
+# @Author  : gwentmaster(1950251906@qq.com)
+# I regret in my life
+
+
+import hashlib
+import os
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy.schema import Table
+
+from analyser import registry_version
+
+
+# 生成格式变化时增加,使旧文件中的各表都重新生成
+FINGERPRINT_VERSION = 1
+MARKER = "dam-fingerprint: "
+
+
+def table_fingerprint(table: Table, *options: Any) -> str:
+    """计算单张表的结构指纹,options为影响生成结果的其他参数
+
+    只使用反射得到的表结构,不需要先分析表结构;
+    包含类型注册表的版本,register_type后各表都重新生成
+    """
+
+    items = [
+        FINGERPRINT_VERSION,
+        registry_version(),
+        table.name,
+        options
+    ]  # type: List[Any]
+    for column in table.columns:
+        items.append((
+            column.name,
+            repr(column.type),
+            column.nullable,
+            column.primary_key,
+            sorted(fk.target_fullname for fk in column.foreign_keys)
+        ))
+    for index in sorted(table.indexes, key=lambda index: index.name or ""):
+        items.append((
+            index.name,
+            index.unique,
+            [column.name for column in index.columns]
+        ))
+    return hashlib.sha256(repr(items).encode("utf-8")).hexdigest()
+
+
+def write_if_changed(path: str, data: bytes) -> bool:
+    """内容与已有文件相同时不写入,保持文件的修改时间不变
+
+    Returns:
+        是否写入了文件
+    """
+
+    if os.path.exists(path):
+        with open(path, "rb") as f:
+            if f.read() == data:
+                return False
+    with open(path, "wb") as f:
+        f.write(data)
+    return True
+
+
+class IncrementalOutput(object):
+    """增量生成的文件,每张表的内容前有一行记录表名和结构指纹的注释
+
+    指纹与上次生成时相同的表直接使用上次的内容
+
+    Args:
+        path: 文件路径
+        comment: 注释符号,sql文件为--,py文件为#
+    """
+
+    def __init__(self, path: str, comment: str):
+        self.path = path
+        self.marker = f"{comment} {MARKER}"
+        self.previous = {}  # type: Dict[str, Tuple[str, str]]
+        self.sections = []  # type: List[Tuple[str, str, str]]
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                self._parse(f.read())
+
+    def _parse(self, text: str) -> None:
+        name = None  # type: Optional[str]
+        fingerprint = ""
+        lines = []  # type: List[str]
+        for line in text.splitlines(keepends=True):
+            if line.startswith(self.marker):
+                if name is not None:
+                    self._keep(name, fingerprint, lines)
+                name, fingerprint = (
+                    line[len(self.marker):].rstrip("\n").rsplit(" ", 1)
+                )
+                lines = []
+            elif name is not None:
+                lines.append(line)
+        if name is not None:
+            self._keep(name, fingerprint, lines)
+
+    def _keep(self, name: str, fingerprint: str, lines: List[str]) -> None:
+        self.previous[name] = (fingerprint, "".join(lines).rstrip("\n") + "\n")
+
+    def previous_body(self, name: str, fingerprint: str) -> Optional[str]:
+        """指纹未变化时返回上次生成的内容,否则返回None
+        """
+
+        previous = self.previous.get(name)
+        if (previous is not None) and (previous[0] == fingerprint):
+            return previous[1]
+        return None
+
+    def add(self, name: str, fingerprint: str, body: str) -> None:
+        """按顺序添加一张表的内容,末尾的空行由write时的分隔符决定
+        """
+
+        self.sections.append((name, fingerprint, body.rstrip("\n") + "\n"))
+
+    def write(
+        self,
+        header: str = "",
+        separator: str = "",
+        terminator: str = ""
+    ) -> bool:
+        """写入文件,内容与已有文件相同时不写入
+
+        Args:
+            header: 文件开头的内容
+            separator: 各表内容之间的分隔
+            terminator: 最后一张表之后的内容
+
+        Returns:
+            是否写入了文件
+        """
+
+        text = header + separator.join(
+            f"{self.marker}{name} {fingerprint}\n{body}"
+            for name, fingerprint, body in self.sections
+        ) + terminator
+        return write_if_changed(self.path, text.encode("utf-8"))
@@ -0,0 +1,329 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# @Date    : 2026-10-18 21:18:09
+# @Author  : gwentmaster(1950251906@qq.com)
+# I regret in my life
+
+
+import contextlib
+import json
+import math
+import sys
+import threading
+import time
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+
+# 进度回调,参数为ExportMetrics.progress返回的字典
+ProgressHook = Callable[[Dict[str, Any]], None]
+
+
+def _bucket(seconds: float) -> str:
+    """延迟直方图的区间,以2的幂次毫秒为上界
+    """
+
+    ms = seconds * 1000
+    if ms <= 1:
+        return "<=1ms"
+    return f"<={2 ** math.ceil(math.log2(ms))}ms"
+
+
+def _bucket_key(bucket: str) -> int:
+    return int(bucket[2:-2])
+
+
+class ExportMetrics(object):
+    """导出过程的统计,可以在多个生成函数之间共用,结果累加
+
+    阶段包括reflect(反射)、analyse(分析表结构并生成序列化函数)、
+    count(统计行数)、query(读取一批数据)、serialize(将行转为字典)、
+    encode(编码为json)、write(写入导出目标)、ddl(生成并执行建表语句)、
+    copy(SQLite之间直接复制一张表,或合并工作进程生成的临时db文件)、
+    index(快速导入后建立索引)、compress(压缩已生成的文件);
+    不输出字节的导出目标(如SQLite)的类型转换计入write
+
+    并行导出时各工作进程分别统计,完成后由merge累加到主进程的统计中
+
+    Args:
+        hooks: 进度回调,每批写入后及每张表、每个生成函数开始和结束时调用
+        count_rows: 导出前是否统计各表的行数,统计后进度中才有总行数和预计剩余时间
+        report_path: 每个生成函数结束时写入汇总报告的json文件路径
+    """
+
+    def __init__(
+        self,
+        hooks: Optional[List[ProgressHook]] = None,
+        count_rows: bool = False,
+        report_path: Optional[str] = None
+    ):
+        self.hooks = hooks or []
+        self.count_rows = count_rows
+        self.report_path = report_path
+        self.lock = threading.Lock()
+        self.started = time.perf_counter()
+        self.data_started = None  # type: Optional[float]
+        self.exporter = None  # type: Optional[str]
+        self.exporters = {}  # type: Dict[str, float]
+        self.exporter_starts = {}  # type: Dict[str, float]
+        self.stages = {}  # type: Dict[str, Dict[str, Any]]
+        self.tables = {}  # type: Dict[str, Dict[str, Any]]
+        self.rows = 0
+        self.bytes = 0
+        self.total_rows = None  # type: Optional[int]
+
+    def _table(self, table_name: str) -> Dict[str, Any]:
+        if table_name not in self.tables:
+            self.tables[table_name] = {
+                "rows": 0,
+                "bytes": 0,
+                "batches": 0,
+                "total_rows": None,
+                "seconds": 0.0,
+                "stages": {}
+            }
+        return self.tables[table_name]
+
+    def add_time(
+        self,
+        stage: str,
+        seconds: float,
+        table_name: Optional[str] = None
+    ) -> None:
+        """累计阶段耗时,每次调用作为一次计入该阶段的延迟直方图,可在任意线程中调用
+        """
+
+        with self.lock:
+            if stage not in self.stages:
+                self.stages[stage] = {
+                    "seconds": 0.0,
+                    "calls": 0,
+                    "histogram": {}
+                }
+            total = self.stages[stage]
+            total["seconds"] += seconds
+            total["calls"] += 1
+            bucket = _bucket(seconds)
+            total["histogram"][bucket] = total["histogram"].get(bucket, 0) + 1
+            if table_name is not None:
+                stages = self._table(table_name)["stages"]
+                stages[stage] = stages.get(stage, 0.0) + seconds
+
+    @contextlib.contextmanager
+    def timer(
+        self,
+        stage: str,
+        table_name: Optional[str] = None
+    ) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_time(stage, time.perf_counter() - start, table_name)
+
+    def set_total_rows(self, table_name: str, rows: int) -> None:
+        with self.lock:
+            table = self._table(table_name)
+            table["total_rows"] = (table["total_rows"] or 0) + rows
+            self.total_rows = (self.total_rows or 0) + rows
+
+    def begin_exporter(self, exporter: str) -> None:
+        self.exporter = exporter
+        self.exporter_starts[exporter] = time.perf_counter()
+        self._notify("exporter_begin")
+
+    def end_exporter(self, exporter: str) -> None:
+        """记录生成函数的耗时,写入汇总报告
+        """
+
+        start = self.exporter_starts.pop(exporter)
+        self.exporters[exporter] = (
+            self.exporters.get(exporter, 0.0) + time.perf_counter() - start
+        )
+        if self.report_path is not None:
+            self.write_report(self.report_path)
+        self._notify("exporter_end")
+        self.exporter = None
+
+    def begin_table(self, table_name: str) -> None:
+        with self.lock:
+            table = self._table(table_name)
+            table["started"] = time.perf_counter()
+            if self.data_started is None:
+                self.data_started = table["started"]
+        self._notify("table_begin", table_name)
+
+    def end_table(self, table_name: str) -> None:
+        with self.lock:
+            table = self._table(table_name)
+            table["seconds"] += time.perf_counter() - table.pop("started")
+        self._notify("table_end", table_name)
+
+    def add_batch(
+        self,
+        table_name: str,
+        rows: int,
+        size: Optional[int] = None
+    ) -> None:
+        """记录写入的一批数据,size为写入的字节数,未知时为None
+        """
+
+        with self.lock:
+            table = self._table(table_name)
+            table["rows"] += rows
+            table["batches"] += 1
+            self.rows += rows
+            if size is not None:
+                table["bytes"] += size
+                self.bytes += size
+        self._notify("batch", table_name)
+
+    def merge(self, report: Dict[str, Any]) -> None:
+        """累加工作进程中另一个ExportMetrics的report,
+        各阶段和各表的耗时为各进程耗时之和,合并后以batch事件调用进度回调
+
+        Args:
+            report: 工作进程中ExportMetrics.report的返回值
+        """
+
+        with self.lock:
+            if self.data_started is None:
+                self.data_started = time.perf_counter() - report["elapsed"]
+            for stage, other in report["stages"].items():
+                total = self.stages.setdefault(
+                    stage,
+                    {"seconds": 0.0, "calls": 0, "histogram": {}}
+                )
+                total["seconds"] += other["seconds"]
+                total["calls"] += other["calls"]
+                for bucket, calls in other["histogram"].items():
+                    total["histogram"][bucket] = (
+                        total["histogram"].get(bucket, 0) + calls
+                    )
+            for table_name, other in report["tables"].items():
+                table = self._table(table_name)
+                for key in ("rows", "bytes", "batches", "seconds"):
+                    table[key] += other[key]
+                for stage, seconds in other["stages"].items():
+                    table["stages"][stage] = (
+                        table["stages"].get(stage, 0.0) + seconds
+                    )
+            self.rows += report["rows"]
+            self.bytes += report["bytes"]
+        for table_name in report["tables"]:
+            self._notify("batch", table_name)
+
+    def progress(
+        self,
+        event: str,
+        table_name: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """当前进度,未统计总行数时total_rows和eta为None
+
+        共用于多个生成函数时行数和总行数都是累计值
+        """
+
+        now = time.perf_counter()
+        elapsed = 0.0 if self.data_started is None else now - self.data_started
+        rows_per_sec = self.rows / elapsed if elapsed > 0 else None
+        eta = None  # type: Optional[float]
+        if (self.total_rows is not None) and rows_per_sec:
+            eta = max(self.total_rows - self.rows, 0) / rows_per_sec
+
+        progress = {
+            "event": event,
+            "exporter": self.exporter,
+            "table": table_name,
+            "table_rows": None,
+            "table_total_rows": None,
+            "rows": self.rows,
+            "total_rows": self.total_rows,
+            "bytes": self.bytes,
+            "elapsed": now - self.started,
+            "rows_per_sec": rows_per_sec,
+            "eta": eta
+        }  # type: Dict[str, Any]
+        if table_name is not None:
+            table = self.tables.get(table_name, {})
+            progress["table_rows"] = table.get("rows")
+            progress["table_total_rows"] = table.get("total_rows")
+        return progress
+
+    def _notify(self, event: str, table_name: Optional[str] = None) -> None:
+        if not self.hooks:
+            return
+        progress = self.progress(event, table_name)
+        for hook in self.hooks:
+            hook(progress)
+
+    def report(self) -> Dict[str, Any]:
+        """汇总报告
+        """
+
+        with self.lock:
+            stages = {}
+            for stage, total in self.stages.items():
+                stages[stage] = {
+                    "seconds": total["seconds"],
+                    "calls": total["calls"],
+                    "histogram": dict(sorted(
+                        total["histogram"].items(),
+                        key=lambda item: _bucket_key(item[0])
+                    ))
+                }
+            tables = {}
+            for name, table in self.tables.items():
+                tables[name] = {
+                    "rows": table["rows"],
+                    "bytes": table["bytes"],
+                    "batches": table["batches"],
+                    "total_rows": table["total_rows"],
+                    "seconds": table["seconds"],
+                    "rows_per_sec": (
+                        table["rows"] / table["seconds"]
+                        if table["seconds"] > 0 else None
+                    ),
+                    "stages": dict(table["stages"])
+                }
+            return {
+                "elapsed": time.perf_counter() - self.started,
+                "rows": self.rows,
+                "bytes": self.bytes,
+                "total_rows": self.total_rows,
+                "exporters": dict(self.exporters),
+                "stages": stages,
+                "tables": tables
+            }
+
+    def write_report(self, path: str) -> None:
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.report(), f, ensure_ascii=False, indent=2)
+
+
+def timer(
+    metrics: Optional[ExportMetrics],
+    stage: str,
+    table_name: Optional[str] = None
+):
+    """metrics为None时不做任何事的ExportMetrics.timer
+    """
+
+    if metrics is None:
+        return contextlib.nullcontext()
+    return metrics.timer(stage, table_name)
+
+
+def print_progress(progress: Dict[str, Any]) -> None:
+    """将进度输出到标准错误的进度回调
+    """
+
+    if progress["event"] not in ("batch", "table_end"):
+        return
+    line = f"{progress['table']}: {progress['table_rows']}"
+    if progress["table_total_rows"] is not None:
+        line += f"/{progress['table_total_rows']}"
+    line += f" rows, {progress['rows']} total"
+    if progress["rows_per_sec"] is not None:
+        line += f", {progress['rows_per_sec']:.0f} rows/s"
+    if progress["eta"] is not None:
+        line += f", ETA {progress['eta']:.0f}s"
+    print(line, file=sys.stderr)
@@ -0,0 +1,147 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# @Date    : 2026-10-18 23:05:16
+# @Author  : gwentmaster(1950251906@qq.com)
+# I regret in my life
+
+
+import fnmatch
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional, Pattern, Sequence, Set, Union
+
+from sqlalchemy import inspect
+from sqlalchemy.schema import MetaData, Table
+
+
+# 表名匹配规则,字符串为glob通配符,编译后的正则表达式需要匹配整个表名
+TablePattern = Union[str, Pattern]
+
+# 并行反射时每个线程一次反射的表数
+REFLECT_CHUNK_SIZE = 50
+
+
+def _match(pattern: TablePattern, name: str) -> bool:
+    if isinstance(pattern, str):
+        return fnmatch.fnmatchcase(name, pattern)
+    return pattern.fullmatch(name) is not None
+
+
+def match_table(
+    name: str,
+    include: Optional[Sequence[TablePattern]] = None,
+    exclude: Optional[Sequence[TablePattern]] = None
+) -> bool:
+    """表名是否符合过滤条件
+
+    Args:
+        name: 表名
+        include: 只保留匹配其中任一规则的表,为None时保留所有表
+        exclude: 排除匹配其中任一规则的表
+    """
+
+    if (include is not None) and (not any(_match(p, name) for p in include)):
+        return False
+    if (exclude is not None) and any(_match(p, name) for p in exclude):
+        return False
+    return True
+
+
+def select_tables(
+    metadata: MetaData,
+    include: Optional[Sequence[TablePattern]] = None,
+    exclude: Optional[Sequence[TablePattern]] = None
+) -> List[Table]:
+    """按metadata.sorted_tables的顺序选出符合过滤条件的表
+
+    reflect_tables会同时反射被外键引用的表,导出时用同样的条件再选一次
+    """
+
+    return [
+        table for table in metadata.sorted_tables
+        if match_table(table.name, include, exclude)
+    ]
+
+
+def _reflect_chunk(engine, names: List[str]) -> MetaData:
+    metadata = MetaData()
+    with engine.connect() as connection:
+        metadata.reflect(bind=connection, only=names, resolve_fks=False)
+    return metadata
+
+
+def _copy_table(table: Table, metadata: MetaData) -> Table:
+    # sqlalchemy 1.4起tometadata改名为to_metadata
+    if hasattr(table, "to_metadata"):
+        return table.to_metadata(metadata)
+    return table.tometadata(metadata)
+
+
+def _missing_targets(metadata: MetaData) -> Set[str]:
+    """被外键引用但尚未反射的表
+    """
+
+    missing = set()
+    for table in metadata.tables.values():
+        for foreign_key in table.foreign_keys:
+            key = foreign_key.target_fullname.rsplit(".", 1)[0]
+            if key not in metadata.tables:
+                missing.add(key)
+    return missing
+
+
+def reflect_tables(
+    metadata: MetaData,
+    include: Optional[Sequence[TablePattern]] = None,
+    exclude: Optional[Sequence[TablePattern]] = None,
+    workers: int = 1
+) -> None:
+    """在反射前按表名过滤,只反射需要的表
+
+    反射时不沿外键递归,全部反射完成后再补充反射被外键引用而不在其中的表,
+    使外键和metadata.sorted_tables仍然可用
+
+    Args:
+        metadata: 绑定了engine的MetaData
+        include: 只反射匹配其中任一规则的表,为None时反射所有表
+        exclude: 不反射匹配其中任一规则的表
+        workers: 并行反射的线程数,每个线程使用单独的连接,
+                 大于1时各线程反射到单独的MetaData后再复制到metadata中,
+                 适用于每张表都要多次往返查询的MySQL,本地SQLite文件的反射
+                 主要耗费CPU,多线程没有收益
+    """
+
+    engine = metadata.bind
+    with engine.connect() as connection:
+        names = [
+            name for name in inspect(connection).get_table_names()
+            if match_table(name, include, exclude)
+        ]
+
+    if (workers > 1) and (len(names) > REFLECT_CHUNK_SIZE):
+        chunks = [
+            names[i:i + REFLECT_CHUNK_SIZE]
+            for i in range(0, len(names), REFLECT_CHUNK_SIZE)
+        ]
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            for chunk_metadata in pool.map(
+                lambda chunk: _reflect_chunk(engine, chunk),
+                chunks
+            ):
+                for table in chunk_metadata.tables.values():
+                    _copy_table(table, metadata)
+    elif names:
+        metadata.reflect(only=names, resolve_fks=False)
+
+    missing = _missing_targets(metadata)
+    while missing:
+        with engine.connect() as connection:
+            for key in sorted(missing):
+                schema, _, name = key.rpartition(".")
+                Table(
+                    name,
+                    metadata,
+                    schema=schema or None,
+                    autoload_with=connection,
+                    resolve_fks=False
+                )
+        missing = _missing_targets(metadata)
@@ -0,0 +1,77 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# @Date    : 2026-10-18 15:40:17
+# @Author  : gwentmaster(1950251906@qq.com)
+# I regret in my life
+
+
+from typing import Any, Callable, Dict, List, Sequence
+
+from sqlalchemy.schema import Table
+
+from analyser import analyse_table
+
+
+RowSerializer = Callable[[Sequence], Dict[str, Any]]
+
+
+def compile_serializer(
+    result: Dict[str, Any],
+    for_json: bool = False
+) -> RowSerializer:
+    """根据analyse_table的结果生成该表专用的序列化函数
+
+    生成的函数将一行数据(按字段顺序排列的元组)转为字典,
+    结果与marshmallow的Schema.dump一致,但省去了逐个字段的查找和钩子调用
+
+    for_json为True时按字段类型将Decimal等预先转为json原生类型,
+    编码结果与MyJsonEncoder编码Schema.dump的结果一致,编码时不再调用default
+
+    Args:
+        result: analyse_table的返回值
+        for_json: 是否用于导出json
+
+    Returns:
+        序列化函数
+    """
+
+    namespace = {}  # type: Dict[str, Any]
+    names = []  # type: List[str]
+    items = []  # type: List[str]
+    for i, column in enumerate(result["columns"]):
+        if for_json is True:
+            namespace[f"c{i}"] = column["type"].to_json_converter()
+        else:
+            namespace[f"c{i}"] = column["type"].to_converter()
+        names.append(f"v{i}")
+        items.append(f"{column['name']!r}: None if v{i} is None else c{i}(v{i})")
+
+    source = (
+        "def serialize(row):\n"
+        + f"    {', '.join(names)}, = row\n"
+        + f"    return {{{', '.join(items)}}}\n"
+    )
+    exec(compile(source, f"<serializer {result['table']}>", "exec"), namespace)
+    return namespace["serialize"]
+
+
+def gen_serializers(
+    tables: List[Table],
+    dialect: str,
+    for_json: bool = False
+) -> Dict[str, RowSerializer]:
+    """为各表生成序列化函数
+
+    Args:
+        tables: sqlalchemy通过反射获取的表
+        dialect: 数据库类型
+        for_json: 是否用于导出json,见compile_serializer
+
+    Returns:
+        表名为键,相应序列化函数为值的字典
+    """
+
+    return {
+        table.name: compile_serializer(analyse_table(table, dialect), for_json)
+        for table in tables
+    }
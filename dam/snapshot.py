@@ -0,0 +1,142 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# @Date    : 2026-10-18 10:12:40
+# @Author  : gwentmaster(1950251906@qq.com)
+# I regret in my life
+
+
+import hashlib
+import os
+import pickle
+from typing import Optional, Sequence
+
+import sqlalchemy
+from sqlalchemy.schema import MetaData
+
+from analyser import registry_version, remember_analysis
+from metrics import ExportMetrics, timer
+from reflection import reflect_tables, TablePattern
+
+
+SNAPSHOT_VERSION = 4
+
+# 计算结构指纹用的查询,只涉及表结构,不包含数据和统计信息
+_MYSQL_FINGERPRINT_SQLS = [
+    (
+        "SELECT TABLE_NAME, COLUMN_NAME, ORDINAL_POSITION, COLUMN_DEFAULT, "
+        + "IS_NULLABLE, COLUMN_TYPE, COLUMN_KEY, EXTRA "
+        + "FROM information_schema.COLUMNS "
+        + "WHERE TABLE_SCHEMA = DATABASE() "
+        + "ORDER BY TABLE_NAME, ORDINAL_POSITION"
+    ),
+    (
+        "SELECT TABLE_NAME, INDEX_NAME, SEQ_IN_INDEX, COLUMN_NAME, NON_UNIQUE "
+        + "FROM information_schema.STATISTICS "
+        + "WHERE TABLE_SCHEMA = DATABASE() "
+        + "ORDER BY TABLE_NAME, INDEX_NAME, SEQ_IN_INDEX"
+    ),
+    (
+        "SELECT TABLE_NAME, CONSTRAINT_NAME, ORDINAL_POSITION, COLUMN_NAME, "
+        + "REFERENCED_TABLE_NAME, REFERENCED_COLUMN_NAME "
+        + "FROM information_schema.KEY_COLUMN_USAGE "
+        + "WHERE TABLE_SCHEMA = DATABASE() "
+        + "ORDER BY TABLE_NAME, CONSTRAINT_NAME, ORDINAL_POSITION"
+    )
+]
+_SQLITE_FINGERPRINT_SQLS = [
+    "SELECT type, name, tbl_name, sql FROM sqlite_master ORDER BY type, name"
+]
+
+
+def schema_fingerprint(engine, dialect: str) -> str:
+    """计算数据库结构的指纹,结构不变时指纹不变
+
+    Args:
+        engine: 数据库连接
+        dialect: 数据库类型
+
+    Raises:
+        TypeError: 不支持的数据库类型
+    """
+
+    if dialect == "mysql":
+        sqls = _MYSQL_FINGERPRINT_SQLS
+    elif dialect == "sqlite":
+        sqls = _SQLITE_FINGERPRINT_SQLS
+    else:
+        raise TypeError(f"no such dialect: {dialect}")
+
+    digest = hashlib.sha256()
+    with engine.connect() as connection:
+        for sql in sqls:
+            for row in connection.execute(sql):
+                digest.update(repr(tuple(row)).encode("utf-8"))
+    return digest.hexdigest()
+
+
+def load_metadata(
+    engine,
+    dialect: str,
+    path: str = ".dam_snapshot.pickle",
+    metrics: Optional[ExportMetrics] = None,
+    include: Optional[Sequence[TablePattern]] = None,
+    exclude: Optional[Sequence[TablePattern]] = None,
+    workers: int = 1
+) -> MetaData:
+    """读取反射快照,数据库结构未变化时不再执行metadata.reflect()
+
+    快照中同时保存了各表analyse_table的结果,结构变化、sqlalchemy版本变化
+    或类型注册表变化(见register_type)时重新反射并覆盖快照;
+    快照文件先保存只含基本类型的key,key一致时才反序列化MetaData,
+    快照损坏或无法反序列化时同样重新反射
+
+    Args:
+        engine: 数据库连接
+        dialect: 数据库类型
+        path: 快照文件路径
+        metrics: 导出过程的统计,记录读取快照或反射的耗时
+        include: 只反射匹配其中任一规则的表,规则为glob通配符或编译后的正则表达式
+        exclude: 不反射匹配其中任一规则的表
+        workers: 并行反射的线程数
+
+    Returns:
+        绑定到engine的MetaData
+    """
+
+    with timer(metrics, "reflect"):
+        key = (
+            SNAPSHOT_VERSION,
+            sqlalchemy.__version__,
+            registry_version(),
+            dialect,
+            None if include is None else tuple(include),
+            None if exclude is None else tuple(exclude),
+            schema_fingerprint(engine, dialect)
+        )
+
+    if os.path.exists(path):
+        metadata = None  # type: Optional[MetaData]
+        try:
+            with open(path, "rb") as f, timer(metrics, "reflect"):
+                if pickle.load(f) == key:
+                    metadata = pickle.load(f)
+        except Exception:
+            # 快照损坏,或由其他版本的sqlalchemy生成而无法反序列化,重新反射
+            metadata = None
+        if isinstance(metadata, MetaData):
+            metadata.bind = engine
+            return metadata
+
+    metadata = MetaData(bind=engine)
+    with timer(metrics, "reflect"):
+        reflect_tables(metadata, include, exclude, workers)
+    with timer(metrics, "analyse"):
+        for table in metadata.tables.values():
+            remember_analysis(table, dialect)
+
+    # 先写临时文件再替换,避免中断时留下不完整的快照
+    with open(path + ".tmp", "wb") as f:
+        pickle.dump(key, f)
+        pickle.dump(metadata, f)
+    os.replace(path + ".tmp", path)
+    return metadata
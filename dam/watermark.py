@@ -0,0 +1,132 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# @Date    : 2026-10-18 14:26:51
+# @Author  : gwentmaster(1950251906@qq.com)
+# I regret in my life
+
+
+import json
+import pickle
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import create_engine, LargeBinary, MetaData, String, Text
+from sqlalchemy.schema import Column, Table
+
+
+_metadata = MetaData()
+_watermark_table = Table(
+    "dam_watermark",
+    _metadata,
+    Column("target", String(255), primary_key=True),
+    Column("table_name", String(255), primary_key=True),
+    Column("columns", Text, nullable=False),
+    Column("value", LargeBinary, nullable=False)
+)
+
+
+class WatermarkStore(object):
+    """增量导出的高水位记录,保存在本地SQLite数据库的dam_watermark表中
+
+    每张表的高水位是排序字段的值元组:配置了更新时间字段时为(更新时间, 主键...),
+    否则为主键,下次导出只读取大于该值的数据
+
+    gen_db的高水位保存在data.db中,与数据一起复制或删除,
+    gen_jsonl的高水位保存在单独的dam_state.db中
+
+    Args:
+        target: 导出目标的标识,如data.db
+        watermark_columns: 表名为键,更新时间字段名为值的字典
+        path: 保存高水位的db文件路径
+    """
+
+    def __init__(
+        self,
+        target: str,
+        watermark_columns: Optional[Dict[str, str]] = None,
+        path: str = "dam_state.db"
+    ):
+        self.target = target
+        self.watermark_columns = watermark_columns or {}
+        self.engine = create_engine(f"sqlite:///{path}")
+        _metadata.create_all(self.engine)
+
+    def check(self, tables: List[Table]) -> None:
+        """检查各表配置的更新时间字段
+
+        更新时间为NULL的数据无法与高水位比较,增量导出时永远不会被读取,
+        因此更新时间字段不能允许为空
+
+        Raises:
+            ValueError: 字段不存在或允许为空
+        """
+
+        for table in tables:
+            column_name = self.watermark_columns.get(table.name)
+            if column_name is None:
+                continue
+            if column_name not in table.columns:
+                raise ValueError(
+                    f"no such watermark column: {table.name}.{column_name}"
+                )
+            if table.columns[column_name].nullable is not False:
+                raise ValueError(
+                    f"watermark column {table.name}.{column_name} is nullable"
+                )
+
+    def keys(self, table: Table, primary: List[Column]) -> List[Column]:
+        """获取表的排序字段,没有主键的表返回空列表,每次全量导出
+
+        Args:
+            table: sqlalchemy通过反射获取的表
+            primary: 表的主键字段
+        """
+
+        if not primary:
+            return []
+        column_name = self.watermark_columns.get(table.name)
+        if column_name is None:
+            return primary
+        return [table.columns[column_name]] + [
+            column for column in primary if column.name != column_name
+        ]
+
+    def get(self, table_name: str, keys: List[Column]) -> Optional[Tuple]:
+        """获取表的高水位,排序字段与上次不同时视为没有高水位
+        """
+
+        with self.engine.connect() as connection:
+            row = connection.execute(
+                _watermark_table.select().where(
+                    (_watermark_table.c.target == self.target)
+                    & (_watermark_table.c.table_name == table_name)
+                )
+            ).first()
+        if row is None:
+            return None
+        if json.loads(row["columns"]) != [key.name for key in keys]:
+            return None
+        return pickle.loads(row["value"])
+
+    def set(self, table_name: str, keys: List[Column], value: Tuple) -> None:
+        with self.engine.begin() as connection:
+            connection.execute(
+                _watermark_table.insert().prefix_with("OR REPLACE"),
+                {
+                    "target": self.target,
+                    "table_name": table_name,
+                    "columns": json.dumps([key.name for key in keys]),
+                    "value": pickle.dumps(value)
+                }
+            )
+
+    def delete(self, table_name: Optional[str] = None) -> None:
+        """删除高水位,未指定表名时删除该导出目标下所有表的高水位
+        """
+
+        query = _watermark_table.delete().where(
+            _watermark_table.c.target == self.target
+        )
+        if table_name is not None:
+            query = query.where(_watermark_table.c.table_name == table_name)
+        with self.engine.begin() as connection:
+            connection.execute(query)
@@ -0,0 +1,121 @@
+# -*- coding: utf-8 -*-
+
+
+import datetime
+import json
+import os
+import sys
+
+import pytest
+from sqlalchemy import (
+    Column,
+    create_engine,
+    DateTime,
+    Integer,
+    MetaData,
+    String,
+    Table
+)
+
+
+# dam中的模块之间直接import,测试时将其加入sys.path
+sys.path.insert(
+    0,
+    os.path.join(os.path.dirname(os.path.dirname(__file__)), "dam")
+)
+
+
+PARENT_ROWS = 25
+CHILD_ROWS = 40
+
+
+def find_table(tables, name):
+    return next(table for table in tables if table.name == name)
+
+
+def read_jsonl(path):
+    with open(path, "r", encoding="utf-8") as f:
+        return [json.loads(line) for line in f]
+
+
+def interrupt(
+    monkeypatch,
+    sink_class,
+    after_batches,
+    method="write_encoded"
+):
+    """使sink_class的method在写入after_batches批数据后抛出异常,模拟导出中断
+    """
+
+    write = getattr(sink_class, method)
+    written = []
+
+    def failing_write(self, data):
+        if len(written) == after_batches:
+            raise KeyboardInterrupt()
+        written.append(data)
+        write(self, data)
+
+    monkeypatch.setattr(sink_class, method, failing_write)
+
+
+def _create_source(path: str) -> None:
+    metadata = MetaData()
+    parent = Table(
+        "parent",
+        metadata,
+        Column("id", Integer, primary_key=True),
+        Column("name", String(20), nullable=False),
+        Column("updated_at", DateTime, nullable=False)
+    )
+    child = Table(
+        "child",
+        metadata,
+        Column("group_id", Integer, primary_key=True),
+        Column("code", String(10), primary_key=True),
+        Column("value", Integer)
+    )
+    engine = create_engine(f"sqlite:///{path}")
+    metadata.create_all(engine)
+    with engine.begin() as connection:
+        connection.execute(parent.insert(), [
+            {
+                "id": i,
+                "name": f"p{i}",
+                "updated_at": datetime.datetime(2020, 1, 1, 0, 0, i)
+            }
+            for i in range(1, PARENT_ROWS + 1)
+        ])
+        connection.execute(child.insert(), [
+            {"group_id": i % 3, "code": f"c{i:03d}", "value": i}
+            for i in range(CHILD_ROWS)
+        ])
+    engine.dispose()
+
+
+@pytest.fixture
+def source(tmp_path, monkeypatch):
+    """在临时目录中创建源数据库并切换到该目录,返回(engine, 按依赖排序的表)
+    """
+
+    path = str(tmp_path / "source.db")
+    _create_source(path)
+    monkeypatch.chdir(tmp_path)
+    engine = create_engine(f"sqlite:///{path}")
+    metadata = MetaData()
+    metadata.reflect(bind=engine)
+    yield engine, list(metadata.sorted_tables)
+    engine.dispose()
+
+
+@pytest.fixture
+def registry(monkeypatch):
+    """测试中注册的类型在测试结束后移除
+    """
+
+    import analyser
+
+    for dialect, entries in analyser.TYPE_REGISTRY.items():
+        monkeypatch.setitem(analyser.TYPE_REGISTRY, dialect, list(entries))
+    monkeypatch.setattr(analyser, "_resolved_types", {})
+    monkeypatch.setattr(analyser, "_registry_version", None)
@@ -0,0 +1,138 @@
+# -*- coding: utf-8 -*-
+
+
+import pytest
+from sqlalchemy import (
+    Boolean as SqlBoolean,
+    Column,
+    DateTime,
+    Integer,
+    MetaData,
+    Numeric,
+    String,
+    Table
+)
+from sqlalchemy.dialects.mysql import TINYINT
+
+from analyser import analyse_table, register_type, registry_version
+from data_export import gen_schemas, gen_sqlite_sql
+from datastructures import (
+    Boolean,
+    DateTime as DateTimeStructure,
+    Decimal,
+    Integer as IntegerStructure
+)
+
+
+class Code(String):
+    pass
+
+
+def _code_table():
+    return Table(
+        "item",
+        MetaData(),
+        Column("id", Integer, primary_key=True),
+        Column("code", Code(10))
+    )
+
+
+def _flag_table():
+    return Table(
+        "flag",
+        MetaData(),
+        Column("enabled", TINYINT(display_width=1)),
+        Column("level", TINYINT(display_width=4))
+    )
+
+
+def test_mysql_tinyint_is_integer():
+    columns = analyse_table(_flag_table(), "mysql")["columns"]
+
+    assert isinstance(columns[0]["type"], IntegerStructure)
+    assert isinstance(columns[1]["type"], IntegerStructure)
+
+
+def test_register_tinyint_as_boolean(registry):
+    register_type(
+        "mysql",
+        TINYINT,
+        lambda type_, dialect: Boolean(type_, dialect=dialect),
+        first=True
+    )
+
+    columns = analyse_table(_flag_table(), "mysql")["columns"]
+
+    assert isinstance(columns[0]["type"], Boolean)
+    assert isinstance(columns[1]["type"], Boolean)
+
+
+def test_register_type_invalidates_analysis(registry):
+    table = _code_table()
+    version = registry_version()
+    assert not isinstance(
+        analyse_table(table, "sqlite")["columns"][1]["type"],
+        IntegerStructure
+    )
+
+    # 注册在String之后,但Code更具体,仍然优先
+    register_type("sqlite", Code, IntegerStructure)
+
+    assert registry_version() != version
+    assert isinstance(
+        analyse_table(table, "sqlite")["columns"][1]["type"],
+        IntegerStructure
+    )
+
+
+@pytest.mark.parametrize("decimal_as_real, amount_type", [
+    (False, "NUMERIC(12, 2)"),
+    (True, "REAL")
+])
+def test_sqlite_source_types(source, decimal_as_real, amount_type):
+    engine, _ = source
+    metadata = MetaData()
+    Table(
+        "measure",
+        metadata,
+        Column("id", Integer, primary_key=True),
+        Column("amount", Numeric(12, 2)),
+        Column("taken_at", DateTime),
+        Column("valid", SqlBoolean)
+    )
+    metadata.create_all(engine)
+    reflected = MetaData()
+    reflected.reflect(bind=engine, only=["measure"])
+    table = reflected.tables["measure"]
+
+    columns = analyse_table(table, "sqlite")["columns"]
+    assert [type(column["type"]) for column in columns] == [
+        IntegerStructure,
+        Decimal,
+        DateTimeStructure,
+        Boolean
+    ]
+
+    gen_sqlite_sql([table], "sqlite", decimal_as_real=decimal_as_real)
+    with open("sqlite_table.sql", "r", encoding="utf-8") as f:
+        assert f.read() == (
+            "DROP TABLE IF EXISTS measure;\n"
+            + "CREATE TABLE measure\n"
+            + "    (\n"
+            + f"      amount   {amount_type}\n"
+            + "    , id       INTEGER NOT NULL\n"
+            + "    , taken_at DATETIME\n"
+            + "    , valid    BOOLEAN\n"
+            + "    , PRIMARY KEY (id)\n"
+            + "    );\n\n"
+        )
+
+    gen_schemas([table], "sqlite")
+    with open("schemas.py", "r", encoding="utf-8") as f:
+        assert f.read().endswith(
+            "class MeasureSchema(Schema):\n\n"
+            + "    id = fields.Integer()\n"
+            + "    amount = fields.Decimal(places=2)\n"
+            + "    taken_at = fields.DateTime()\n"
+            + "    valid = fields.Boolean()\n"
+        )
@@ -0,0 +1,56 @@
+# -*- coding: utf-8 -*-
+
+
+import asyncio
+import os
+import sqlite3
+
+import pytest
+
+pytest.importorskip("sqlalchemy.ext.asyncio")
+pytest.importorskip("aiosqlite")
+
+from async_export import gen_db_async, gen_json_async  # noqa: E402
+from data_export import gen_db, gen_json  # noqa: E402
+
+
+def _read(path):
+    with open(path, "rb") as f:
+        return f.read()
+
+
+def _dump_db(path):
+    connection = sqlite3.connect(path)
+    try:
+        return list(connection.iterdump())
+    finally:
+        connection.close()
+
+
+@pytest.mark.parametrize("concurrency", [1, 2])
+def test_gen_json_async_matches_gen_json(source, concurrency):
+    engine, tables = source
+    gen_json(tables, engine, "sqlite")
+    expected = _read("data.json")
+    os.remove("data.json")
+
+    asyncio.run(gen_json_async(
+        tables,
+        engine,
+        "sqlite",
+        batch_size=7,
+        concurrency=concurrency
+    ))
+
+    assert _read("data.json") == expected
+
+
+def test_gen_db_async_matches_gen_db(source):
+    engine, tables = source
+    gen_db(tables, engine, "sqlite")
+    expected = _dump_db("data.db")
+    os.remove("data.db")
+
+    asyncio.run(gen_db_async(tables, engine, "sqlite", batch_size=7))
+
+    assert _dump_db("data.db") == expected
@@ -0,0 +1,46 @@
+# -*- coding: utf-8 -*-
+
+
+from analyser import analyse_table
+from batching import BatchSizer, MAX_BATCH_ROWS, MIN_BATCH_ROWS
+from conftest import CHILD_ROWS, find_table, PARENT_ROWS
+from data_export import gen_json, JsonSink
+
+
+def test_batch_sizer(source):
+    _, tables = source
+    result = analyse_table(find_table(tables, "parent"), "sqlite")
+    sizer = BatchSizer(result, 600)
+    # id INTEGER、name VARCHAR(20)、updated_at DATETIME各加一个分隔符
+    assert sizer.estimated_width == 12 + 21 + 27
+    assert sizer.batch_size() == 10
+
+    # 抽样后按实际行宽计算
+    sizer.observe([(1, "p1", "2020-01-01 00:00:01.000000")] * 40)
+    assert sizer.row_width == 2 + 3 + 27
+    assert sizer.batch_size() == 600 // 32
+
+    assert BatchSizer(result, 1).batch_size() == MIN_BATCH_ROWS
+    assert BatchSizer(result, 10 ** 12).batch_size() == MAX_BATCH_ROWS
+
+
+def test_gen_json_batch_bytes(source, monkeypatch):
+    engine, tables = source
+    gen_json(tables, engine, "sqlite")
+    with open("data.json", "rb") as f:
+        expected = f.read()
+
+    batches = []
+    write_encoded = JsonSink.write_encoded
+
+    def recording_write_encoded(self, data):
+        batches.append(data)
+        write_encoded(self, data)
+
+    monkeypatch.setattr(JsonSink, "write_encoded", recording_write_encoded)
+    gen_json(tables, engine, "sqlite", batch_size=1, batch_bytes=200)
+
+    with open("data.json", "rb") as f:
+        assert f.read() == expected
+    # 每批按行宽读取多行,batch_size不起作用
+    assert 2 < len(batches) < PARENT_ROWS + CHILD_ROWS
@@ -0,0 +1,28 @@
+# -*- coding: utf-8 -*-
+
+
+import sqlite3
+
+from benchmark import BENCHMARKS, gen_synthetic_db, run_benchmarks
+
+
+def test_benchmark_smoke(tmp_path):
+    path = str(tmp_path / "bench.db")
+    gen_synthetic_db(path, tables=2, rows=20, string_width=4)
+
+    connection = sqlite3.connect(path)
+    try:
+        count = connection.execute("SELECT COUNT(*) FROM t1").fetchone()
+        assert count == (20,)
+    finally:
+        connection.close()
+
+    results = run_benchmarks(path, repeat=1, trace=False)
+
+    assert [result["name"] for result in results] == list(BENCHMARKS)
+    for result in results:
+        assert len(result["wall_times"]) == 1
+        assert result["tracemalloc_peak_bytes"] is None
+        if BENCHMARKS[result["name"]][1] is True:
+            assert result["rows"] == 40
+            assert result["bytes"] > 0
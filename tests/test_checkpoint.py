@@ -0,0 +1,118 @@
+# -*- coding: utf-8 -*-
+
+
+import os
+
+import pytest
+
+from conftest import find_table, interrupt, read_jsonl
+from data_export import (
+    _iter_batches,
+    _primary_columns,
+    gen_json,
+    gen_jsonl,
+    JsonLinesSink,
+    JsonSink
+)
+
+
+@pytest.mark.parametrize("batch_size", [1, 3, 7, 100])
+def test_keyset_pagination_composite_key(source, batch_size):
+    engine, tables = source
+    child = find_table(tables, "child")
+    keys = _primary_columns(child, "sqlite")
+    assert [key.name for key in keys] == ["group_id", "code"]
+
+    with engine.connect() as connection:
+        expected = connection.execute(
+            child.select().order_by(*keys)
+        ).fetchall()
+        rows = [
+            row
+            for batch in _iter_batches(connection, child, batch_size, keys)
+            for row in batch
+        ]
+        assert rows == expected
+
+        # 从中间的主键之后继续,到另一个主键(包含)为止
+        after = tuple(expected[9][key] for key in keys)
+        until = tuple(expected[29][key] for key in keys)
+        rows = [
+            row
+            for batch in _iter_batches(
+                connection,
+                child,
+                batch_size,
+                keys,
+                after,
+                until
+            )
+            for row in batch
+        ]
+        assert rows == expected[10:30]
+
+
+def test_checkpoint_resume_json(source, monkeypatch):
+    engine, tables = source
+    # 记录进度时按主键顺序读取,与未中断的结果比较
+    gen_json(tables, engine, "sqlite", batch_size=3, checkpoint="ck")
+    with open("data.json", "rb") as f:
+        expected = f.read()
+    os.remove("data.json")
+
+    with monkeypatch.context() as patch:
+        interrupt(patch, JsonSink, 4)
+        with pytest.raises(KeyboardInterrupt):
+            gen_json(tables, engine, "sqlite", batch_size=3, checkpoint="ck")
+    assert os.path.exists("ck")
+
+    gen_json(tables, engine, "sqlite", batch_size=3, checkpoint="ck")
+    with open("data.json", "rb") as f:
+        assert f.read() == expected
+    assert not os.path.exists("ck")
+
+
+def test_checkpoint_resume_jsonl(source, monkeypatch):
+    engine, tables = source
+    os.mkdir("full")
+    gen_jsonl(tables, engine, "sqlite", directory="full", checkpoint="ck")
+
+    os.mkdir("resumed")
+    with monkeypatch.context() as patch:
+        interrupt(patch, JsonLinesSink, 7)
+        with pytest.raises(KeyboardInterrupt):
+            gen_jsonl(
+                tables,
+                engine,
+                "sqlite",
+                batch_size=4,
+                directory="resumed",
+                checkpoint="ck"
+            )
+    gen_jsonl(
+        tables,
+        engine,
+        "sqlite",
+        batch_size=4,
+        directory="resumed",
+        checkpoint="ck"
+    )
+    for table in tables:
+        assert (
+            read_jsonl(f"resumed/{table.name}.jsonl")
+            == read_jsonl(f"full/{table.name}.jsonl")
+        )
+
+
+def test_checkpoint_of_other_exporter(source, monkeypatch):
+    engine, tables = source
+    with monkeypatch.context() as patch:
+        interrupt(patch, JsonLinesSink, 2)
+        with pytest.raises(KeyboardInterrupt):
+            gen_jsonl(tables, engine, "sqlite", batch_size=4, checkpoint="ck")
+
+    with pytest.raises(ValueError):
+        gen_json(tables, engine, "sqlite", batch_size=4, checkpoint="ck")
+    os.remove(f"{tables[0].name}.jsonl")
+    with pytest.raises(ValueError):
+        gen_jsonl(tables, engine, "sqlite", batch_size=4, checkpoint="ck")
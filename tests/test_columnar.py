@@ -0,0 +1,81 @@
+# -*- coding: utf-8 -*-
+
+
+import decimal
+import os
+from array import array
+
+import pytest
+from sqlalchemy import Numeric
+from sqlalchemy.dialects import mysql
+
+from columnar import _ColumnWriter, ColumnarSink, gen_columnar
+from datastructures import Decimal, Integer
+
+
+def test_unsigned_bigint(tmp_path):
+    column = {
+        "name": "id",
+        "nullable": False,
+        "type": Integer(mysql.BIGINT(unsigned=True), "mysql")
+    }
+    writer = _ColumnWriter(str(tmp_path), 0, column)
+    writer.write((0, 2 ** 63, 2 ** 64 - 1))
+    header = writer.close()
+    assert header["type"] == "uint64"
+
+    values = array("Q")
+    with open(tmp_path / "0.data", "rb") as f:
+        values.frombytes(f.read())
+    assert list(values) == [0, 2 ** 63, 2 ** 64 - 1]
+
+
+def test_wide_decimal_text(tmp_path):
+    column = {
+        "name": "amount",
+        "nullable": True,
+        "type": Decimal(Numeric(30, 8), "mysql")
+    }
+    writer = _ColumnWriter(str(tmp_path), 0, column)
+    writer.write((
+        decimal.Decimal("0E-8"),
+        None,
+        decimal.Decimal("-12.5"),
+        decimal.Decimal("0")
+    ))
+    header = writer.close()
+    assert header["type"] == "utf8"
+
+    offsets = array("q")
+    with open(tmp_path / "0.offsets", "rb") as f:
+        offsets.frombytes(f.read())
+    with open(tmp_path / "0.data", "rb") as f:
+        data = f.read()
+    assert [
+        data[start:end].decode("utf-8")
+        for start, end in zip(offsets, offsets[1:])
+    ] == ["0.0", "", "-12.50000000", "0.0"]
+
+
+def test_close_after_failure(source, monkeypatch):
+    engine, tables = source
+    opened = []
+    init = _ColumnWriter.__init__
+
+    def tracked_init(self, *args):
+        init(self, *args)
+        opened.append(self)
+
+    def failing_write_rows(self, rows):
+        raise KeyboardInterrupt()
+
+    monkeypatch.setattr(_ColumnWriter, "__init__", tracked_init)
+    monkeypatch.setattr(ColumnarSink, "write_rows", failing_write_rows)
+    with pytest.raises(KeyboardInterrupt):
+        gen_columnar(tables, engine, "sqlite")
+
+    assert opened
+    assert all(writer.data.closed for writer in opened)
+    assert not os.path.exists(
+        os.path.join("columnar", tables[0].name, "header.json")
+    )
@@ -0,0 +1,91 @@
+# -*- coding: utf-8 -*-
+
+
+import bz2
+import gzip
+import lzma
+import os
+import sqlite3
+
+import pytest
+
+import compression as compression_module
+from compression import Compression
+from data_export import gen_db, gen_json, gen_jsonl
+
+
+DECOMPRESSORS = {"gzip": gzip.open, "bz2": bz2.open, "lzma": lzma.open}
+
+
+def _read(path, method=None):
+    if method is None:
+        with open(path, "rb") as f:
+            return f.read()
+    with DECOMPRESSORS[method](path + Compression(method).suffix) as f:
+        return f.read()
+
+
+def _dump_db(path):
+    connection = sqlite3.connect(path)
+    try:
+        return list(connection.iterdump())
+    finally:
+        connection.close()
+
+
+@pytest.fixture
+def small_chunks(monkeypatch):
+    """每写入少量数据就交给压缩器,覆盖多块和压缩线程的队列
+    """
+
+    monkeypatch.setattr(compression_module, "CHUNK_SIZE", 64)
+
+
+@pytest.mark.parametrize("method", ["gzip", "bz2", "lzma"])
+@pytest.mark.parametrize("threaded", [False, True])
+def test_compressed_json_round_trip(source, small_chunks, method, threaded):
+    engine, tables = source
+    gen_json(tables, engine, "sqlite", batch_size=7)
+    os.mkdir("plain")
+    gen_jsonl(tables, engine, "sqlite", batch_size=7, directory="plain")
+
+    compression = Compression(method, threaded=threaded)
+    gen_json(tables, engine, "sqlite", batch_size=7, compression=compression)
+    gen_jsonl(tables, engine, "sqlite", batch_size=7, compression=compression)
+
+    assert _read("data.json", method) == _read("data.json")
+    for table in tables:
+        assert (
+            _read(f"{table.name}.jsonl", method)
+            == _read(f"plain/{table.name}.jsonl")
+        )
+
+
+@pytest.mark.parametrize("method", ["gzip", "bz2", "lzma"])
+def test_compressed_db_round_trip(source, method):
+    engine, tables = source
+    gen_db(tables, engine, "sqlite")
+    expected = _dump_db("data.db")
+    os.remove("data.db")
+
+    gen_db(tables, engine, "sqlite", compression=method)
+
+    assert not os.path.exists("data.db")
+    with open("data.db", "wb") as f:
+        f.write(_read("data.db", method))
+    assert _dump_db("data.db") == expected
+
+
+def test_compressed_append(tmp_path):
+    path = str(tmp_path / "out")
+    compression = Compression("gzip")
+    for data in (b"first\n", b"second\n"):
+        with compression.open(path, "ab") as f:
+            f.write(data)
+
+    assert _read(path, "gzip") == b"first\nsecond\n"
+
+
+def test_no_such_compression():
+    with pytest.raises(TypeError):
+        Compression("zip")
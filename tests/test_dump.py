@@ -0,0 +1,102 @@
+# -*- coding: utf-8 -*-
+
+
+import decimal
+import shutil
+import sqlite3
+import subprocess
+
+import pytest
+from sqlalchemy import (
+    Column,
+    Float as FLOAT,
+    Integer,
+    MetaData,
+    Numeric,
+    String,
+    Table
+)
+
+from data_export import gen_sqlite_sql
+from datastructures import Decimal, Float
+from dump import gen_data_sql, gen_load_files
+
+
+@pytest.mark.skipif(shutil.which("sqlite3") is None, reason="needs sqlite3")
+def test_sqlite_load_files_keep_null_marker(source):
+    engine, _ = source
+    metadata = MetaData()
+    table = Table(
+        "note",
+        metadata,
+        Column("id", Integer, primary_key=True),
+        Column("text", String(10)),
+        Column("count", Integer)
+    )
+    metadata.create_all(engine)
+    rows = [(1, "\\N", None), (2, None, 5), (3, "", 0)]
+    with engine.begin() as connection:
+        connection.execute(table.insert(), [
+            {"id": id_, "text": text, "count": count}
+            for id_, text, count in rows
+        ])
+
+    gen_sqlite_sql([table], "sqlite")
+    gen_load_files([table], engine, "sqlite", target="sqlite")
+    subprocess.run(
+        [
+            "sqlite3",
+            "loaded.db",
+            ".read sqlite_table.sql",
+            ".read sqlite_load.sql"
+        ],
+        check=True
+    )
+
+    connection = sqlite3.connect("loaded.db")
+    try:
+        assert connection.execute(
+            "SELECT id, text, count FROM note ORDER BY id"
+        ).fetchall() == rows
+    finally:
+        connection.close()
+
+
+def test_data_sql_non_finite_floats(source):
+    engine, _ = source
+    metadata = MetaData()
+    table = Table(
+        "measure",
+        metadata,
+        Column("id", Integer, primary_key=True),
+        Column("value", FLOAT)
+    )
+    metadata.create_all(engine)
+    rows = [(1, float("inf")), (2, float("-inf")), (3, 1.5)]
+    with engine.begin() as connection:
+        connection.execute(table.insert(), [
+            {"id": id_, "value": value} for id_, value in rows
+        ])
+
+    gen_sqlite_sql([table], "sqlite")
+    gen_data_sql([table], engine, "sqlite", target="sqlite")
+    connection = sqlite3.connect(":memory:")
+    try:
+        for path in ("sqlite_table.sql", "sqlite_data.sql"):
+            with open(path, "r", encoding="utf-8") as f:
+                connection.executescript(f.read())
+        assert connection.execute(
+            "SELECT id, value FROM measure ORDER BY id"
+        ).fetchall() == rows
+    finally:
+        connection.close()
+
+    with pytest.raises(ValueError):
+        gen_data_sql([table], engine, "sqlite", target="mysql")
+
+
+@pytest.mark.parametrize("value", [float("nan"), decimal.Decimal("NaN")])
+def test_nan_literal(value):
+    for type_ in (Float(FLOAT(), "sqlite"), Decimal(Numeric(10, 2), "sqlite")):
+        for target in ("sqlite", "mysql"):
+            assert type_.to_literal_converter(target)(value) == "NULL"
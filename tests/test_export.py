@@ -0,0 +1,435 @@
+# -*- coding: utf-8 -*-
+
+
+import datetime
+import decimal
+import json
+import os
+import sqlite3
+
+import pytest
+from sqlalchemy import (
+    Boolean,
+    Column,
+    Date,
+    DateTime,
+    event,
+    Float,
+    Index,
+    Integer,
+    MetaData,
+    Numeric,
+    String,
+    Table
+)
+
+import data_export
+from analyser import analyse_table
+from conftest import (
+    CHILD_ROWS,
+    find_table,
+    interrupt,
+    PARENT_ROWS,
+    read_jsonl
+)
+from data_export import (
+    _split_ranges,
+    _sqlite_ddl,
+    gen_db,
+    gen_json,
+    gen_jsonl,
+    gen_schemas,
+    JSON_BACKENDS,
+    MyJsonEncoder,
+    SqliteSink
+)
+from datastructures import sqlite_copy_decimal
+from metrics import ExportMetrics
+from serializer import compile_serializer
+
+
+def _update_source(engine, tables):
+    parent = find_table(tables, "parent")
+    with engine.begin() as connection:
+        connection.execute(
+            parent.update()
+            .where(parent.c.id == 3)
+            .values(name="updated", updated_at=datetime.datetime(2021, 1, 1))
+        )
+        connection.execute(parent.insert(), {
+            "id": PARENT_ROWS + 1,
+            "name": "new",
+            "updated_at": datetime.datetime(2021, 1, 2)
+        })
+
+
+def test_watermark_resume_jsonl(source):
+    engine, tables = source
+    gen_jsonl(
+        tables,
+        engine,
+        "sqlite",
+        batch_size=10,
+        incremental=True,
+        watermark_columns={"parent": "updated_at"}
+    )
+    assert len(read_jsonl("parent.jsonl")) == PARENT_ROWS
+
+    _update_source(engine, tables)
+    gen_jsonl(
+        tables,
+        engine,
+        "sqlite",
+        batch_size=10,
+        incremental=True,
+        watermark_columns={"parent": "updated_at"}
+    )
+    rows = read_jsonl("parent.jsonl")
+    assert [row["name"] for row in rows[PARENT_ROWS:]] == ["updated", "new"]
+    # child以主键作为高水位,没有新增数据
+    assert len(read_jsonl("child.jsonl")) == CHILD_ROWS
+
+
+def test_watermark_resume_db(source):
+    engine, tables = source
+    gen_db(
+        tables,
+        engine,
+        "sqlite",
+        batch_size=10,
+        incremental=True,
+        watermark_columns={"parent": "updated_at"}
+    )
+    _update_source(engine, tables)
+    gen_db(
+        tables,
+        engine,
+        "sqlite",
+        batch_size=10,
+        incremental=True,
+        watermark_columns={"parent": "updated_at"}
+    )
+
+    assert not os.path.exists("dam_state.db")
+    connection = sqlite3.connect("data.db")
+    try:
+        assert connection.execute(
+            "SELECT name FROM parent WHERE id IN (3, ?) ORDER BY id",
+            (PARENT_ROWS + 1,)
+        ).fetchall() == [("updated",), ("new",)]
+        assert connection.execute(
+            "SELECT COUNT(*) FROM parent"
+        ).fetchone() == (PARENT_ROWS + 1,)
+        assert connection.execute(
+            "SELECT table_name FROM dam_watermark ORDER BY table_name"
+        ).fetchall() == [("child",), ("parent",)]
+    finally:
+        connection.close()
+
+
+def test_watermark_column_nullable(source):
+    engine, _ = source
+    metadata = MetaData()
+    table = Table(
+        "event",
+        metadata,
+        Column("id", Integer, primary_key=True),
+        Column("updated_at", DateTime)
+    )
+    metadata.create_all(engine)
+
+    with pytest.raises(ValueError):
+        gen_jsonl(
+            [table],
+            engine,
+            "sqlite",
+            incremental=True,
+            watermark_columns={"event": "updated_at"}
+        )
+    with pytest.raises(ValueError):
+        gen_jsonl(
+            [table],
+            engine,
+            "sqlite",
+            incremental=True,
+            watermark_columns={"event": "missing"}
+        )
+
+
+def test_incremental_rejects_compression(source):
+    engine, tables = source
+    with pytest.raises(ValueError):
+        gen_jsonl(
+            tables,
+            engine,
+            "sqlite",
+            incremental=True,
+            compression="gzip"
+        )
+    assert not os.path.exists("dam_state.db")
+
+
+@pytest.mark.parametrize("exporter", [gen_json, gen_db])
+def test_metrics_with_workers(source, exporter, monkeypatch):
+    engine, tables = source
+    # 不走SQLite之间直接复制的路径
+    monkeypatch.setattr(data_export, "_sqlite_source_path", lambda *_: None)
+    metrics = ExportMetrics(count_rows=True)
+    exporter(
+        tables,
+        engine,
+        "sqlite",
+        batch_size=7,
+        workers=2,
+        split_rows=10,
+        metrics=metrics
+    )
+
+    report = metrics.report()
+    assert report["rows"] == PARENT_ROWS + CHILD_ROWS
+    assert report["total_rows"] == PARENT_ROWS + CHILD_ROWS
+    assert report["tables"]["parent"]["rows"] == PARENT_ROWS
+    assert report["tables"]["child"]["rows"] == CHILD_ROWS
+    assert report["stages"]["query"]["calls"] > 0
+    assert exporter.__name__ in report["exporters"]
+
+
+def test_split_ranges_composite_key(source):
+    engine, tables = source
+    child = find_table(tables, "child")
+    keys = sorted(
+        (i % 3, f"c{i:03d}") for i in range(CHILD_ROWS)
+    )
+    statements = []
+
+    def record(connection, cursor, statement, *args):
+        statements.append(statement)
+
+    event.listen(engine, "before_cursor_execute", record)
+    try:
+        with engine.connect() as connection:
+            ranges = _split_ranges(connection, child, "sqlite", 15)
+    finally:
+        event.remove(engine, "before_cursor_execute", record)
+
+    # 40行拆分为3段,分位点为排序后的第13、26行
+    assert ranges == [
+        (None, keys[12]),
+        (keys[12], keys[25]),
+        (keys[25], None)
+    ]
+    # 除统计行数外每次查询只取一个分位点,不在主进程中读出全部主键
+    probes = [sql for sql in statements if "count(" not in sql.lower()]
+    assert len(probes) == 2
+    assert all("LIMIT" in sql for sql in probes)
+
+
+def test_deferred_ddl_keeps_indexes():
+    metadata = MetaData()
+    table = Table(
+        "item",
+        metadata,
+        Column("id", Integer, primary_key=True),
+        Column("shop_id", Integer),
+        Column("code", Integer),
+        Column("price", Integer),
+        Index("ix_item_shop_code", "shop_id", "code", unique=True),
+        Index("ix_item_price", "price")
+    )
+
+    _, index_sqls = _sqlite_ddl([table], "sqlite", deferred=True)
+
+    assert index_sqls == [
+        "CREATE INDEX [ix_item_price] ON item (price)",
+        "CREATE UNIQUE INDEX [ix_item_shop_code] ON item (shop_id, code)"
+    ]
+
+
+def test_fast_load_interrupted_removes_db(source, monkeypatch):
+    engine, tables = source
+    monkeypatch.setattr(data_export, "_sqlite_source_path", lambda *_: None)
+    interrupt(monkeypatch, SqliteSink, 2, "write_rows")
+
+    with pytest.raises(KeyboardInterrupt):
+        gen_db(tables, engine, "sqlite", batch_size=10, fast_load=True)
+
+    assert not os.path.exists("data.db")
+
+
+def _price_rows(engine, monkeypatch, copy):
+    metadata = MetaData()
+    metadata.reflect(bind=engine, only=["price"])
+    with monkeypatch.context() as patch:
+        if not copy:
+            patch.setattr(data_export, "_sqlite_source_path", lambda *_: None)
+        gen_db([metadata.tables["price"]], engine, "sqlite")
+    connection = sqlite3.connect("data.db")
+    try:
+        return connection.execute(
+            "SELECT id, value, typeof(value) FROM price ORDER BY id"
+        ).fetchall()
+    finally:
+        connection.close()
+        os.remove("data.db")
+
+
+# sqlalchemy提示SQLite不原生支持Decimal
+@pytest.mark.filterwarnings("ignore::sqlalchemy.exc.SAWarning")
+def test_sqlite_copy_decimal(source, monkeypatch):
+    engine, _ = source
+    metadata = MetaData()
+    price = Table(
+        "price",
+        metadata,
+        Column("id", Integer, primary_key=True),
+        Column("value", Numeric(10, 3))
+    )
+    metadata.create_all(engine)
+    values = [1.2345, 2.6755, 0.0625, -1.0005, 7, 0.29, -12.5, None]
+    with engine.begin() as connection:
+        connection.execute(price.insert(), [
+            {"id": i, "value": value} for i, value in enumerate(values)
+        ])
+    calls = []
+
+    def recording_copy_decimal(value, scale):
+        calls.append(value)
+        return sqlite_copy_decimal(value, scale)
+
+    monkeypatch.setattr(
+        data_export,
+        "sqlite_copy_decimal",
+        recording_copy_decimal
+    )
+
+    copied = _price_rows(engine, monkeypatch, copy=True)
+    assert copied == _price_rows(engine, monkeypatch, copy=False)
+    assert copied[0][1] == 1.234
+    # 只有小数位多于scale的值经python函数转换
+    assert sorted(calls) == [-1.0005, 0.0625, 1.2345, 2.6755]
+
+
+def _sample_table(engine):
+    """各种类型的边界值:DECIMAL的0和0E-8、NULL、带微秒的时间、布尔和日期
+    """
+
+    metadata = MetaData()
+    sample = Table(
+        "sample",
+        metadata,
+        Column("id", Integer, primary_key=True),
+        Column("amount", Numeric(12, 8)),
+        Column("ratio", Numeric),
+        Column("price", Float),
+        Column("flag", Boolean),
+        Column("day", Date),
+        Column("at", DateTime),
+        Column("name", String(20))
+    )
+    metadata.create_all(engine)
+    with engine.begin() as connection:
+        connection.execute(sample.insert(), [
+            {
+                "id": 1,
+                "amount": decimal.Decimal("0E-8"),
+                "ratio": decimal.Decimal("0"),
+                "price": 0.0,
+                "flag": False,
+                "day": datetime.date(2020, 2, 29),
+                "at": datetime.datetime(2020, 1, 1, 8, 0, 0, 123456),
+                "name": "零"
+            },
+            {
+                "id": 2,
+                "amount": decimal.Decimal("-12.34567891"),
+                "ratio": decimal.Decimal("1.5"),
+                "price": 1.25,
+                "flag": True,
+                "day": datetime.date(1999, 12, 31),
+                "at": datetime.datetime(2020, 1, 1, 8, 0, 0),
+                "name": "a\"b\\c"
+            },
+        ])
+        connection.execute(sample.insert(), {"id": 3})
+    reflected = MetaData()
+    reflected.reflect(bind=engine, only=["sample"])
+    table = reflected.tables["sample"]
+    with engine.connect() as connection:
+        rows = connection.execute(
+            table.select().order_by(table.c.id)
+        ).fetchall()
+    return table, rows
+
+
+# sqlalchemy提示SQLite不原生支持Decimal
+@pytest.mark.filterwarnings("ignore::sqlalchemy.exc.SAWarning")
+def test_compiled_serializer_matches_schema(source):
+    engine, _ = source
+    table, rows = _sample_table(engine)
+    schema = gen_schemas([table], "sqlite", to_file=False)["sample"]
+    serialize = compile_serializer(analyse_table(table, "sqlite"))
+    encode = MyJsonEncoder(ensure_ascii=False).encode
+
+    for row in rows:
+        expected = schema.dump(dict(row))
+        assert serialize(row) == expected
+        assert encode(serialize(row)) == encode(expected)
+
+
+@pytest.mark.filterwarnings("ignore::sqlalchemy.exc.SAWarning")
+def test_json_converters_match_schema(source):
+    engine, _ = source
+    table, rows = _sample_table(engine)
+    schema = gen_schemas([table], "sqlite", to_file=False)["sample"]
+    serialize = compile_serializer(
+        analyse_table(table, "sqlite"),
+        for_json=True
+    )
+    encode = JSON_BACKENDS["json"]()
+    baseline = MyJsonEncoder(ensure_ascii=False).encode
+
+    for row in rows:
+        assert encode(serialize(row)) == baseline(schema.dump(dict(row)))
+
+    gen_json([table], engine, "sqlite", batch_size=2)
+    with open("data.json", "r", encoding="utf-8") as f:
+        assert f.read() == baseline(
+            {"sample": [schema.dump(dict(row)) for row in rows]}
+        )
+
+
+def test_watermark_new_table_db(source):
+    engine, tables = source
+    gen_db(tables, engine, "sqlite", incremental=True)
+
+    metadata = MetaData()
+    extra = Table(
+        "extra",
+        metadata,
+        Column("id", Integer, primary_key=True),
+        Column("name", String(20))
+    )
+    metadata.create_all(engine)
+    with engine.begin() as connection:
+        connection.execute(extra.insert(), [
+            {"id": i, "name": f"e{i}"} for i in range(1, 4)
+        ])
+    reflected = MetaData()
+    reflected.reflect(bind=engine)
+    gen_db(
+        list(reflected.sorted_tables),
+        engine,
+        "sqlite",
+        incremental=True
+    )
+
+    connection = sqlite3.connect("data.db")
+    try:
+        assert connection.execute(
+            "SELECT id, name FROM extra ORDER BY id"
+        ).fetchall() == [(1, "e1"), (2, "e2"), (3, "e3")]
+        assert connection.execute(
+            "SELECT COUNT(*) FROM parent"
+        ).fetchone() == (PARENT_ROWS,)
+    finally:
+        connection.close()
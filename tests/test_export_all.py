@@ -0,0 +1,111 @@
+# -*- coding: utf-8 -*-
+
+
+import os
+import shutil
+import sqlite3
+
+import pytest
+
+import export_all
+from data_export import gen_db, gen_json, gen_jsonl, gen_schemas
+from export_all import gen_all
+
+
+def _read(path):
+    with open(path, "rb") as f:
+        return f.read()
+
+
+def _dump_db(path):
+    connection = sqlite3.connect(path)
+    try:
+        return list(connection.iterdump())
+    finally:
+        connection.close()
+
+
+@pytest.fixture
+def copies(monkeypatch):
+    """记录gen_all通过ATTACH DATABASE复制的次数
+    """
+
+    calls = []
+    copy_sqlite_tables = export_all._copy_sqlite_tables
+
+    def recording_copy_sqlite_tables(*args, **kwargs):
+        calls.append(args)
+        return copy_sqlite_tables(*args, **kwargs)
+
+    monkeypatch.setattr(
+        export_all,
+        "_copy_sqlite_tables",
+        recording_copy_sqlite_tables
+    )
+    return calls
+
+
+def test_gen_all_matches_exporters(source, copies):
+    engine, tables = source
+    gen_json(tables, engine, "sqlite")
+    os.mkdir("single")
+    gen_jsonl(tables, engine, "sqlite", directory="single")
+    gen_db(tables, engine, "sqlite")
+    gen_schemas(tables, "sqlite")
+    expected = {
+        "data.json": _read("data.json"),
+        "schemas.py": _read("schemas.py"),
+        "db": _dump_db("data.db")
+    }
+    for path in ("data.json", "schemas.py", "data.db", "sqlite_table.sql"):
+        os.remove(path)
+
+    gen_all(tables, engine, "sqlite", ["json", "jsonl", "db", "schemas"])
+
+    assert _read("data.json") == expected["data.json"]
+    assert _read("schemas.py") == expected["schemas.py"]
+    assert _dump_db("data.db") == expected["db"]
+    for table in tables:
+        assert (
+            _read(f"{table.name}.jsonl")
+            == _read(f"single/{table.name}.jsonl")
+        )
+    # db与json共用同一次读取,不再另外复制源库
+    assert copies == []
+    shutil.rmtree("single")
+
+
+def test_gen_all_db_only_copies(source, copies):
+    engine, tables = source
+    gen_all(tables, engine, "sqlite", ["db"])
+
+    assert len(copies) == 1
+    assert os.path.exists("data.db")
+
+
+def test_gen_all_disposes_sqlite_engine(source, monkeypatch):
+    engine, tables = source
+    disposed = []
+    sqlite_engine = export_all._sqlite_engine
+
+    def recording_sqlite_engine(*args, **kwargs):
+        created = sqlite_engine(*args, **kwargs)
+        dispose = created.dispose
+
+        def recording_dispose():
+            disposed.append(created)
+            dispose()
+
+        created.dispose = recording_dispose
+        return created
+
+    def failing_copy(*args, **kwargs):
+        raise KeyboardInterrupt()
+
+    monkeypatch.setattr(export_all, "_sqlite_engine", recording_sqlite_engine)
+    monkeypatch.setattr(export_all, "_copy_sqlite_tables", failing_copy)
+
+    with pytest.raises(KeyboardInterrupt):
+        gen_all(tables, engine, "sqlite", ["db"])
+
+    assert len(disposed) == 1
@@ -0,0 +1,57 @@
+# -*- coding: utf-8 -*-
+
+
+import os
+
+import pytest
+from sqlalchemy import String
+
+import data_export
+from analyser import register_type
+from data_export import gen_sqlite_sql
+from datastructures import String as StringStructure
+
+
+@pytest.fixture
+def analysed(monkeypatch):
+    """记录data_export中analyse_table分析过的表名
+    """
+
+    names = []
+    analyse_table = data_export.analyse_table
+
+    def recording_analyse_table(table, dialect):
+        names.append(table.name)
+        return analyse_table(table, dialect)
+
+    monkeypatch.setattr(data_export, "analyse_table", recording_analyse_table)
+    return names
+
+
+def test_incremental_analyses_changed_tables(source, analysed):
+    _, tables = source
+    gen_sqlite_sql(tables, "sqlite", incremental=True)
+    assert sorted(analysed) == ["child", "parent"]
+    with open("sqlite_table.sql", "r", encoding="utf-8") as f:
+        first = f.read()
+    os.utime("sqlite_table.sql", (0, 0))
+
+    del analysed[:]
+    gen_sqlite_sql(tables, "sqlite", incremental=True)
+
+    assert analysed == []
+    assert os.stat("sqlite_table.sql").st_mtime == 0
+    with open("sqlite_table.sql", "r", encoding="utf-8") as f:
+        assert f.read() == first
+
+
+def test_incremental_register_type(source, analysed, registry):
+    _, tables = source
+    gen_sqlite_sql(tables, "sqlite", incremental=True)
+
+    register_type("sqlite", String, StringStructure, first=True)
+
+    del analysed[:]
+    gen_sqlite_sql(tables, "sqlite", incremental=True)
+
+    assert sorted(analysed) == ["child", "parent"]
@@ -0,0 +1,60 @@
+# -*- coding: utf-8 -*-
+
+
+import json
+import os
+
+import pytest
+
+from conftest import CHILD_ROWS, PARENT_ROWS, read_jsonl
+from data_export import gen_json, gen_jsonl, gen_schemas, JsonSink
+
+
+def _expected_data(engine, tables):
+    schemas = gen_schemas(tables, "sqlite", to_file=False)
+    with engine.connect() as connection:
+        return {
+            table.name: [
+                schemas[table.name].dump(dict(row))
+                for row in connection.execute(table.select())
+            ]
+            for table in tables
+        }
+
+
+@pytest.mark.parametrize("batch_size", [1, 7, 1000])
+def test_gen_json_streams_batches(source, monkeypatch, batch_size):
+    engine, tables = source
+    batches = []
+    write_encoded = JsonSink.write_encoded
+
+    def recording_write_encoded(self, data):
+        batches.append(data)
+        write_encoded(self, data)
+
+    monkeypatch.setattr(JsonSink, "write_encoded", recording_write_encoded)
+    gen_json(tables, engine, "sqlite", batch_size=batch_size)
+
+    with open("data.json", "r", encoding="utf-8") as f:
+        assert json.load(f) == _expected_data(engine, tables)
+    # 每读取一批写入一次,不在内存中拼出整张表
+    assert len(batches) == sum(
+        -(-rows // batch_size) for rows in (PARENT_ROWS, CHILD_ROWS)
+    )
+
+
+def test_gen_jsonl_one_file_per_table(source):
+    engine, tables = source
+    os.mkdir("out")
+    gen_jsonl(tables, engine, "sqlite", batch_size=7, directory="out")
+
+    expected = _expected_data(engine, tables)
+    assert sorted(os.listdir("out")) == ["child.jsonl", "parent.jsonl"]
+    for table in tables:
+        path = os.path.join("out", f"{table.name}.jsonl")
+        assert read_jsonl(path) == expected[table.name]
+        # 每行一条记录,以换行结尾,各文件可以单独切分后并行处理
+        with open(path, "rb") as f:
+            lines = f.read().split(b"\n")
+        assert lines[-1] == b""
+        assert len(lines) - 1 == len(expected[table.name])
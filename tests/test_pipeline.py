@@ -0,0 +1,49 @@
+# -*- coding: utf-8 -*-
+
+
+import threading
+import time
+
+from sqlalchemy import create_engine
+
+from data_export import _Pipeline, PIPELINE_QUEUE_SIZE
+
+
+def test_pipeline_bounds_in_flight_actions():
+    serialize_threads = 3
+    release = threading.Event()
+    fetched = []
+
+    def encode(rows):
+        # 第一批卡住,其余编码线程继续完成后面的批次
+        if rows == [0]:
+            release.wait()
+        return rows
+
+    def make_actions(connection):
+        for i in range(100):
+            fetched.append(i)
+            yield ("encode", None, None, None, (encode, [i]))
+
+    applied = []
+    stalled_fetched = []
+
+    def apply(action):
+        applied.append(action[4])
+
+    def release_later():
+        time.sleep(0.5)
+        stalled_fetched.append(len(fetched))
+        release.set()
+
+    checker = threading.Thread(target=release_later)
+    checker.start()
+    _Pipeline(serialize_threads).run(
+        create_engine("sqlite://"),
+        make_actions,
+        apply
+    )
+    checker.join()
+    # 卡住期间读取的操作数不超过信号量的上限
+    assert stalled_fetched[0] <= serialize_threads + PIPELINE_QUEUE_SIZE + 1
+    assert applied == [[i] for i in range(100)]
@@ -0,0 +1,84 @@
+# -*- coding: utf-8 -*-
+
+
+import re
+
+import pytest
+from sqlalchemy import (
+    Column,
+    create_engine,
+    event,
+    ForeignKey,
+    Integer,
+    MetaData,
+    Table
+)
+
+import reflection
+from reflection import match_table, reflect_tables, select_tables
+
+
+INCLUDE = ["child", "log_*"]
+EXCLUDE = [re.compile(r"log_b")]
+
+
+@pytest.fixture
+def engine(tmp_path):
+    metadata = MetaData()
+    Table("parent", metadata, Column("id", Integer, primary_key=True))
+    Table(
+        "child",
+        metadata,
+        Column("id", Integer, primary_key=True),
+        Column("parent_id", Integer, ForeignKey("parent.id"))
+    )
+    for name in ("log_a", "log_b", "skipped"):
+        Table(name, metadata, Column("id", Integer, primary_key=True))
+    engine = create_engine(f"sqlite:///{tmp_path / 'source.db'}")
+    metadata.create_all(engine)
+    yield engine
+    engine.dispose()
+
+
+def test_match_table():
+    assert match_table("log_a", INCLUDE, EXCLUDE)
+    assert not match_table("log_b", INCLUDE, EXCLUDE)
+    assert not match_table("parent", INCLUDE, EXCLUDE)
+    # 正则表达式需要匹配整个表名
+    assert match_table("log_bb", INCLUDE, EXCLUDE)
+    assert match_table("anything")
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_reflect_tables_filters_before_reflection(
+    engine,
+    monkeypatch,
+    workers
+):
+    # 每个线程一次只反射一张表,覆盖并行反射
+    monkeypatch.setattr(reflection, "REFLECT_CHUNK_SIZE", 1)
+    statements = []
+
+    def record(connection, cursor, statement, *args):
+        statements.append(statement)
+
+    metadata = MetaData(bind=engine)
+    event.listen(engine, "before_cursor_execute", record)
+    try:
+        reflect_tables(metadata, INCLUDE, EXCLUDE, workers=workers)
+    finally:
+        event.remove(engine, "before_cursor_execute", record)
+
+    # parent被child的外键引用,同时反射
+    assert sorted(metadata.tables) == ["child", "log_a", "parent"]
+    assert not any(
+        ("log_b" in sql) or ("skipped" in sql) for sql in statements
+    )
+    child = metadata.tables["child"]
+    assert [
+        fk.column.table is metadata.tables["parent"]
+        for fk in child.foreign_keys
+    ] == [True]
+    assert sorted(
+        table.name for table in select_tables(metadata, INCLUDE, EXCLUDE)
+    ) == ["child", "log_a"]
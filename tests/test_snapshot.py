@@ -0,0 +1,78 @@
+# -*- coding: utf-8 -*-
+
+
+import pickle
+
+import pytest
+
+import snapshot
+from snapshot import load_metadata
+
+
+class _Broken(object):
+    """反序列化时抛出KeyError,模拟其他版本的sqlalchemy生成的MetaData
+    """
+
+    def __reduce__(self):
+        return (dict.__getitem__, ({}, "_index"))
+
+
+@pytest.fixture
+def reflected(monkeypatch):
+    """记录load_metadata实际反射的次数
+    """
+
+    calls = []
+    reflect_tables = snapshot.reflect_tables
+
+    def counting_reflect_tables(*args, **kwargs):
+        calls.append(args)
+        return reflect_tables(*args, **kwargs)
+
+    monkeypatch.setattr(snapshot, "reflect_tables", counting_reflect_tables)
+    return calls
+
+
+def _snapshot_key(path):
+    with open(path, "rb") as f:
+        return pickle.load(f)
+
+
+def test_snapshot_reused(source, reflected):
+    engine, _ = source
+    load_metadata(engine, "sqlite")
+    metadata = load_metadata(engine, "sqlite")
+
+    assert len(reflected) == 1
+    assert sorted(metadata.tables) == ["child", "parent"]
+
+
+def test_snapshot_other_key(source, reflected):
+    engine, _ = source
+    with open(".dam_snapshot.pickle", "wb") as f:
+        pickle.dump(("other",), f)
+        pickle.dump(_Broken(), f)
+
+    metadata = load_metadata(engine, "sqlite")
+
+    assert len(reflected) == 1
+    assert sorted(metadata.tables) == ["child", "parent"]
+    assert _snapshot_key(".dam_snapshot.pickle") != ("other",)
+
+
+@pytest.mark.parametrize("payload", [_Broken(), b"\x80\x04corrupt"])
+def test_snapshot_unreadable_metadata(source, reflected, payload):
+    engine, _ = source
+    load_metadata(engine, "sqlite")
+    key = _snapshot_key(".dam_snapshot.pickle")
+    with open(".dam_snapshot.pickle", "wb") as f:
+        pickle.dump(key, f)
+        if isinstance(payload, bytes):
+            f.write(payload)
+        else:
+            pickle.dump(payload, f)
+
+    metadata = load_metadata(engine, "sqlite")
+
+    assert len(reflected) == 2
+    assert sorted(metadata.tables) == ["child", "parent"]